@@ -8,6 +8,15 @@ block_cipher = None
 # Hidden imports for FastAPI and Uvicorn
 hidden_imports = [
     'search_engine',
+    'binary_index',
+    'cloud_index',
+    'substring_index',
+    'result_cache',
+    'boq_import',
+    'quote_thumbnails',
+    'remote_image_cache',
+    'quote_manifest',
+    'image_uploader',
     'pdf_reader',
     'cloud_storage',
     'email_service',
@@ -0,0 +1,419 @@
+import json
+import mmap
+import os
+import struct
+import sys
+from array import array
+from bisect import bisect_left
+from collections.abc import MutableMapping
+from itertools import accumulate
+
+
+# Versioned on-disk layout for search_index_v2. The JSON file stays the
+# interchange format; this file is what load_index() memory-maps on startup.
+#
+#   header   magic, version, source JSON signature, counts
+#   sections (offset, length) pairs, each section 8-byte aligned:
+#     0 string offsets   uint32[n_strings + 1]   byte offsets into section 1
+#     1 string blob      utf-8 item strings, deduplicated
+#     2 shapes           uint32 [n_fields, (key_sid, tag) * n_fields] per shape
+#     3 item offsets     uint32[n_items + 1]     word offsets into section 4
+#     4 item records     uint32 [shape_id, value words...] per item
+#     5 key blob         utf-8 keyword keys, sorted, NUL separated
+#     6 key order        uint32[n_keys]          original insertion order -> sorted slot
+#     7 posting offsets  uint32[n_keys + 1]      word offsets into section 8
+#     8 postings         uint32 delta-encoded item ids per key
+MAGIC = b"QAIX"
+FORMAT_VERSION = 1
+BINARY_INDEX_SUFFIX = ".bin"
+
+_HEADER = struct.Struct("<4sIIqqIIII")
+_SECTION = struct.Struct("<QQ")
+_SECTION_COUNT = 9
+_UINT32_MAX = 0xFFFFFFFF
+
+# Field value tags used in shapes.
+TAG_STR = 0
+TAG_UINT = 1
+TAG_NONE = 2
+TAG_FALSE = 3
+TAG_TRUE = 4
+TAG_STR_LIST = 5
+TAG_JSON = 6
+
+
+def binary_path_for(json_path: str) -> str:
+    return os.path.splitext(json_path)[0] + BINARY_INDEX_SUFFIX
+
+
+def source_signature(json_path: str):
+    """(size, mtime_ns) of the JSON index a binary file was built from, or None."""
+    try:
+        stat = os.stat(json_path)
+    except OSError:
+        return None
+    return (stat.st_size, stat.st_mtime_ns)
+
+
+def _value_tag(value):
+    if isinstance(value, bool):
+        return TAG_TRUE if value else TAG_FALSE
+    if value is None:
+        return TAG_NONE
+    if isinstance(value, str):
+        return TAG_STR
+    if isinstance(value, int) and 0 <= value <= _UINT32_MAX:
+        return TAG_UINT
+    if isinstance(value, list) and all(isinstance(v, str) for v in value):
+        return TAG_STR_LIST
+    return TAG_JSON
+
+
+def _u32(values) -> bytes:
+    packed = array("I", values)
+    if sys.byteorder != "little":
+        packed.byteswap()
+    return packed.tobytes()
+
+
+def write_index(path: str, stored_items, keyword_index, signature=None):
+    """Serialize items and keyword postings to the binary layout at `path`."""
+    strings = []
+    string_ids = {}
+
+    def sid(value: str) -> int:
+        found = string_ids.get(value)
+        if found is None:
+            found = len(strings)
+            string_ids[value] = found
+            strings.append(value)
+        return found
+
+    shapes = []
+    shape_ids = {}
+    item_offsets = [0]
+    item_words = []
+    for item in stored_items:
+        fields = tuple((key, _value_tag(value)) for key, value in item.items())
+        shape_id = shape_ids.get(fields)
+        if shape_id is None:
+            shape_id = len(shapes)
+            shape_ids[fields] = shape_id
+            shapes.append(fields)
+        item_words.append(shape_id)
+        for key, tag in fields:
+            value = item[key]
+            if tag == TAG_STR:
+                item_words.append(sid(value))
+            elif tag == TAG_UINT:
+                item_words.append(value)
+            elif tag == TAG_STR_LIST:
+                item_words.append(len(value))
+                item_words.extend(sid(v) for v in value)
+            elif tag == TAG_JSON:
+                item_words.append(sid(json.dumps(value, ensure_ascii=False)))
+        item_offsets.append(len(item_words))
+
+    shape_words = [len(shapes)]
+    for fields in shapes:
+        shape_words.append(len(fields))
+        for key, tag in fields:
+            shape_words.extend((sid(key), tag))
+
+    encoded_strings = [s.encode("utf-8", "surrogatepass") for s in strings]
+    string_offsets = [0]
+    for raw in encoded_strings:
+        string_offsets.append(string_offsets[-1] + len(raw))
+
+    insertion_keys = list(keyword_index.keys())
+    for key in insertion_keys:
+        if "\x00" in key:
+            raise ValueError(f"keyword key contains NUL: {key!r}")
+    sorted_keys = sorted(insertion_keys)
+    slot_of = {key: slot for slot, key in enumerate(sorted_keys)}
+
+    posting_offsets = [0]
+    posting_words = array("I")
+    for key in sorted_keys:
+        # Consumers treat postings as sets, so sorting them here only makes
+        # the deltas non-negative; it never changes a search result.
+        previous = 0
+        for item_id in sorted(keyword_index[key]):
+            posting_words.append(item_id - previous)
+            previous = item_id
+        posting_offsets.append(len(posting_words))
+    if sys.byteorder != "little":
+        posting_words.byteswap()
+
+    sections = [
+        _u32(string_offsets),
+        b"".join(encoded_strings),
+        _u32(shape_words),
+        _u32(item_offsets),
+        _u32(item_words),
+        "\x00".join(sorted_keys).encode("utf-8", "surrogatepass"),
+        _u32(slot_of[key] for key in insertion_keys),
+        _u32(posting_offsets),
+        posting_words.tobytes(),
+    ]
+
+    src_size, src_mtime_ns = signature or (-1, -1)
+    header = _HEADER.pack(
+        MAGIC, FORMAT_VERSION, 0, src_size, src_mtime_ns,
+        len(strings), len(item_offsets) - 1, len(sorted_keys), len(shapes),
+    )
+    offset = _HEADER.size + _SECTION.size * _SECTION_COUNT
+    table = []
+    body = []
+    for section in sections:
+        padding = (-offset) % 8
+        body.append(b"\x00" * padding)
+        offset += padding
+        table.append(_SECTION.pack(offset, len(section)))
+        body.append(section)
+        offset += len(section)
+
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as handle:
+        handle.write(header)
+        handle.write(b"".join(table))
+        for chunk in body:
+            handle.write(chunk)
+    os.replace(tmp_path, path)
+
+
+def _u32_view(buffer, offset: int, length: int):
+    view = memoryview(buffer)[offset:offset + length]
+    if sys.byteorder == "little":
+        return view.cast("I")
+    swapped = array("I", view.tobytes())
+    swapped.byteswap()
+    return swapped
+
+
+def _decode_items(string_offsets, string_blob, shape_words, item_offsets, item_words):
+    strings = [
+        str(string_blob[string_offsets[i]:string_offsets[i + 1]], "utf-8", "surrogatepass")
+        for i in range(len(string_offsets) - 1)
+    ]
+
+    shapes = []
+    cursor = 1
+    for _ in range(shape_words[0]):
+        n_fields = shape_words[cursor]
+        cursor += 1
+        fields = []
+        for _ in range(n_fields):
+            fields.append((strings[shape_words[cursor]], shape_words[cursor + 1]))
+            cursor += 2
+        shapes.append(tuple(fields))
+
+    items = []
+    for i in range(len(item_offsets) - 1):
+        cursor = item_offsets[i]
+        fields = shapes[item_words[cursor]]
+        cursor += 1
+        item = {}
+        for key, tag in fields:
+            if tag == TAG_STR:
+                item[key] = strings[item_words[cursor]]
+                cursor += 1
+            elif tag == TAG_UINT:
+                item[key] = item_words[cursor]
+                cursor += 1
+            elif tag == TAG_STR_LIST:
+                count = item_words[cursor]
+                item[key] = [strings[s] for s in item_words[cursor + 1:cursor + 1 + count]]
+                cursor += 1 + count
+            elif tag == TAG_JSON:
+                item[key] = json.loads(strings[item_words[cursor]])
+                cursor += 1
+            elif tag == TAG_NONE:
+                item[key] = None
+            else:
+                item[key] = tag == TAG_TRUE
+        items.append(item)
+    return items
+
+
+def read_index(path: str, expected_signature=None):
+    """
+    Memory-map a binary index. Returns (stored_items, keyword_index) or None
+    when the file is missing, from another format version, or was built from
+    a JSON file that has changed since.
+    """
+    try:
+        with open(path, "rb") as handle:
+            mapped = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        return None
+
+    try:
+        magic, version, _flags, src_size, src_mtime_ns, _n_strings, _n_items, n_keys, _n_shapes = (
+            _HEADER.unpack_from(mapped, 0)
+        )
+        if magic != MAGIC or version != FORMAT_VERSION:
+            mapped.close()
+            return None
+        if expected_signature is not None and (src_size, src_mtime_ns) != tuple(expected_signature):
+            mapped.close()
+            return None
+
+        sections = [
+            _SECTION.unpack_from(mapped, _HEADER.size + i * _SECTION.size)
+            for i in range(_SECTION_COUNT)
+        ]
+        (
+            (str_off, str_len), (blob_off, blob_len), (shape_off, shape_len),
+            (item_off, item_len), (rec_off, rec_len), (key_off, key_len),
+            (order_off, order_len), (post_off_off, post_off_len), (post_off, post_len),
+        ) = sections
+
+        stored_items = _decode_items(
+            _u32_view(mapped, str_off, str_len),
+            mapped[blob_off:blob_off + blob_len],
+            _u32_view(mapped, shape_off, shape_len),
+            _u32_view(mapped, item_off, item_len),
+            _u32_view(mapped, rec_off, rec_len),
+        )
+        key_blob = mapped[key_off:key_off + key_len].decode("utf-8", "surrogatepass")
+        # An empty blob is either no keys or a single "" key; the count tells them apart.
+        keys = key_blob.split("\x00") if n_keys else []
+        if len(keys) != n_keys:
+            raise ValueError(f"key table has {len(keys)} keys, header says {n_keys}")
+        keyword_index = PackedKeywordIndex(
+            keys,
+            _u32_view(mapped, order_off, order_len),
+            _u32_view(mapped, post_off_off, post_off_len),
+            _u32_view(mapped, post_off, post_len),
+            mapped,
+        )
+        return stored_items, keyword_index
+    except Exception as e:
+        print(f"Warning: failed to read binary index {path}: {e}")
+        mapped.close()
+        return None
+
+
+class PackedKeywordIndex(MutableMapping):
+    """
+    Read-mostly view over the mmap'd posting lists that behaves like the
+    plain `keyword -> [item_ids]` dict. Lookups bisect the sorted key table
+    and decode one posting list on demand; keys added or extended after load
+    (add_to_index) live in an in-memory overlay. Iteration follows the
+    original insertion order of the JSON index.
+    """
+
+    def __init__(self, sorted_keys, key_order, posting_offsets, postings, mapped=None):
+        self._keys = sorted_keys
+        self._order = key_order
+        self._posting_offsets = posting_offsets
+        self._postings = postings
+        self._mapped = mapped
+        self._overlay = {}
+        self._deleted = set()
+        self._extra = 0  # overlay keys that are not in the packed table
+
+    def _slot(self, key) -> int:
+        if not isinstance(key, str):
+            return -1
+        slot = bisect_left(self._keys, key)
+        if slot < len(self._keys) and self._keys[slot] == key:
+            return slot
+        return -1
+
+    def _decode(self, slot: int):
+        start = self._posting_offsets[slot]
+        end = self._posting_offsets[slot + 1]
+        return list(accumulate(self._postings[start:end]))
+
+    def __getitem__(self, key):
+        found = self._overlay.get(key)
+        if found is not None:
+            return found
+        slot = self._slot(key)
+        if slot < 0 or key in self._deleted:
+            raise KeyError(key)
+        return self._decode(slot)
+
+    def __contains__(self, key):
+        if key in self._overlay:
+            return True
+        return self._slot(key) >= 0 and key not in self._deleted
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def setdefault(self, key, default=None):
+        found = self._overlay.get(key)
+        if found is not None:
+            return found
+        slot = self._slot(key)
+        if slot >= 0 and key not in self._deleted:
+            found = self._decode(slot)
+            self._overlay[key] = found
+            return found
+        self[key] = default
+        return default
+
+    def __setitem__(self, key, value):
+        if key not in self._overlay and (self._slot(key) < 0 or key in self._deleted):
+            self._extra += 1
+        self._deleted.discard(key)
+        self._overlay[key] = value
+
+    def __delitem__(self, key):
+        if key not in self:
+            raise KeyError(key)
+        if self._overlay.pop(key, None) is not None and self._slot(key) < 0:
+            self._extra -= 1
+            return
+        if self._slot(key) >= 0:
+            self._deleted.add(key)
+
+    def __iter__(self):
+        keys = self._keys
+        deleted = self._deleted
+        for slot in self._order:
+            key = keys[slot]
+            if key not in deleted:
+                yield key
+        for key in list(self._overlay):
+            if self._slot(key) < 0:
+                yield key
+
+    def __len__(self):
+        return len(self._keys) - len(self._deleted) + self._extra
+
+    def sorted_keys(self):
+        if not self._overlay and not self._deleted:
+            return list(self._keys)
+        return sorted(self)
+
+    def to_dict(self):
+        return {key: self[key] for key in self}
+
+
+def convert_json_index(json_path: str, out_path: str = None) -> str:
+    """Build the binary index next to (or at `out_path` for) a JSON index file."""
+    out_path = out_path or binary_path_for(json_path)
+    with open(json_path, "r", encoding="utf-8-sig") as f:
+        data = json.load(f)
+    write_index(
+        out_path,
+        data.get("stored_items", []),
+        data.get("keyword_index", {}),
+        source_signature(json_path),
+    )
+    return out_path
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Usage: python binary_index.py <search_index_v2.json> [output.bin]")
+        sys.exit(1)
+    written = convert_json_index(sys.argv[1], sys.argv[2] if len(sys.argv) > 2 else None)
+    print(f"Binary index written to {written}")
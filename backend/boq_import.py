@@ -0,0 +1,163 @@
+import csv
+import io
+import re
+import zipfile
+import xml.etree.ElementTree as ET
+
+
+CODE_HEADERS = ("code", "sku", "model", "item code", "product code", "cat no", "catalogue no", "article")
+QUANTITY_HEADERS = ("qty", "quantity", "nos", "units", "pcs")
+
+_XLSX_NS = {"main": "http://schemas.openxmlformats.org/spreadsheetml/2006/main"}
+_XLSX_REL_NS = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+
+
+def _parse_quantity(value, default: float = 1.0):
+    text = str(value if value is not None else "").strip().replace(",", "")
+    match = re.search(r'\d+(?:\.\d+)?', text)
+    if not match:
+        return default
+    quantity = float(match.group(0))
+    if quantity <= 0:
+        return default
+    return int(quantity) if quantity.is_integer() else quantity
+
+
+def parse_code_list(values):
+    """
+    (code, quantity) pairs from a JSON list of codes. Each entry is either a
+    code string or a {"code": ..., "quantity": ...} object.
+    """
+    entries = []
+    for value in values or []:
+        if isinstance(value, dict):
+            code = value.get("code") or value.get("sku") or ""
+            quantity = _parse_quantity(value.get("quantity", value.get("qty")))
+        else:
+            code, quantity = value, 1
+        code = str(code or "").strip()
+        if code:
+            entries.append((code, quantity))
+    return entries
+
+
+def _header_column(header, names):
+    for position, cell in enumerate(header):
+        label = re.sub(r'[^a-z ]+', ' ', str(cell or "").lower()).strip()
+        label = re.sub(r'\s+', ' ', label)
+        if any(label == name or label.startswith(name + " ") or label.endswith(" " + name) for name in names):
+            return position
+    return None
+
+
+def _rows_to_entries(rows):
+    """
+    (code, quantity) pairs from spreadsheet rows. A header row naming the
+    code/quantity columns is used when present; otherwise the first column
+    holds codes and the first numeric column after it the quantity.
+    """
+    rows = [[str(cell if cell is not None else "").strip() for cell in row] for row in rows]
+    rows = [row for row in rows if any(row)]
+    if not rows:
+        return []
+
+    code_col = _header_column(rows[0], CODE_HEADERS)
+    qty_col = _header_column(rows[0], QUANTITY_HEADERS)
+    if code_col is not None:
+        rows = rows[1:]
+    else:
+        code_col = 0
+        qty_col = None
+        for row in rows:
+            for position, cell in enumerate(row[1:], start=1):
+                if re.fullmatch(r'\d+(?:\.\d+)?', cell.replace(",", "")):
+                    qty_col = position
+                    break
+            if qty_col is not None:
+                break
+
+    entries = []
+    for row in rows:
+        code = row[code_col] if code_col < len(row) else ""
+        if not code:
+            continue
+        quantity = _parse_quantity(row[qty_col]) if qty_col is not None and qty_col < len(row) else 1
+        entries.append((code, quantity))
+    return entries
+
+
+def _read_csv_rows(content: bytes):
+    text = content.decode("utf-8-sig", errors="replace")
+    try:
+        dialect = csv.Sniffer().sniff(text[:4096], delimiters=",;\t")
+    except csv.Error:
+        dialect = csv.excel
+    return list(csv.reader(io.StringIO(text), dialect))
+
+
+def _xlsx_column_index(cell_ref: str) -> int:
+    letters = re.match(r'[A-Z]+', cell_ref or "")
+    index = 0
+    for char in letters.group(0) if letters else "A":
+        index = index * 26 + (ord(char) - ord("A") + 1)
+    return index - 1
+
+
+def _read_xlsx_rows(content: bytes):
+    """Cell values of the first worksheet, read with the standard library only."""
+    with zipfile.ZipFile(io.BytesIO(content)) as archive:
+        names = set(archive.namelist())
+        shared = []
+        if "xl/sharedStrings.xml" in names:
+            root = ET.fromstring(archive.read("xl/sharedStrings.xml"))
+            for item in root.findall("main:si", _XLSX_NS):
+                shared.append("".join(node.text or "" for node in item.iter(f"{{{_XLSX_NS['main']}}}t")))
+
+        sheet_path = "xl/worksheets/sheet1.xml"
+        if "xl/workbook.xml" in names and "xl/_rels/workbook.xml.rels" in names:
+            workbook = ET.fromstring(archive.read("xl/workbook.xml"))
+            first_sheet = workbook.find("main:sheets/main:sheet", _XLSX_NS)
+            rels = ET.fromstring(archive.read("xl/_rels/workbook.xml.rels"))
+            rel_id = first_sheet.get(f"{{{_XLSX_REL_NS}}}id") if first_sheet is not None else None
+            for rel in rels:
+                if rel.get("Id") == rel_id:
+                    target = rel.get("Target", "").lstrip("/")
+                    sheet_path = target if target.startswith("xl/") else f"xl/{target}"
+                    break
+
+        root = ET.fromstring(archive.read(sheet_path))
+        rows = []
+        for row in root.iter(f"{{{_XLSX_NS['main']}}}row"):
+            values = []
+            for cell in row.findall("main:c", _XLSX_NS):
+                position = _xlsx_column_index(cell.get("r"))
+                cell_type = cell.get("t")
+                if cell_type == "inlineStr":
+                    value = "".join(node.text or "" for node in cell.iter(f"{{{_XLSX_NS['main']}}}t"))
+                else:
+                    raw = cell.find("main:v", _XLSX_NS)
+                    value = raw.text if raw is not None and raw.text is not None else ""
+                    if cell_type == "s" and value.isdigit() and int(value) < len(shared):
+                        value = shared[int(value)]
+                    elif cell_type is None and re.fullmatch(r'-?\d+\.0+', value):
+                        value = value.split(".", 1)[0]
+                while len(values) < position:
+                    values.append("")
+                values.append(value)
+            rows.append(values)
+        return rows
+
+
+def parse_boq_file(filename: str, content: bytes):
+    """(code, quantity) pairs from an uploaded .csv/.txt or .xlsx bill of quantities."""
+    name = str(filename or "").lower()
+    if name.endswith(".xlsx") or content[:2] == b"PK":
+        try:
+            rows = _read_xlsx_rows(content)
+        except (zipfile.BadZipFile, KeyError, ET.ParseError) as e:
+            raise ValueError(f"Could not read spreadsheet: {e}")
+    elif name.endswith(".xls"):
+        raise ValueError("Legacy .xls files are not supported; save the sheet as .xlsx or .csv")
+    else:
+        rows = _read_csv_rows(content)
+    return _rows_to_entries(rows)
@@ -0,0 +1,243 @@
+import hashlib
+import json
+import os
+import time
+import zlib
+
+import cloud_storage
+
+
+# The cloud copy of search_index_v2 is a small manifest plus gzip-compressed,
+# content-addressed chunks. Concatenated in manifest order, the decompressed
+# chunks form the same JSON document save_index writes locally:
+#
+#   {"stored_items": [<item chunk>, <item chunk>, ...], "keyword_index": {<posting chunk>, ...}}
+#
+# Chunk boundaries fall after entries whose key hashes to a multiple of the
+# average chunk size, so inserting or editing an entry only changes the chunk
+# that holds it; the rest keep their names and are not uploaded again.
+#
+# Storage has no conditional write, so chunks a new manifest drops are listed
+# under its "retired" key and only deleted once they have been unreferenced
+# for GC_GRACE_SECONDS. A restore that read the previous manifest, or a
+# writer that published over it, still finds every chunk it references.
+MANIFEST_VERSION = 1
+ITEMS_PER_CHUNK = max(1, int(os.getenv("CLOUD_INDEX_ITEMS_PER_CHUNK", "128")))
+KEYWORDS_PER_CHUNK = max(1, int(os.getenv("CLOUD_INDEX_KEYWORDS_PER_CHUNK", "128")))
+COMPRESS_LEVEL = 6
+_DECOMPRESS_BLOCK = 64 * 1024
+GC_GRACE_SECONDS = 600
+
+# Content hash of the manifest this process last saw in the bucket, by
+# manifest path, so an unchanged save skips the network entirely.
+_known_content_hash = {}
+
+
+def manifest_path_for(object_path: str) -> str:
+    return os.path.splitext(cloud_storage.normalize_object_path(object_path))[0] + ".manifest.json"
+
+
+def _chunk_path(object_path: str, chunk_hash: str) -> str:
+    folder = os.path.dirname(cloud_storage.normalize_object_path(object_path))
+    return f"{folder}/chunks/{chunk_hash}.json.gz" if folder else f"chunks/{chunk_hash}.json.gz"
+
+
+def _boundary(key: str, average: int) -> bool:
+    return int(hashlib.md5(key.encode("utf-8")).hexdigest()[:8], 16) % average == 0
+
+
+def _split(entries, average):
+    """Group (boundary key, JSON fragment) pairs into content-defined chunks; returns [(hash, chunk)]."""
+    chunks, current = [], []
+    for key, fragment in entries:
+        current.append(fragment)
+        if _boundary(key, average) or len(current) >= average * 4:
+            chunks.append(", ".join(current))
+            current = []
+    if current:
+        chunks.append(", ".join(current))
+    return [(hashlib.sha256(chunk.encode("utf-8")).hexdigest(), chunk) for chunk in chunks]
+
+
+def _build_chunks(items, postings):
+    item_fragments = ((fragment, fragment) for fragment in (json.dumps(item) for item in items))
+    posting_fragments = (
+        (keyword, f"{json.dumps(keyword)}: {json.dumps(list(ids))}")
+        for keyword, ids in postings.items()
+    )
+    item_chunks = _split(item_fragments, ITEMS_PER_CHUNK)
+    posting_chunks = _split(posting_fragments, KEYWORDS_PER_CHUNK)
+    manifest = {
+        "version": MANIFEST_VERSION,
+        "item_count": len(items),
+        "item_chunks": [chunk_hash for chunk_hash, _ in item_chunks],
+        "posting_chunks": [chunk_hash for chunk_hash, _ in posting_chunks],
+    }
+    manifest["content_hash"] = hashlib.sha256(
+        json.dumps([manifest["item_chunks"], manifest["posting_chunks"]]).encode("utf-8")
+    ).hexdigest()
+    return manifest, dict(item_chunks + posting_chunks)
+
+
+def load_manifest(object_path: str):
+    raw = cloud_storage.download_bytes(cloud_storage.SYSTEM_BUCKET, manifest_path_for(object_path))
+    if raw is None:
+        return None
+    manifest = json.loads(raw)
+    if manifest.get("version") != MANIFEST_VERSION:
+        return None
+    return manifest
+
+
+def _live_chunks(manifest) -> set:
+    return set(manifest.get("item_chunks", []) + manifest.get("posting_chunks", [])) if manifest else set()
+
+
+def _retire(retired: dict, manifest, keep: set, now: float):
+    """Add manifest's retired and live chunks that are not in keep to retired, keeping the oldest time."""
+    if not manifest:
+        return
+    for chunk_hash, retired_at in (manifest.get("retired") or {}).items():
+        if chunk_hash in keep:
+            continue  # referenced again
+        retired[chunk_hash] = min(retired_at, retired.get(chunk_hash, retired_at))
+    for chunk_hash in _live_chunks(manifest) - keep:
+        retired.setdefault(chunk_hash, now)
+
+
+def save(items, postings, object_path: str):
+    """
+    Upload the index under object_path's manifest, sending only chunks the
+    current cloud manifest does not reference. Returns {"content_hash",
+    "uploaded", "chunks"}; an unchanged index uploads nothing. Raises if
+    another writer's manifest replaced this one before it could be checked.
+    """
+    manifest_path = manifest_path_for(object_path)
+    manifest, chunks = _build_chunks(items, postings)
+    content_hash = manifest["content_hash"]
+    if _known_content_hash.get(manifest_path) == content_hash:
+        return {"content_hash": content_hash, "uploaded": 0, "chunks": len(chunks)}
+
+    previous = load_manifest(object_path)
+    if previous and previous.get("content_hash") == content_hash:
+        _known_content_hash[manifest_path] = content_hash
+        return {"content_hash": content_hash, "uploaded": 0, "chunks": len(chunks)}
+
+    stored = _live_chunks(previous)
+    missing = [chunk_hash for chunk_hash in chunks if chunk_hash not in stored]
+    uploaded = cloud_storage.upload_batch(
+        cloud_storage.SYSTEM_BUCKET,
+        [
+            (_chunk_path(object_path, chunk_hash),
+             zlib.compress(chunks[chunk_hash].encode("utf-8"), COMPRESS_LEVEL, wbits=16 + zlib.MAX_WBITS),
+             "application/gzip")
+            for chunk_hash in missing
+        ],
+    )
+    failed = [path for path, url in uploaded.items() if not url]
+    if failed:
+        raise RuntimeError(f"{len(failed)} index chunks failed to upload")
+
+    # The manifest goes last, so readers never see chunks that are not there
+    # yet. Chunks of a manifest another writer published meanwhile are
+    # retired too, not forgotten.
+    now = time.time()
+    keep = set(chunks)
+    retired = {}
+    _retire(retired, previous, keep, now)
+    current = load_manifest(object_path)
+    if current and (current.get("content_hash"), current.get("updated_at")) != (
+        (previous or {}).get("content_hash"), (previous or {}).get("updated_at")
+    ):
+        _retire(retired, current, keep, now)
+    expired = {chunk_hash for chunk_hash, retired_at in retired.items() if now - retired_at >= GC_GRACE_SECONDS}
+    manifest["retired"] = {chunk_hash: retired_at for chunk_hash, retired_at in retired.items() if chunk_hash not in expired}
+    manifest["updated_at"] = now
+    cloud_storage.upload_bytes(
+        cloud_storage.SYSTEM_BUCKET,
+        manifest_path,
+        json.dumps(manifest).encode("utf-8"),
+        "application/json",
+    )
+
+    # Only the writer whose manifest stuck collects; a loser's view is stale,
+    # so it leaves the chunks alone and its caller retries the save.
+    published = load_manifest(object_path)
+    if not published or published.get("updated_at") != now or published.get("content_hash") != content_hash:
+        _known_content_hash.pop(manifest_path, None)
+        raise RuntimeError("another instance replaced the index manifest during the save")
+    _known_content_hash[manifest_path] = content_hash
+    for chunk_hash in expired:
+        try:
+            cloud_storage.delete_object(cloud_storage.SYSTEM_BUCKET, _chunk_path(object_path, chunk_hash))
+        except Exception as e:
+            print(f"Warning: could not delete stale index chunk {chunk_hash}: {e}")
+    if previous is None:
+        # Superseded by the manifest; see restore().
+        try:
+            cloud_storage.delete_object(cloud_storage.SYSTEM_BUCKET, object_path)
+        except Exception as e:
+            print(f"Warning: could not delete the uncompressed cloud index: {e}")
+    return {"content_hash": content_hash, "uploaded": len(missing), "chunks": len(chunks)}
+
+
+def _write_chunk(handle, chunk_hash: str, compressed: bytes):
+    """Decompress one chunk into handle block by block, checking it against its name."""
+    decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+    digest = hashlib.sha256()
+    for start in range(0, len(compressed), _DECOMPRESS_BLOCK):
+        block = decompressor.decompress(compressed[start:start + _DECOMPRESS_BLOCK])
+        digest.update(block)
+        handle.write(block)
+    block = decompressor.flush()
+    digest.update(block)
+    handle.write(block)
+    if digest.hexdigest() != chunk_hash:
+        raise ValueError(f"index chunk {chunk_hash} is corrupt")
+
+
+def restore(object_path: str, local_path: str) -> bool:
+    """
+    Rebuild local_path from the cloud manifest and its chunks. Falls back to
+    the uncompressed object that predates the manifest. False if neither exists.
+    """
+    manifest = load_manifest(object_path)
+    if manifest is None:
+        return cloud_storage.download_to_path(cloud_storage.SYSTEM_BUCKET, object_path, local_path)
+
+    order = manifest["item_chunks"] + manifest["posting_chunks"]
+    paths = {chunk_hash: _chunk_path(object_path, chunk_hash) for chunk_hash in order}
+    # Compressed chunks are a fraction of the index; the JSON itself is only
+    # ever decompressed block by block into the file the loader reads.
+    downloaded = cloud_storage.download_batch(cloud_storage.SYSTEM_BUCKET, list(paths.values()))
+    missing = [chunk_hash for chunk_hash in order if downloaded.get(paths[chunk_hash]) is None]
+    if missing:
+        raise RuntimeError(f"{len(missing)} index chunks are missing from cloud storage")
+
+    os.makedirs(os.path.dirname(local_path) or ".", exist_ok=True)
+    tmp_path = f"{local_path}.tmp"
+    with open(tmp_path, "wb") as handle:
+        for section, chunk_list, close in (
+            (b'{"stored_items": [', manifest["item_chunks"], b"], "),
+            (b'"keyword_index": {', manifest["posting_chunks"], b"}}"),
+        ):
+            handle.write(section)
+            for n, chunk_hash in enumerate(chunk_list):
+                if n:
+                    handle.write(b", ")
+                _write_chunk(handle, chunk_hash, downloaded[paths[chunk_hash]])
+            handle.write(close)
+    os.replace(tmp_path, local_path)
+    _known_content_hash[manifest_path_for(object_path)] = manifest["content_hash"]
+    return True
+
+
+def delete(object_path: str):
+    """Remove the manifest, its chunks and any uncompressed copy."""
+    manifest = load_manifest(object_path)
+    if manifest:
+        for chunk_hash in _live_chunks(manifest) | set(manifest.get("retired") or {}):
+            cloud_storage.delete_object(cloud_storage.SYSTEM_BUCKET, _chunk_path(object_path, chunk_hash))
+        cloud_storage.delete_object(cloud_storage.SYSTEM_BUCKET, manifest_path_for(object_path))
+    cloud_storage.delete_object(cloud_storage.SYSTEM_BUCKET, object_path)
+    _known_content_hash.pop(manifest_path_for(object_path), None)
@@ -1,13 +1,27 @@
 import mimetypes
 import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from urllib.parse import quote
 
 import httpx
 
+try:
+    import h2  # noqa: F401  (enables HTTP/2 in httpx)
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
 
 SUPABASE_URL = str(os.getenv("SUPABASE_URL", "")).strip().rstrip("/")
 SUPABASE_SERVICE_ROLE_KEY = str(os.getenv("SUPABASE_SERVICE_ROLE_KEY", "")).strip()
 SUPABASE_REQUEST_TIMEOUT = float(os.getenv("SUPABASE_REQUEST_TIMEOUT", "60"))
+SUPABASE_MAX_CONNECTIONS = max(1, int(os.getenv("SUPABASE_MAX_CONNECTIONS", "16")))
+SUPABASE_BATCH_WORKERS = max(1, int(os.getenv("SUPABASE_BATCH_WORKERS", "8")))
+SUPABASE_BATCH_RETRIES = max(0, int(os.getenv("SUPABASE_BATCH_RETRIES", "3")))
+LIST_PAGE_SIZE = 1000
+RETRYABLE_STATUS = {408, 429, 500, 502, 503, 504}
 USE_SUPABASE_STORAGE = str(os.getenv("USE_SUPABASE_STORAGE", "true")).strip().lower() in {
     "1",
     "true",
@@ -56,13 +70,50 @@ def _auth_headers(extra=None):
     return headers
 
 
+_client = None
+_client_pid = None
+_client_lock = threading.Lock()
+
+
+def _http_client() -> httpx.Client:
+    """
+    Long-lived client shared by all storage calls, so requests reuse pooled
+    keep-alive (and, with h2 installed, HTTP/2) connections instead of
+    paying a TLS handshake each. Rebuilt in forked worker processes.
+    """
+    global _client, _client_pid
+    with _client_lock:
+        if _client is None or _client_pid != os.getpid():
+            _client = httpx.Client(
+                timeout=SUPABASE_REQUEST_TIMEOUT,
+                http2=HTTP2_AVAILABLE,
+                limits=httpx.Limits(
+                    max_connections=SUPABASE_MAX_CONNECTIONS,
+                    max_keepalive_connections=SUPABASE_MAX_CONNECTIONS,
+                ),
+            )
+            _client_pid = os.getpid()
+        return _client
+
+
+def close():
+    global _client
+    with _client_lock:
+        client, _client = _client, None
+    if client is not None:
+        client.close()
+
+
+def _object_endpoint(bucket: str, object_path: str) -> str:
+    encoded_path = quote(normalize_object_path(object_path), safe="/-_.~")
+    return f"{SUPABASE_URL}/storage/v1/object/{bucket}/{encoded_path}"
+
+
 def upload_bytes(bucket: str, object_path: str, content: bytes, content_type: str = None) -> str:
     if not is_enabled():
         raise RuntimeError("Supabase storage is not configured")
 
     path = normalize_object_path(object_path)
-    encoded_path = quote(path, safe="/-_.~")
-    endpoint = f"{SUPABASE_URL}/storage/v1/object/{bucket}/{encoded_path}"
     headers = _auth_headers(
         {
             "Content-Type": content_type or guess_content_type(path),
@@ -70,8 +121,7 @@ def upload_bytes(bucket: str, object_path: str, content: bytes, content_type: st
         }
     )
 
-    with httpx.Client(timeout=SUPABASE_REQUEST_TIMEOUT) as client:
-        response = client.post(endpoint, headers=headers, content=content)
+    response = _http_client().post(_object_endpoint(bucket, path), headers=headers, content=content)
 
     if response.status_code not in {200, 201}:
         raise RuntimeError(f"Supabase upload failed ({response.status_code}): {response.text}")
@@ -88,12 +138,7 @@ def download_bytes(bucket: str, object_path: str):
     if not is_enabled():
         return None
 
-    path = normalize_object_path(object_path)
-    encoded_path = quote(path, safe="/-_.~")
-    endpoint = f"{SUPABASE_URL}/storage/v1/object/{bucket}/{encoded_path}"
-
-    with httpx.Client(timeout=SUPABASE_REQUEST_TIMEOUT) as client:
-        response = client.get(endpoint, headers=_auth_headers())
+    response = _http_client().get(_object_endpoint(bucket, object_path), headers=_auth_headers())
 
     if response.status_code == 404:
         return None
@@ -115,28 +160,34 @@ def download_to_path(bucket: str, object_path: str, local_path: str) -> bool:
 
 
 def list_objects(bucket: str, prefix: str = ""):
+    """Every object under prefix, fetched page by page."""
     if not is_enabled():
         return []
 
     endpoint = f"{SUPABASE_URL}/storage/v1/object/list/{bucket}"
-    payload = {
-        "prefix": normalize_object_path(prefix),
-        "limit": 1000,
-        "offset": 0,
-        "sortBy": {"column": "name", "order": "asc"},
-    }
-
-    with httpx.Client(timeout=SUPABASE_REQUEST_TIMEOUT) as client:
-        response = client.post(
+    entries = []
+    offset = 0
+    while True:
+        payload = {
+            "prefix": normalize_object_path(prefix),
+            "limit": LIST_PAGE_SIZE,
+            "offset": offset,
+            "sortBy": {"column": "name", "order": "asc"},
+        }
+        response = _http_client().post(
             endpoint,
             headers=_auth_headers({"Content-Type": "application/json"}),
             json=payload,
         )
 
-    if not response.is_success:
-        raise RuntimeError(f"Supabase list failed ({response.status_code}): {response.text}")
+        if not response.is_success:
+            raise RuntimeError(f"Supabase list failed ({response.status_code}): {response.text}")
 
-    return response.json() or []
+        page = response.json() or []
+        entries.extend(page)
+        if len(page) < LIST_PAGE_SIZE:
+            return entries
+        offset += len(page)
 
 
 def delete_object(bucket: str, object_path: str) -> bool:
@@ -146,13 +197,12 @@ def delete_object(bucket: str, object_path: str) -> bool:
     endpoint = f"{SUPABASE_URL}/storage/v1/object/{bucket}"
     payload = {"prefixes": [normalize_object_path(object_path)]}
 
-    with httpx.Client(timeout=SUPABASE_REQUEST_TIMEOUT) as client:
-        response = client.request(
-            "DELETE",
-            endpoint,
-            headers=_auth_headers({"Content-Type": "application/json"}),
-            json=payload,
-        )
+    response = _http_client().request(
+        "DELETE",
+        endpoint,
+        headers=_auth_headers({"Content-Type": "application/json"}),
+        json=payload,
+    )
 
     if response.status_code not in {200, 204}:
         raise RuntimeError(f"Supabase delete failed ({response.status_code}): {response.text}")
@@ -171,14 +221,111 @@ def move_object(bucket: str, source_path: str, destination_path: str) -> str:
         "destinationKey": normalize_object_path(destination_path),
     }
 
-    with httpx.Client(timeout=SUPABASE_REQUEST_TIMEOUT) as client:
-        response = client.post(
-            endpoint,
-            headers=_auth_headers({"Content-Type": "application/json"}),
-            json=payload,
-        )
+    response = _http_client().post(
+        endpoint,
+        headers=_auth_headers({"Content-Type": "application/json"}),
+        json=payload,
+    )
 
     if not response.is_success:
         raise RuntimeError(f"Supabase move failed ({response.status_code}): {response.text}")
 
     return public_url(bucket, destination_path)
+
+
+class _RetryableStatus(Exception):
+    pass
+
+
+def _with_retries(operation, retries: int):
+    """Run operation, retrying transport errors and retryable statuses with exponential backoff."""
+    delay = 0.5
+    for attempt in range(retries + 1):
+        try:
+            return operation()
+        except (httpx.TransportError, _RetryableStatus) as e:
+            if attempt >= retries:
+                raise RuntimeError(str(e)) from e
+            time.sleep(delay)
+            delay *= 2
+
+
+def _run_batch(function, keys, max_workers):
+    keys = list(dict.fromkeys(keys))
+    if not keys:
+        return {}
+    workers = min(max_workers or SUPABASE_BATCH_WORKERS, len(keys))
+    if workers <= 1:
+        return {key: function(key) for key in keys}
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="storage-batch") as pool:
+        return dict(zip(keys, pool.map(function, keys)))
+
+
+def upload_batch(bucket: str, objects, max_workers: int = None, retries: int = SUPABASE_BATCH_RETRIES) -> dict:
+    """
+    Upload many objects concurrently over the pooled client.
+
+    objects is an iterable of (object_path, source, content_type) where
+    source is bytes or a local file path. Returns object_path -> public URL,
+    or None for objects that still failed after the retries.
+    """
+    if not is_enabled():
+        raise RuntimeError("Supabase storage is not configured")
+
+    sources = {}
+    for object_path, source, content_type in objects:
+        sources[normalize_object_path(object_path)] = (source, content_type)
+
+    def upload_one(path):
+        source, content_type = sources[path]
+        try:
+            if isinstance(source, (bytes, bytearray)):
+                content = bytes(source)
+            else:
+                with open(source, "rb") as handle:
+                    content = handle.read()
+                content_type = content_type or guess_content_type(source)
+            headers = _auth_headers({"Content-Type": content_type or guess_content_type(path), "x-upsert": "true"})
+
+            def attempt():
+                response = _http_client().post(_object_endpoint(bucket, path), headers=headers, content=content)
+                if response.status_code in RETRYABLE_STATUS:
+                    raise _RetryableStatus(f"HTTP {response.status_code}")
+                if response.status_code not in {200, 201}:
+                    raise RuntimeError(f"Supabase upload failed ({response.status_code}): {response.text}")
+                return public_url(bucket, path)
+
+            return _with_retries(attempt, retries)
+        except Exception as e:
+            print(f"Warning: failed to upload {bucket}/{path}: {e}")
+            return None
+
+    return _run_batch(upload_one, sources, max_workers)
+
+
+def download_batch(bucket: str, object_paths, max_workers: int = None, retries: int = SUPABASE_BATCH_RETRIES) -> dict:
+    """
+    Download many objects concurrently over the pooled client. Returns
+    object_path -> bytes, or None for missing objects and failed downloads.
+    """
+    if not is_enabled():
+        return {path: None for path in object_paths}
+
+    def download_one(path):
+        def attempt():
+            response = _http_client().get(_object_endpoint(bucket, path), headers=_auth_headers())
+            if response.status_code == 404:
+                return None
+            if response.status_code in RETRYABLE_STATUS:
+                raise _RetryableStatus(f"HTTP {response.status_code}")
+            if not response.is_success:
+                raise RuntimeError(f"Supabase download failed ({response.status_code}): {response.text}")
+            return response.content
+
+        try:
+            return _with_retries(attempt, retries)
+        except Exception as e:
+            print(f"Warning: failed to download {bucket}/{path}: {e}")
+            return None
+
+    return _run_batch(download_one, object_paths, max_workers)
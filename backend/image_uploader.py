@@ -0,0 +1,200 @@
+import json
+import os
+import sys
+import threading
+
+import cloud_storage
+from app_paths import resolve_data_dir
+
+
+QUEUE_FILE_NAME = "image_upload_queue.jsonl"
+UPLOAD_BATCH_SIZE = 32
+RETRY_DELAY_SECONDS = 30.0
+
+
+class ImageUploadQueue:
+    """
+    Write-behind uploader for extracted catalog images.
+
+    Extraction publishes local /static/images paths right away and enqueues
+    the files here. A background thread uploads them in batches through
+    cloud_storage.upload_batch and reports {public path: cloud URL} to the
+    listener, which patches the index. Every enqueue and completion is
+    appended to a JSONL queue file, so uploads interrupted by a restart
+    resume on the next start().
+    """
+
+    def __init__(self, queue_file: str, bucket: str = None):
+        self.queue_file = queue_file
+        self.bucket = bucket or cloud_storage.PRODUCT_IMAGES_BUCKET
+        self.listener = None
+        self._pending = {}  # object path -> {"public", "local", "object"}
+        self._uploaded = {}  # public path -> cloud URL
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self._loaded = False
+
+    def _append(self, records):
+        try:
+            with open(self.queue_file, "a", encoding="utf-8") as f:
+                for record in records:
+                    f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        except OSError as e:
+            print(f"Warning: could not write image upload queue: {e}")
+
+    def _load(self):
+        """Replay the queue file once, then rewrite it without superseded records."""
+        if self._loaded:
+            return
+        self._loaded = True
+        if not os.path.exists(self.queue_file):
+            return
+        try:
+            with open(self.queue_file, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        continue  # a write cut short by a crash
+                    op = record.get("op")
+                    if op == "add":
+                        self._pending[record["object"]] = record
+                    elif op == "done":
+                        entry = self._pending.pop(record["object"], None)
+                        self._uploaded[record.get("public") or (entry or {}).get("public")] = record["url"]
+                    elif op == "drop":
+                        self._pending.pop(record["object"], None)
+        except OSError as e:
+            print(f"Warning: could not read image upload queue: {e}")
+            return
+
+        tmp_path = f"{self.queue_file}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                for public, url in self._uploaded.items():
+                    f.write(json.dumps({"op": "done", "object": "", "public": public, "url": url}, ensure_ascii=False) + "\n")
+                for record in self._pending.values():
+                    f.write(json.dumps(record, ensure_ascii=False) + "\n")
+            os.replace(tmp_path, self.queue_file)
+        except OSError as e:
+            print(f"Warning: could not compact image upload queue: {e}")
+        if self._pending:
+            print(f"Resuming {len(self._pending)} pending catalog image uploads")
+
+    def enqueue(self, entries):
+        """Queue (public path, local file, object path) triples not already uploaded or queued."""
+        with self._lock:
+            self._load()
+            records = []
+            for public, local, object_path in entries:
+                if public in self._uploaded or object_path in self._pending:
+                    continue
+                record = {"op": "add", "public": public, "local": local, "object": object_path}
+                self._pending[object_path] = record
+                records.append(record)
+            if records:
+                self._append(records)
+        if records:
+            self.start()
+            self._wake.set()
+        return len(records)
+
+    def uploaded_urls(self) -> dict:
+        with self._lock:
+            self._load()
+            return dict(self._uploaded)
+
+    def status(self) -> dict:
+        with self._lock:
+            self._load()
+            return {
+                "pending": len(self._pending),
+                "uploaded": len(self._uploaded),
+                "running": self._thread is not None and self._thread.is_alive(),
+            }
+
+    def start(self):
+        with self._lock:
+            self._load()
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="image-uploader", daemon=True)
+            self._thread.start()
+        self._wake.set()
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+
+    def _take_batch(self):
+        with self._lock:
+            return list(self._pending.values())[:UPLOAD_BATCH_SIZE]
+
+    def _run(self):
+        while not self._stop.is_set():
+            batch = self._take_batch() if cloud_storage.is_enabled() else []
+            if not batch:
+                self._wake.wait()
+                self._wake.clear()
+                continue
+            if not self._upload(batch):
+                # Storage is failing; leave the rest queued and try again later.
+                self._wake.wait(RETRY_DELAY_SECONDS)
+                self._wake.clear()
+
+    def _upload(self, batch) -> bool:
+        present = [record for record in batch if os.path.exists(record["local"])]
+        missing = [record for record in batch if not os.path.exists(record["local"])]
+        try:
+            urls = cloud_storage.upload_batch(
+                self.bucket,
+                [(record["object"], record["local"], "image/jpeg") for record in present],
+            ) if present else {}
+        except Exception as e:
+            print(f"Warning: catalog image upload batch failed: {e}")
+            urls = {}
+
+        finished = {}
+        records = []
+        with self._lock:
+            for record in missing:
+                self._pending.pop(record["object"], None)
+                records.append({"op": "drop", "object": record["object"]})
+            for record in present:
+                url = urls.get(cloud_storage.normalize_object_path(record["object"]))
+                if not url:
+                    continue
+                self._pending.pop(record["object"], None)
+                self._uploaded[record["public"]] = url
+                finished[record["public"]] = url
+                records.append({"op": "done", "object": record["object"], "public": record["public"], "url": url})
+            self._append(records)
+
+        if finished and self.listener is not None:
+            try:
+                self.listener(finished)
+            except Exception as e:
+                print(f"Warning: failed to apply uploaded image URLs: {e}")
+        return bool(finished) or not present
+
+
+_queue = None
+_queue_lock = threading.Lock()
+
+
+def get_queue() -> ImageUploadQueue:
+    global _queue
+    with _queue_lock:
+        if _queue is None:
+            is_frozen = getattr(sys, "frozen", False)
+            module_dir = os.path.dirname(os.path.abspath(__file__))
+            exe_dir = os.path.dirname(os.path.abspath(sys.executable)) if is_frozen else module_dir
+            _queue = ImageUploadQueue(os.path.join(resolve_data_dir(is_frozen, exe_dir), QUEUE_FILE_NAME))
+        return _queue
+
+
+def enqueue(entries) -> int:
+    return get_queue().enqueue(entries)
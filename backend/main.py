@@ -2,8 +2,8 @@ print("--- BACKEND STARTING ---")
 from dotenv import load_dotenv
 load_dotenv()
 print("Importing FastAPI...")
-from fastapi import FastAPI, UploadFile, File, HTTPException, Form
-from fastapi.responses import FileResponse
+from fastapi import FastAPI, UploadFile, File, HTTPException, Form, Request, BackgroundTasks
+from fastapi.responses import FileResponse, Response
 from fastapi.middleware.cors import CORSMiddleware
 print("Importing shutil/os...")
 import shutil
@@ -17,10 +17,14 @@ import httpx
 print("Importing custom modules...")
 from pdf_reader import extract_content, chunk_content
 import search_engine
+import boq_import
+import quote_manifest
 import cloud_storage
+import image_uploader
+import remote_image_cache
 import mongodb
 from email_service import send_email_with_attachment
-from quotation import generate_quote
+from quotation import render_quote_pdf_async, shutdown_render_pool
 from app_paths import resolve_data_dir
 print("Done with imports!")
 
@@ -50,7 +54,6 @@ REPO_IMAGES_DIR = os.path.join(EXE_DIR, "static", "images")
 STATIC_QUOTES_DIR = os.path.join(DATA_DIR, "static", "quotes")
 UPLOAD_DIR = os.path.join(DATA_DIR, "uploads")
 QUOTES_HISTORY_DIR = os.path.join(DATA_DIR, "quotes_history")
-QUOTATION_PDF_PATH = os.path.join(DATA_DIR, "quotation.pdf")
 
 # Ensure writable dirs exist
 for d in [STATIC_IMAGES_DIR, STATIC_QUOTES_DIR, UPLOAD_DIR, QUOTES_HISTORY_DIR]:
@@ -193,6 +196,8 @@ def index_local_catalogs(force=False):
                 import traceback
                 traceback.print_exc()
 
+        # Images uploaded while later catalogs were extracting
+        search_engine.patch_item_images(image_uploader.get_queue().uploaded_urls())
         # Ensure index is saved
         search_engine.save_index()
         print(f"--- BACKGROUND INDEXING COMPLETE: {total_indexed} items indexed ---")
@@ -415,7 +420,27 @@ def _load_pdf_bytes(pdf_url: str, requested_name: str = ""):
     if cloud_storage.is_absolute_url(pdf_url):
         parsed = urlparse(pdf_url)
         detected_name = os.path.basename(parsed.path) or "quotation.pdf"
-        return _read_remote_bytes(pdf_url), requested_name or detected_name
+        # A quote shared right after generation may still be uploading.
+        pending = _pending_quote_pdfs.get(detected_name)
+        if pending is not None:
+            return pending, requested_name or detected_name
+        try:
+            return _read_remote_bytes(pdf_url), requested_name or detected_name
+        except HTTPException:
+            # Quotes whose upload failed are kept in the local static folder.
+            local_copy = os.path.join(STATIC_QUOTES_DIR, detected_name)
+            if not os.path.isfile(local_copy):
+                raise
+            with open(local_copy, "rb") as handle:
+                return handle.read(), requested_name or detected_name
+
+    # Without cloud storage the /static/quotes file is also written after the response.
+    raw_path = urlparse(pdf_url).path if pdf_url else ""
+    if raw_path.startswith("/static/quotes/"):
+        detected_name = os.path.basename(raw_path)
+        pending = _pending_quote_pdfs.get(detected_name)
+        if pending is not None:
+            return pending, requested_name or detected_name
 
     pdf_path, detected_name, _ = _resolve_static_pdf_path(pdf_url)
     with open(pdf_path, "rb") as handle:
@@ -526,62 +551,117 @@ def _save_quote_record(filename: str, data: dict):
         except Exception as e:
             print(f"Warning: failed to sync quote history to cloud: {e}")
 
-def _list_quote_records():
-    if mongodb.is_enabled():
-        try:
-            return mongodb.list_quotes()
-        except Exception as e:
-            print(f"Warning: failed to list MongoDB quotes: {e}")
+    _record_quote_manifest_change(entry=quote_manifest.entry_for(filename, data))
 
-    if cloud_storage.is_enabled():
-        try:
-            details = []
-            for entry in cloud_storage.list_objects(cloud_storage.QUOTE_HISTORY_BUCKET):
-                filename = str(entry.get("name") or "").strip()
-                if not filename.lower().endswith(".json"):
-                    continue
-
-                raw = cloud_storage.download_bytes(cloud_storage.QUOTE_HISTORY_BUCKET, filename)
-                if not raw:
-                    continue
+def _scan_cloud_quote_records():
+    """Manifest entries read from every quote in the history bucket (one-off bootstrap)."""
+    details = []
+    for entry in cloud_storage.list_objects(cloud_storage.QUOTE_HISTORY_BUCKET):
+        filename = str(entry.get("name") or "").strip()
+        if not filename.lower().endswith(".json"):
+            continue
 
-                content = json.loads(raw.decode("utf-8"))
-                details.append({
-                    "id": filename,
-                    "client": content.get("client_name", "N/A"),
-                    "total": content.get("grand_total", 0),
-                    "date": _parse_cloud_timestamp(entry.get("updated_at") or entry.get("created_at")),
-                })
+        raw = cloud_storage.download_bytes(cloud_storage.QUOTE_HISTORY_BUCKET, filename)
+        if not raw:
+            continue
 
-            details.sort(key=lambda item: item["date"], reverse=True)
-            return details
-        except Exception as e:
-            print(f"Warning: failed to list cloud quote history: {e}")
+        content = json.loads(raw.decode("utf-8"))
+        date = _parse_cloud_timestamp(entry.get("updated_at") or entry.get("created_at"))
+        details.append(quote_manifest.entry_for(filename, content, date))
+    return details
 
+def _scan_local_quote_records():
+    """Manifest entries read from every file in quotes_history (one-off bootstrap)."""
     folder = QUOTES_HISTORY_DIR
     if not os.path.exists(folder):
         return []
 
-    files = [f for f in os.listdir(folder) if f.endswith(".json")]
     details = []
-    for filename in files:
+    for filename in os.listdir(folder):
+        if not filename.endswith(".json"):
+            continue
         path = os.path.join(folder, filename)
-        stat = os.stat(path)
-        with open(path, "r", encoding="utf-8") as handle:
-            try:
+        try:
+            stat = os.stat(path)
+            with open(path, "r", encoding="utf-8") as handle:
                 content = json.load(handle)
-                details.append({
-                    "id": filename,
-                    "client": content.get("client_name", "N/A"),
-                    "total": content.get("grand_total", 0),
-                    "date": stat.st_mtime,
-                })
-            except Exception:
-                continue
-
-    details.sort(key=lambda item: item["date"], reverse=True)
+        except Exception:
+            continue
+        details.append(quote_manifest.entry_for(filename, content, stat.st_mtime))
     return details
 
+QUOTE_MANIFEST = quote_manifest.QuoteManifest(os.path.join(DATA_DIR, "quote_manifest.sqlite3"))
+QUOTE_MANIFEST_REFRESH_SECONDS = 60
+_quote_manifest_lock = threading.RLock()
+_quote_manifest_synced_at = 0.0
+
+def _quote_manifest():
+    """
+    The local quote manifest, current for the active storage. With cloud
+    storage it mirrors the cloud manifest object, re-read at most every
+    QUOTE_MANIFEST_REFRESH_SECONDS so other instances' quotes show up.
+    The first use scans the existing records once to build it.
+    """
+    global _quote_manifest_synced_at
+    with _quote_manifest_lock:
+        if cloud_storage.is_enabled():
+            if time.time() - _quote_manifest_synced_at < QUOTE_MANIFEST_REFRESH_SECONDS:
+                return QUOTE_MANIFEST
+            try:
+                entries = quote_manifest.load_cloud_entries()
+                if entries is None:
+                    entries = _scan_cloud_quote_records()
+                    quote_manifest.save_cloud_entries(entries)
+                QUOTE_MANIFEST.replace_all(entries, source="cloud")
+                _quote_manifest_synced_at = time.time()
+                return QUOTE_MANIFEST
+            except Exception as e:
+                print(f"Warning: failed to sync cloud quote manifest: {e}")
+                if QUOTE_MANIFEST.source() == "cloud":
+                    return QUOTE_MANIFEST
+
+        if QUOTE_MANIFEST.source() != "local":
+            QUOTE_MANIFEST.replace_all(_scan_local_quote_records(), source="local")
+        return QUOTE_MANIFEST
+
+def _record_quote_manifest_change(entry=None, removed_id=None):
+    """Apply one saved or deleted quote to the local and cloud manifests."""
+    try:
+        manifest = _quote_manifest()
+        with _quote_manifest_lock:
+            if entry is not None:
+                manifest.upsert(entry)
+            if removed_id is not None:
+                manifest.remove(removed_id)
+
+            if cloud_storage.is_enabled():
+                # Re-read the cloud copy and apply just this change to it. This is
+                # read-modify-write, so two instances saving at the same moment can
+                # still lose one entry (the quote record itself is kept). A failed
+                # download raises here and leaves the cloud copy alone rather than
+                # overwriting it with this instance's view.
+                cloud_entries = quote_manifest.load_cloud_entries()
+                if cloud_entries is None:
+                    cloud_entries = _scan_cloud_quote_records()
+                entries = {item["id"]: item for item in cloud_entries}
+                if entry is not None:
+                    entries[entry["id"]] = entry
+                if removed_id is not None:
+                    entries.pop(removed_id, None)
+                quote_manifest.save_cloud_entries(entries.values())
+    except Exception as e:
+        print(f"Warning: failed to update quote manifest: {e}")
+
+def _list_quote_records(search: str = "", sort: str = "date", order: str = "desc", offset: int = 0, limit: int = None):
+    """(page of quote summaries, total matching) for the history page."""
+    if mongodb.is_enabled():
+        try:
+            return mongodb.list_quotes(search=search, sort=sort, order=order, offset=offset, limit=limit)
+        except Exception as e:
+            print(f"Warning: failed to list MongoDB quotes: {e}")
+
+    return _quote_manifest().query(search=search, sort=sort, order=order, offset=offset, limit=limit)
+
 def _load_quote_record(quote_id: str):
     if mongodb.is_enabled():
         try:
@@ -625,6 +705,8 @@ def _delete_quote_record(quote_id: str) -> bool:
         except Exception as e:
             print(f"Warning: failed to delete cloud quote '{quote_id}': {e}")
 
+    if deleted:
+        _record_quote_manifest_change(removed_id=quote_id)
     return deleted
 
 @app.on_event("startup")
@@ -639,12 +721,29 @@ async def startup_event():
                 index_local_catalogs(force=True)
             else:
                 print("Using saved search index.")
+                search_engine.patch_item_images(uploads.uploaded_urls())
         except Exception as e:
             print(f"Warning: background startup warmup failed: {e}")
 
+    # Catalog images extracted earlier may still be waiting for upload.
+    uploads = image_uploader.get_queue()
+    uploads.listener = search_engine.patch_item_images
+    if cloud_storage.is_enabled():
+        uploads.start()
+
     threading.Thread(target=warm_catalog_index, daemon=True).start()
 
 
+@app.on_event("shutdown")
+def shutdown_event():
+    import search_engine
+    search_engine.flush_index_saves()
+    image_uploader.get_queue().stop()
+    shutdown_render_pool()
+    remote_image_cache.close()
+    cloud_storage.close()
+
+
 @app.get("/")
 def root():
     return {
@@ -659,7 +758,6 @@ def root():
 async def refresh_catalogs():
     import search_engine
     search_engine.load_index(force=True)
-    search_engine._suggestion_cache.clear()
     search_engine.item_code_meta_cache.clear()
     return {"message": "Index reloaded from disk successfully."}
 
@@ -688,55 +786,82 @@ def get_status():
         "indexed_items": total,
         "faiss_ready": search_engine.vector_index is not None,
         "catalog_files": len(_list_local_catalog_files()),
+        "result_cache": search_engine.result_cache_stats(),
+        "mongodb": mongodb.connection_status(),
+        "image_uploads": image_uploader.get_queue().status(),
         "sample_items": samples
     }
 
 
 
 
+# Rendered quote PDFs whose cloud upload has not finished yet, by share name.
+_pending_quote_pdfs = {}
+
+
+def _store_quote_outputs(record_name: str, quote_payload: dict, share_pdf_name: str, pdf_bytes: bytes):
+    """Follow-up to /generate-quote: persist the record and publish the PDF."""
+    try:
+        _save_quote_record(record_name, quote_payload)
+    except Exception as e:
+        print(f"Warning: failed to save quote record '{record_name}': {e}")
+
+    try:
+        if cloud_storage.is_enabled():
+            try:
+                cloud_storage.upload_bytes(
+                    cloud_storage.QUOTES_BUCKET,
+                    share_pdf_name,
+                    pdf_bytes,
+                    "application/pdf",
+                )
+                return
+            except Exception as e:
+                print(f"Warning: failed to sync quote PDF to cloud: {e}")
+
+        os.makedirs(STATIC_QUOTES_DIR, exist_ok=True)
+        share_pdf_path = os.path.join(STATIC_QUOTES_DIR, share_pdf_name)
+        tmp_path = f"{share_pdf_path}.tmp"
+        with open(tmp_path, "wb") as handle:
+            handle.write(pdf_bytes)
+        os.replace(tmp_path, share_pdf_path)
+    finally:
+        _pending_quote_pdfs.pop(share_pdf_name, None)
+
+
 @app.post("/generate-quote")
-async def create_quote(data: dict):
+async def create_quote(data: dict, background_tasks: BackgroundTasks):
     timestamp = int(time.time())
     client_slug = _sanitize_filename(data.get("client_name", "Unknown"), "Unknown")
     quote_payload = dict(data)
+    quote_payload.pop("output_path", None)
 
     # Auto-generate a readable quotation number: SC-YYYYMMDD-XXXX
     date_str = datetime.now().strftime("%Y%m%d")
     seq = str(timestamp)[-4:]          # last 4 digits of unix timestamp
     quote_number = f"SC-{date_str}-{seq}"
     quote_payload["quote_number"] = quote_number
-    quote_payload["output_path"] = QUOTATION_PDF_PATH
 
-    filename = f"quote_{timestamp}_{client_slug}.json"
-    _save_quote_record(filename, quote_payload)
-
-    generate_quote(quote_payload)
+    # Each request renders into its own buffer in the render pool, so
+    # concurrent quotes neither block the event loop nor share an output file.
+    pdf_bytes = await render_quote_pdf_async(quote_payload)
 
+    filename = f"quote_{timestamp}_{client_slug}.json"
     share_pdf_name = f"quote_{timestamp}_{client_slug}.pdf"
-    share_pdf_url = ""
-
     if cloud_storage.is_enabled():
-        try:
-            share_pdf_url = cloud_storage.upload_file(
-                cloud_storage.QUOTES_BUCKET,
-                share_pdf_name,
-                QUOTATION_PDF_PATH,
-                "application/pdf",
-            )
-        except Exception as e:
-            print(f"Warning: failed to sync quote PDF to cloud: {e}")
-
-    if not share_pdf_url:
-        os.makedirs(STATIC_QUOTES_DIR, exist_ok=True)
-        share_pdf_path = os.path.join(STATIC_QUOTES_DIR, share_pdf_name)
-        shutil.copyfile(QUOTATION_PDF_PATH, share_pdf_path)
+        share_pdf_url = cloud_storage.public_url(cloud_storage.QUOTES_BUCKET, share_pdf_name)
+    else:
         share_pdf_url = f"/static/quotes/{share_pdf_name}"
 
-    return FileResponse(
-        QUOTATION_PDF_PATH,
+    # Saving and uploading run after the PDF has been sent back.
+    _pending_quote_pdfs[share_pdf_name] = pdf_bytes
+    background_tasks.add_task(_store_quote_outputs, filename, quote_payload, share_pdf_name, pdf_bytes)
+
+    return Response(
+        content=pdf_bytes,
         media_type="application/pdf",
-        filename="quotation.pdf",
         headers={
+            "Content-Disposition": 'attachment; filename="quotation.pdf"',
             "X-Quote-File-Url":    share_pdf_url,
             "X-Quote-File-Name":   share_pdf_name,
             "X-Quote-Number":      quote_number,
@@ -868,8 +993,15 @@ async def send_quote_whatsapp(data: dict):
     return {"message": "WhatsApp sent: Message 1 + PDF + Message 2"}
 
 @app.get("/list-quotes")
-def list_quotes():
-    return {"quotes": _list_quote_records()}
+def list_quotes(q: str = "", sort: str = "date", order: str = "desc", offset: int = 0, limit: int = 0):
+    if sort not in quote_manifest.LIST_SORTS:
+        raise HTTPException(status_code=400, detail=f"sort must be one of: {', '.join(quote_manifest.LIST_SORTS)}")
+    if order not in quote_manifest.LIST_ORDERS:
+        raise HTTPException(status_code=400, detail="order must be 'asc' or 'desc'")
+    offset = max(0, offset)
+    limit = max(0, limit) or None
+    quotes, total = _list_quote_records(search=q, sort=sort, order=order, offset=offset, limit=limit)
+    return {"quotes": quotes, "total": total, "offset": offset, "limit": limit}
 
 @app.get("/get-quote/{id}")
 def get_quote(id: str):
@@ -886,6 +1018,10 @@ def delete_quote(id: str):
 
 
 
+def _json_bytes_response(body: bytes, headers=None):
+    """Send JSON that search_engine.payload_json already serialized."""
+    return Response(content=body, media_type="application/json", headers=headers)
+
 @app.get("/search")
 def search_item(q: str, brand: str = None, smart: bool = False, exact: bool = False):
     # Handle "all" brand from frontend if it slips through
@@ -894,7 +1030,25 @@ def search_item(q: str, brand: str = None, smart: bool = False, exact: bool = Fa
         results = search_engine.search_exact(q, smart=smart, brand=brand)
     else:
         results = search_engine.search(q, smart=smart, brand=brand)
-    return {"results": results}
+    return _json_bytes_response(search_engine.payload_json({"results": results}))
+
+@app.post("/resolve-codes")
+def resolve_codes(data: dict):
+    entries = boq_import.parse_code_list(data.get("codes"))
+    if not entries:
+        raise HTTPException(status_code=400, detail="No product codes provided")
+    return search_engine.resolve_codes(entries, brand=data.get("brand"))
+
+@app.post("/resolve-codes/upload")
+async def resolve_codes_upload(file: UploadFile = File(...), brand: str = Form(None)):
+    content = await file.read()
+    try:
+        entries = boq_import.parse_boq_file(file.filename, content)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if not entries:
+        raise HTTPException(status_code=400, detail="No product codes found in file")
+    return search_engine.resolve_codes(entries, brand=brand)
 
 @app.get("/search-suggestions")
 def search_suggestions(q: str, brand: str = None):
@@ -903,8 +1057,8 @@ def search_suggestions(q: str, brand: str = None):
     try:
         if brand == "all": brand = None
         suggestions = search_engine.get_suggestions(q, brand=brand)
-        return JSONResponse(
-            content={"suggestions": suggestions},
+        return _json_bytes_response(
+            search_engine.payload_json({"suggestions": suggestions}),
             headers={"Cache-Control": "max-age=30, stale-while-revalidate=60"},
         )
     except Exception as e:
@@ -959,8 +1113,8 @@ async def add_manual_item(
         "category": category
     }
     
+    # Persisted by the debounced background save in search_engine.
     search_engine.add_to_index(None, [new_item])
-    search_engine.save_index()
     
     return {"message": "Success", "item": new_item}
 @app.get("/ask")
@@ -1092,112 +1246,47 @@ def rename_upload(data: dict):
     threading.Thread(target=index_local_catalogs, args=(True,), daemon=True).start()
     return {"message": f"Renamed to {new_name}"}
 
+def _etag_matches(request: Request, etag: str) -> bool:
+    if not etag:
+        return False
+    header = request.headers.get("if-none-match", "")
+    return any(tag.strip() in (etag, "*") for tag in header.split(",")) if header else False
+
+def _etag_response(request: Request, etag: str, body: bytes):
+    """The JSON body with its ETag, or 304 when the client already has it."""
+    headers = {"Cache-Control": "no-cache"}
+    if etag:
+        headers["ETag"] = etag
+    if _etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+    return _json_bytes_response(body, headers=headers)
+
 @app.get("/catalog/index")
-def get_catalog_index():
+def get_catalog_index(request: Request):
     import search_engine
-    import re
-    
-    # Check cache first for instant loading
-    if search_engine.catalog_summary_cache:
-        return search_engine.catalog_summary_cache
-        
-    if not search_engine.stored_items:
-        search_engine.load_index()
-    
-    if not search_engine.stored_items:
-        return []
-        
-    brand_map = {}
-    # Iterate through all items just once and build the summary
-    for item in search_engine.stored_items:
-        brand = item.get("brand")
-        if not brand:
-            src = str(item.get("source") or "Generic").lower()
-            brand = "Kohler" if "kohler" in src else "Aquant" if "aquant" in src else "Generic"
-
-        if str(brand or "").strip().lower() not in search_engine.SUPPORTED_BRANDS:
-            continue
-        
-        if brand not in brand_map:
-            brand_map[brand] = {"name": brand, "collections": set()}
-            
-        # Use the 'category' field if available
-        h = item.get("category")
-        if h:
-            brand_map[brand]["collections"].add(h)
-        else:
-            # Fallback for older indexed items or undetected headers
-            first_line = ""
-            if "text" in item:
-                first_line = item["text"].split("\n")[0].strip()
-            heading_match = re.match(r'^([A-Z\s]{4,28})', first_line)
-            if heading_match:
-                h = heading_match.group(1).strip()
-                if len(h) > 3:
-                    brand_map[brand]["collections"].add(h)
-
-    result = []
-    # Always prioritize the big two for display
-    for b_name in ["Aquant", "Kohler"]:
-       if b_name in brand_map:
-            b_data = brand_map.pop(b_name)
-            cols = sorted(list(b_data["collections"])) or ["Standard Products"]
-            result.append({"brand": b_name, "collections": cols[:25]})
-
-    # Save to cache
-    search_engine.catalog_summary_cache = result
-    return result
+    body, etag = search_engine.catalog_summary()
+    return _etag_response(request, etag, body)
 
 @app.get("/catalog/browse")
-def browse_collection(brand: str, collection: str = None):
+def browse_collection(request: Request, brand: str, collection: str = None, sort: str = "", limit: int = None, cursor: str = None):
     import search_engine
     if str(brand or "").strip().lower() not in search_engine.SUPPORTED_BRANDS:
-        return {"results": []}
+        return {"results": [], "total": 0, "next_cursor": None}
 
-    results = []
-    brand_lower = brand.lower()
-    collection_lower = (collection or "").lower()
-    
-    for item in search_engine.stored_items:
-        item_brand = search_engine._item_brand(item)
-        if item_brand != brand_lower or not search_engine._is_supported_item(item):
-            continue
-            
-        # Collection / Category check
-        if not collection or collection == "All Products" or collection == "Standard Products":
-            results.append(item)
-        else:
-            item_cat = str(item.get("category", "")).lower()
-            item_text = item.get("text", "").lower()
-
-            # Kohler dashboard has fixed sections; use semantic fallbacks for empty categories.
-            if brand_lower == "kohler" and collection_lower == "toilets":
-                toilet_cats = {
-                    "toilets",
-                    "smart toilets & bidet seats",
-                    "1 pc toilets & wall hungs",
-                    "in-wall tanks",
-                }
-                if item_cat in toilet_cats or any(k in item_text for k in ["toilet", "bidet", "cleansing seat"]):
-                    results.append(item)
-            elif brand_lower == "kohler" and collection_lower == "in-wall tanks":
-                if ("wall" in item_cat and "tank" in item_cat) or any(
-                    k in item_text for k in ["in-wall", "concealed tank", "concealed cistern", "dual flush tank", "tank only"]
-                ):
-                    results.append(item)
-            elif brand_lower == "kohler" and collection_lower == "cleaning solutions":
-                if item_cat == "cleaning solutions" or any(k in item_text for k in ["cleaner", "cleaning solution", "descaler"]):
-                    results.append(item)
-            elif collection_lower in item_cat:
-                results.append(item)
-            elif not item_cat and collection_lower in item_text:
-                # Only fall back to raw text when the parser could not assign a category.
-                results.append(item)
-            
-        if len(results) >= 500:
-            break
-    
-    return {"results": search_engine.prepare_items_for_display(results)}
+    key_parts = ("browse", brand.lower(), collection or "", sort, limit, cursor or "")
+    etag = search_engine.index_etag(*key_parts)
+    if _etag_matches(request, etag):
+        return _etag_response(request, etag, b"")
+
+    cache_key = search_engine.result_cache_key(*key_parts)
+    body = search_engine.result_cache.get(cache_key)
+    if body is None:
+        try:
+            page = search_engine.browse_page(brand, collection, sort=sort, limit=limit, cursor=cursor)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        body = search_engine.result_cache.put(cache_key, search_engine.payload_json(page))
+    return _etag_response(request, etag, body)
 
 
 if __name__ == "__main__":
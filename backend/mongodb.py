@@ -1,37 +1,163 @@
+import copy
+import functools
+import hashlib
+import json
 import os
+import re
+import threading
 import time
-from datetime import datetime
+from datetime import datetime, timedelta
 import pymongo
+import pymongo.errors
 
 MONGO_URI = str(os.getenv("MONGO_URI", "")).strip()
 
-_client = None
+MONGO_SERVER_SELECTION_TIMEOUT_MS = 5000
+MONGO_RETRY_INITIAL_SECONDS = 1.0
+MONGO_RETRY_MAX_SECONDS = 60.0
 
-def get_db():
-    global _client
-    if not MONGO_URI:
-        return None
-    if _client is None:
+
+class _MongoConnection:
+    """
+    Shared MongoClient with a cached health state and a circuit breaker.
+
+    The first get_db() connects synchronously. After a failed connect or a
+    connectivity error on an operation the circuit opens: get_db() returns
+    None at once while a background thread pings with exponential backoff
+    and closes the circuit when MongoDB answers again.
+    """
+
+    def __init__(self, uri: str):
+        self.uri = uri
+        self.client = None
+        self.state = "disabled" if not uri else "idle"
+        self.last_error = ""
+        self.last_success_at = None
+        self.last_failure_at = None
+        self.failures = 0
+        self.retry_delay = MONGO_RETRY_INITIAL_SECONDS
+        self.next_retry_at = None
+        self._lock = threading.Lock()
+        self._reconnecting = False
+
+    def _ping(self):
+        client = self.client
+        created = client is None
+        if created:
+            client = pymongo.MongoClient(self.uri, serverSelectionTimeoutMS=MONGO_SERVER_SELECTION_TIMEOUT_MS)
+        try:
+            client.admin.command("ping")
+        except Exception:
+            if created:
+                client.close()
+            raise
+        return client
+
+    def _connected(self, client):
+        with self._lock:
+            self.client = client
+            self.state = "connected"
+            self.failures = 0
+            self.retry_delay = MONGO_RETRY_INITIAL_SECONDS
+            self.next_retry_at = None
+            self.last_success_at = time.time()
+
+    def _open(self, error):
+        with self._lock:
+            self.state = "open"
+            self.failures += 1
+            self.last_error = str(error)
+            self.last_failure_at = time.time()
+            if self._reconnecting:
+                return
+            self._reconnecting = True
+        threading.Thread(target=self._reconnect_loop, name="mongodb-reconnect", daemon=True).start()
+
+    def _reconnect_loop(self):
+        while True:
+            with self._lock:
+                delay = self.retry_delay
+                self.next_retry_at = time.time() + delay
+            time.sleep(delay)
+            try:
+                client = self._ping()
+            except Exception as e:
+                with self._lock:
+                    self.failures += 1
+                    self.last_error = str(e)
+                    self.last_failure_at = time.time()
+                    self.retry_delay = min(self.retry_delay * 2, MONGO_RETRY_MAX_SECONDS)
+                continue
+            self._connected(client)
+            print("MongoDB connection restored.")
+            with self._lock:
+                self._reconnecting = False
+            return
+
+    def db(self):
+        if self.state == "connected":
+            return self.client["quotation_ai"]
+        if self.state != "idle":
+            return None
+        with self._lock:
+            first_attempt = self.state == "idle"
+            if first_attempt:
+                self.state = "connecting"
+        if not first_attempt:
+            return None
         try:
-            # Short timeout to avoid application hang if offline/invalid URI
-            _client = pymongo.MongoClient(MONGO_URI, serverSelectionTimeoutMS=5000)
-            # Trigger connection check
-            _client.admin.command('ping')
+            client = self._ping()
         except Exception as e:
             print(f"Warning: Failed to connect to MongoDB: {e}")
-            _client = None
+            self._open(e)
             return None
-    return _client["quotation_ai"]
+        self._connected(client)
+        return client["quotation_ai"]
+
+    def report(self, error):
+        """Open the circuit if error means MongoDB is unreachable."""
+        if isinstance(error, pymongo.errors.ConnectionFailure) and self.state == "connected":
+            print(f"Warning: MongoDB unreachable, failing fast until it recovers: {error}")
+            self._open(error)
+
+    def status(self) -> dict:
+        with self._lock:
+            return {
+                "configured": bool(self.uri),
+                "state": self.state,
+                "consecutive_failures": self.failures,
+                "last_error": self.last_error,
+                "last_success_at": self.last_success_at,
+                "last_failure_at": self.last_failure_at,
+                "next_retry_in": round(max(0.0, self.next_retry_at - time.time()), 1) if self.next_retry_at else None,
+            }
+
+
+_connection = _MongoConnection(MONGO_URI)
+
+
+def get_db():
+    return _connection.db()
 
 def is_enabled() -> bool:
-    if not MONGO_URI:
-        return False
-    try:
-        db = get_db()
-        return db is not None
-    except Exception:
-        return False
+    return get_db() is not None
+
+def connection_status() -> dict:
+    return _connection.status()
 
+
+def _guarded(operation):
+    """Let connectivity errors from an operation open the circuit before they propagate."""
+    @functools.wraps(operation)
+    def wrapper(*args, **kwargs):
+        try:
+            return operation(*args, **kwargs)
+        except Exception as e:
+            _connection.report(e)
+            raise
+    return wrapper
+
+@_guarded
 def save_quote(quote_id: str, data: dict):
     db = get_db()
     if db is None:
@@ -41,13 +167,26 @@ def save_quote(quote_id: str, data: dict):
     doc["updated_at"] = datetime.utcnow()
     db["quotes"].replace_one({"_id": quote_id}, doc, upsert=True)
 
-def list_quotes():
+LIST_SORT_FIELDS = {"date": "updated_at", "client": "client_name", "total": "grand_total"}
+
+@_guarded
+def list_quotes(search: str = "", sort: str = "date", order: str = "desc", offset: int = 0, limit: int = None):
+    """(page of quote summaries, total matching), filtered by client name or id."""
     db = get_db()
     if db is None:
-        return []
-    cursor = db["quotes"].find({}, {"client_name": 1, "grand_total": 1, "updated_at": 1})
-    cursor = cursor.sort("updated_at", pymongo.DESCENDING)
-    
+        return [], 0
+    query = {}
+    needle = str(search or "").strip()
+    if needle:
+        pattern = {"$regex": re.escape(needle), "$options": "i"}
+        query = {"$or": [{"client_name": pattern}, {"_id": pattern}]}
+    direction = pymongo.ASCENDING if order == "asc" else pymongo.DESCENDING
+    cursor = db["quotes"].find(query, {"client_name": 1, "grand_total": 1, "updated_at": 1})
+    cursor = cursor.sort([(LIST_SORT_FIELDS.get(sort, "updated_at"), direction), ("_id", direction)])
+    cursor = cursor.skip(max(0, int(offset or 0)))
+    if limit:
+        cursor = cursor.limit(int(limit))
+
     details = []
     for doc in cursor:
         updated_at = doc.get("updated_at")
@@ -58,8 +197,9 @@ def list_quotes():
             "total": doc.get("grand_total", 0),
             "date": ts
         })
-    return details
+    return details, db["quotes"].count_documents(query)
 
+@_guarded
 def load_quote(quote_id: str):
     db = get_db()
     if db is None:
@@ -70,6 +210,7 @@ def load_quote(quote_id: str):
         doc.pop("updated_at", None)
     return doc
 
+@_guarded
 def delete_quote(quote_id: str) -> bool:
     db = get_db()
     if db is None:
@@ -77,27 +218,242 @@ def delete_quote(quote_id: str) -> bool:
     res = db["quotes"].delete_one({"_id": quote_id})
     return res.deleted_count > 0
 
-def load_search_index():
+# The search index is stored content-addressed across three collections so
+# no document approaches the 16 MB BSON limit and unchanged parts are never
+# re-sent:
+#   search_index_items   {_id: item hash, item}
+#   search_index_chunks  {_id: chunk hash, kind: "items", members: [item hash, ...]}
+#                        {_id: chunk hash, kind: "postings", postings: [[keyword, [ids]], ...]}
+#   search_index         {_id: "manifest", generation, content_hash, item_chunks, posting_chunks, ...}
+# Writers mark the items/chunks they reference, add the missing ones, and
+# swap the manifest last, only if no other writer swapped it in between.
+# Documents no manifest has referenced for INDEX_GC_GRACE_SECONDS are then
+# removed, so a concurrent writer's or reader's documents are not pulled
+# out from under it; readers still retry if a chunk disappears.
+INDEX_MANIFEST_ID = "manifest"
+INDEX_LEGACY_ID = "global"
+INDEX_ITEMS_PER_CHUNK = 500
+INDEX_KEYWORDS_PER_CHUNK = 4000
+_INDEX_ID_BATCH = 1000
+INDEX_GC_GRACE_SECONDS = 600
+
+# Items and chunks from earlier loads, by hash, so a new generation only
+# transfers what changed. Items are copied on assembly because the search
+# engine enriches the dicts it is given in place.
+_index_item_cache = {}
+_index_chunk_cache = {}
+
+
+def _content_hash(value) -> str:
+    encoded = json.dumps(value, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str)
+    return hashlib.sha1(encoded.encode("utf-8")).hexdigest()
+
+
+def _fetch_by_ids(collection, ids):
+    found = {}
+    ids = list(ids)
+    for start in range(0, len(ids), _INDEX_ID_BATCH):
+        for doc in collection.find({"_id": {"$in": ids[start:start + _INDEX_ID_BATCH]}}):
+            found[doc.pop("_id")] = doc
+    return found
+
+
+def _insert_missing(collection, docs, now):
+    """
+    Mark content-addressed docs as referenced at `now` and insert those not
+    stored yet; returns how many were written. Marking first means garbage
+    collection either skips a doc or has removed it before the existence check.
+    """
+    if not docs:
+        return 0
+    existing = set()
+    ids = list(docs)
+    for start in range(0, len(ids), _INDEX_ID_BATCH):
+        batch = ids[start:start + _INDEX_ID_BATCH]
+        collection.update_many({"_id": {"$in": batch}}, {"$set": {"referenced_at": now}})
+        existing.update(doc["_id"] for doc in collection.find({"_id": {"$in": batch}}, {"_id": 1}))
+    missing = [dict(doc, _id=doc_id, referenced_at=now) for doc_id, doc in docs.items() if doc_id not in existing]
+    for start in range(0, len(missing), _INDEX_ID_BATCH):
+        try:
+            collection.insert_many(missing[start:start + _INDEX_ID_BATCH], ordered=False)
+        except pymongo.errors.BulkWriteError:
+            # Another writer stored the same content-addressed doc first.
+            pass
+    return len(missing)
+
+
+@_guarded
+def load_search_index_manifest():
+    """
+    The stored index manifest (generation, content_hash, chunk lists), a
+    stand-in for a pre-manifest single-document index, or None.
+    """
+    db = get_db()
+    if db is None:
+        return None
+    manifest = db["search_index"].find_one({"_id": INDEX_MANIFEST_ID})
+    if manifest:
+        return manifest
+    if db["search_index"].find_one({"_id": INDEX_LEGACY_ID}, {"_id": 1}):
+        return {"_id": INDEX_LEGACY_ID, "generation": 0, "content_hash": "legacy", "legacy": True}
+    return None
+
+
+def _assemble_search_index(db, manifest):
+    chunk_ids = list(manifest.get("item_chunks", [])) + list(manifest.get("posting_chunks", []))
+    missing_chunks = [chunk_id for chunk_id in chunk_ids if chunk_id not in _index_chunk_cache]
+    fetched_chunks = _fetch_by_ids(db["search_index_chunks"], missing_chunks)
+    if len(fetched_chunks) != len(set(missing_chunks)):
+        return None
+    _index_chunk_cache.update(fetched_chunks)
+
+    item_ids = []
+    for chunk_id in manifest.get("item_chunks", []):
+        item_ids.extend(_index_chunk_cache[chunk_id]["members"])
+    missing_items = {item_id for item_id in item_ids if item_id not in _index_item_cache}
+    fetched_items = _fetch_by_ids(db["search_index_items"], missing_items)
+    if len(fetched_items) != len(missing_items):
+        return None
+    _index_item_cache.update((item_id, doc["item"]) for item_id, doc in fetched_items.items())
+
+    keyword_index = {}
+    for chunk_id in manifest.get("posting_chunks", []):
+        for keyword, ids in _index_chunk_cache[chunk_id]["postings"]:
+            keyword_index[keyword] = list(ids)
+
+    # Only what the current generation references stays cached.
+    live_chunks = set(chunk_ids)
+    for chunk_id in [chunk_id for chunk_id in _index_chunk_cache if chunk_id not in live_chunks]:
+        del _index_chunk_cache[chunk_id]
+    live_items = set(item_ids)
+    for item_id in [item_id for item_id in _index_item_cache if item_id not in live_items]:
+        del _index_item_cache[item_id]
+
+    print(
+        f"MongoDB index generation {manifest.get('generation')}: fetched "
+        f"{len(fetched_chunks)}/{len(chunk_ids)} chunks and {len(fetched_items)}/{len(item_ids)} items"
+    )
+    return {
+        "stored_items": [copy.deepcopy(_index_item_cache[item_id]) for item_id in item_ids],
+        "keyword_index": keyword_index,
+        "generation": manifest.get("generation"),
+        "content_hash": manifest.get("content_hash"),
+    }
+
+
+def load_search_index(manifest=None):
+    """
+    {"stored_items", "keyword_index", "generation", "content_hash"} for the
+    stored index, fetching only items and chunks not seen in earlier loads.
+    """
     db = get_db()
     if db is None:
         return None
     try:
-        doc = db["search_index"].find_one({"_id": "global"})
-        if doc:
-            doc.pop("_id", None)
-        return doc
+        for _ in range(3):
+            manifest = manifest or load_search_index_manifest()
+            if manifest is None:
+                return None
+            if manifest.get("legacy"):
+                doc = db["search_index"].find_one({"_id": INDEX_LEGACY_ID})
+                if doc:
+                    doc.pop("_id", None)
+                    doc.update(generation=0, content_hash="legacy")
+                return doc
+            data = _assemble_search_index(db, manifest)
+            if data is not None:
+                return data
+            # A newer save replaced chunks this manifest referenced; read the new one.
+            manifest = None
+        print("Warning: MongoDB search index kept changing while loading; giving up")
+        return None
     except Exception as e:
+        _connection.report(e)
         print(f"Warning: Failed to load search index from MongoDB: {e}")
         return None
 
 def save_search_index(data: dict):
+    """
+    Store the index, writing only items and chunks that are not stored yet.
+    Returns the stored {"generation", "content_hash"} (unchanged content keeps
+    its generation), or None if the save failed.
+    """
     db = get_db()
     if db is None:
-        return
+        return None
     try:
-        doc = dict(data)
-        doc["_id"] = "global"
-        db["search_index"].replace_one({"_id": "global"}, doc, upsert=True)
-        print("Successfully saved search index to MongoDB!")
+        items = data.get("stored_items", [])
+        postings = data.get("keyword_index", {})
+
+        item_docs = {}
+        item_ids = []
+        for item in items:
+            item_id = _content_hash(item)
+            item_ids.append(item_id)
+            item_docs.setdefault(item_id, {"item": item})
+
+        chunk_docs = {}
+        item_chunks = []
+        for start in range(0, len(item_ids), INDEX_ITEMS_PER_CHUNK):
+            members = item_ids[start:start + INDEX_ITEMS_PER_CHUNK]
+            chunk_id = _content_hash(["items", members])
+            item_chunks.append(chunk_id)
+            chunk_docs[chunk_id] = {"kind": "items", "members": members}
+
+        posting_chunks = []
+        keywords = sorted(postings)
+        for start in range(0, len(keywords), INDEX_KEYWORDS_PER_CHUNK):
+            entries = [[keyword, [int(i) for i in postings[keyword]]] for keyword in keywords[start:start + INDEX_KEYWORDS_PER_CHUNK]]
+            chunk_id = _content_hash(["postings", entries])
+            posting_chunks.append(chunk_id)
+            chunk_docs[chunk_id] = {"kind": "postings", "postings": entries}
+
+        content_hash = _content_hash([item_chunks, posting_chunks])
+        previous = db["search_index"].find_one({"_id": INDEX_MANIFEST_ID}, {"generation": 1, "content_hash": 1})
+        if previous and previous.get("content_hash") == content_hash:
+            return {"generation": previous.get("generation"), "content_hash": content_hash}
+
+        now = datetime.utcnow()
+        new_items = _insert_missing(db["search_index_items"], item_docs, now)
+        new_chunks = _insert_missing(db["search_index_chunks"], chunk_docs, now)
+        generation = int(previous.get("generation", 0) if previous else 0) + 1
+        manifest = {
+            "_id": INDEX_MANIFEST_ID,
+            "generation": generation,
+            "content_hash": content_hash,
+            "item_count": len(item_ids),
+            "item_chunks": item_chunks,
+            "posting_chunks": posting_chunks,
+            "updated_at": now,
+        }
+        if previous:
+            swapped = db["search_index"].replace_one(
+                {"_id": INDEX_MANIFEST_ID, "generation": previous.get("generation")}, manifest
+            ).matched_count == 1
+        else:
+            try:
+                db["search_index"].insert_one(manifest)
+                swapped = True
+            except pymongo.errors.DuplicateKeyError:
+                swapped = False
+        if not swapped:
+            print("Warning: another writer saved the search index first; not replacing its manifest")
+            return None
+
+        # Drop what no manifest has referenced for the grace period, and a pre-manifest index document.
+        cutoff = now - timedelta(seconds=INDEX_GC_GRACE_SECONDS)
+        for name, keep in (("search_index_chunks", chunk_docs), ("search_index_items", item_docs)):
+            db[name].delete_many({
+                "_id": {"$nin": list(keep)},
+                "$or": [{"referenced_at": {"$lt": cutoff}}, {"referenced_at": {"$exists": False}}],
+            })
+        db["search_index"].delete_one({"_id": INDEX_LEGACY_ID})
+        print(
+            f"Saved search index generation {generation} to MongoDB "
+            f"({new_items} new items, {new_chunks} new chunks)"
+        )
+        return {"generation": generation, "content_hash": content_hash}
     except Exception as e:
+        _connection.report(e)
         print(f"Warning: Failed to save search index to MongoDB: {e}")
+        return None
@@ -3,11 +3,16 @@ import os
 import re
 import hashlib
 import json
+import sys
+import multiprocessing
 from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
 
-from PIL import Image, ImageChops, ImageOps
+import numpy as np
+from PIL import Image, ImageOps
 
 import cloud_storage
+import image_uploader
 
 RESAMPLING = getattr(Image, "Resampling", Image)
 
@@ -257,20 +262,27 @@ def _image_aspect_ratio(width, height):
     return max(int(width or 0), int(height or 0)) / short_side
 
 
-def _white_ratio(image):
-    sample = image.convert("RGB").resize((64, 64))
-    total = 64 * 64
-    bright = 0
-    for r, g, b in sample.getdata():
-        if r >= 243 and g >= 243 and b >= 243:
-            bright += 1
-    return bright / total
+def _channel_min(pixels):
+    """Darkest channel per pixel of an RGB array, as a 2-D uint8 array."""
+    return np.minimum(np.minimum(pixels[..., 0], pixels[..., 1]), pixels[..., 2])
 
 
-def _trim_possible_caption_band(image):
-    width, height = image.size
+def _caption_band_cutoff(white_rows, width):
+    """
+    Row at which a mostly-white caption band starts at the bottom of the image,
+    or the full height when there is none.
+    """
+    height = len(white_rows)
     if width < 80 or height < 120:
-        return image
+        return height
+
+    # Prefix sums make each band's white ratio a constant-time lookup.
+    cumulative = np.concatenate(([0], np.cumsum(white_rows, dtype=np.int64)))
+
+    def band_white_ratio(top, bottom):
+        if bottom <= top:
+            return 0.0
+        return float(cumulative[bottom] - cumulative[top]) / ((bottom - top) * width)
 
     candidates = (0.92, 0.88, 0.84)
     for cutoff_ratio in candidates:
@@ -278,41 +290,55 @@ def _trim_possible_caption_band(image):
         if cutoff <= int(height * 0.6):
             continue
 
-        bottom_band = image.crop((0, cutoff, width, height))
-        upper_band = image.crop((0, max(0, cutoff - max(24, height // 8)), width, cutoff))
-        bottom_white = _white_ratio(bottom_band)
-        upper_white = _white_ratio(upper_band) if upper_band.size[1] > 0 else 0.0
+        bottom_white = band_white_ratio(cutoff, height)
+        upper_white = band_white_ratio(max(0, cutoff - max(24, height // 8)), cutoff)
 
         if bottom_white >= 0.86 and bottom_white >= upper_white + 0.12:
-            return image.crop((0, 0, width, cutoff))
+            return cutoff
 
-    return image
+    return height
 
 
-def _trim_white_border(image):
-    rgb_image = image.convert("RGB")
-    bg = Image.new("RGB", rgb_image.size, "white")
-    diff = ImageChops.difference(rgb_image, bg)
-    bbox = diff.getbbox()
+def _content_bbox(darkest):
+    """Bounding box (left, top, right, bottom) of the pixels that are not pure white."""
+    rows = np.flatnonzero(darkest.min(axis=1) < 255)
+    if not rows.size:
+        return None
+    cols = np.flatnonzero(darkest[rows[0]:rows[-1] + 1].min(axis=0) < 255)
+    return int(cols[0]), int(rows[0]), int(cols[-1]) + 1, int(rows[-1]) + 1
+
+
+def _product_crop_box(pixels):
+    """
+    Crop box for a rendered product image: drop a bottom caption band, then
+    trim the white border around what is left, keeping a small margin.
+    """
+    height, width = pixels.shape[:2]
+    darkest = _channel_min(pixels)
+    # A pixel is near-white when every channel is >= 243.
+    white_rows = np.count_nonzero(darkest >= 243, axis=1)
+    cutoff = _caption_band_cutoff(white_rows, width)
+    bbox = _content_bbox(darkest[:cutoff])
     if not bbox:
-        return rgb_image
+        return 0, 0, width, cutoff
 
     left, top, right, bottom = bbox
     margin_x = max(6, int((right - left) * 0.04))
     margin_y = max(6, int((bottom - top) * 0.04))
-    return rgb_image.crop((
+    return (
         max(0, left - margin_x),
         max(0, top - margin_y),
-        min(rgb_image.width, right + margin_x),
-        min(rgb_image.height, bottom + margin_y),
-    ))
+        min(width, right + margin_x),
+        min(cutoff, bottom + margin_y),
+    )
 
 
 def _render_hd_product_image(image_path):
     with Image.open(image_path) as image:
         rgb_image = image.convert("RGB")
-        rgb_image = _trim_possible_caption_band(rgb_image)
-        rgb_image = _trim_white_border(rgb_image)
+        # Decode once; all trimming heuristics work on the same pixel array.
+        crop_box = _product_crop_box(np.asarray(rgb_image))
+        rgb_image = rgb_image.crop(crop_box)
         content_width, content_height = rgb_image.size
 
         canvas = Image.new("RGB", (IMAGE_CANVAS_SIZE, IMAGE_CANVAS_SIZE), "white")
@@ -972,7 +998,254 @@ def _get_extraction_cache_path(pdf_path):
     return os.path.join(cache_dir, cache_name)
 
 
-def extract_content(pdf_path, max_pages=None):
+PAGE_CACHE_VERSION = 1
+last_page_cache_stats = {}
+
+
+def _page_cache_key(doc, page, page_num, brand, pdf_name):
+    """
+    Content address for one page: its drawing/text streams, embedded images
+    and fonts, plus everything extract_content mixes into that page's output.
+    Cross-reference numbers are left out so an otherwise identical page in a
+    revised PDF still hashes the same.
+    """
+    h = hashlib.sha1()
+    h.update(repr((PAGE_CACHE_VERSION, IMAGE_GENERATION_VERSION, brand, pdf_name, page_num)).encode("utf-8"))
+    h.update(repr((tuple(page.rect), page.rotation)).encode("utf-8"))
+    h.update(page.read_contents())
+    for img in page.get_images(full=True):
+        h.update(repr(img[2:9]).encode("utf-8"))
+        h.update(doc.xref_stream_raw(img[0]) or b"")
+    for xobject in page.get_xobjects():
+        h.update(doc.xref_stream_raw(xobject[0]) or b"")
+    for font in page.get_fonts(full=True):
+        h.update(repr(font[1:6]).encode("utf-8"))
+    return h.hexdigest()
+
+
+def _page_cache_path(key):
+    cache_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "cache", "pages", key[:2])
+    return os.path.join(cache_dir, f"{key}.json")
+
+
+def _load_page_cache_entry(key, image_dir):
+    path = _page_cache_path(key)
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            entry = json.load(f)
+    except Exception as e:
+        print(f"Page cache read error for {key}: {e}")
+        return None
+
+    # Cached products point at rendered files; only trust them while they exist.
+    for record in entry.get("images", []):
+        img_path = str(record.get("path") or "")
+        if img_path.startswith("/static/images/"):
+            local_path = os.path.join(image_dir, img_path[len("/static/images/"):])
+            if not os.path.exists(local_path):
+                return None
+    return entry
+
+
+def _save_page_cache_entry(key, entry):
+    path = _page_cache_path(key)
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(entry, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+    except Exception as e:
+        print(f"Page cache write error for {key}: {e}")
+
+
+def _extract_page_images(page, page_num, pdf_prefix, image_dir):
+    """Rasterize, trim and publish every product image on one page."""
+    # ── 1. Extract images with their bounding boxes ──────────────────
+    img_records = []
+    for img_index, img in enumerate(page.get_images(full=True)):
+        xref = img[0]
+        rects = page.get_image_rects(xref)
+        rect = rects[0] if rects else None
+        if rect is None:
+            continue
+
+        width = img[2]
+        height = img[3]
+        display_width = rect.width
+        display_height = rect.height
+        pixel_area = width * height
+        display_area = display_width * display_height
+        if (
+            max(width, height) < 20
+            and max(display_width, display_height) < 18
+        ) or (
+            pixel_area < 1200
+            and display_area < 250
+        ):
+            continue
+
+        try:
+            img_filename = f"{pdf_prefix}_p{page_num}_i{img_index}.jpg"
+            img_path = os.path.join(image_dir, img_filename)
+            image_meta = None
+            if not os.path.exists(img_path):
+                clip_rect = fitz.Rect(rect.x0, rect.y0, rect.x1, rect.y1)
+                zoom = 3.2 if max(display_width, display_height) < 180 else 2.6
+                pix = page.get_pixmap(matrix=fitz.Matrix(zoom, zoom), clip=clip_rect, alpha=False)
+                pix.save(img_path)
+                pix = None
+                image_meta = _render_hd_product_image(img_path)
+            else:
+                image_meta = _render_hd_product_image(img_path)
+
+            img_records.append({
+                "path": f"/static/images/{img_filename}",
+                "rect": rect,
+                "image_meta": image_meta or {},
+            })
+        except Exception:
+            continue
+
+    # ── 1.2. Fallback for inline images (e.g. pg 53 ceiling showers) ─────
+    try:
+        d = page.get_text("dict")
+        for i, b in enumerate(d.get("blocks", [])):
+            if b.get("type") == 1: # Image block
+                rect = fitz.Rect(b["bbox"])
+                # Check for overlap with existing images to avoid duplicates
+                is_duplicate = False
+                for existing in img_records:
+                    if rect.intersects(existing["rect"]) and rect.intersect(existing["rect"]).area > rect.area * 0.8:
+                        is_duplicate = True
+                        break
+                if is_duplicate:
+                    continue
+                    
+                img_filename = f"{pdf_prefix}_p{page_num}_block{i}.jpg"
+                img_path = os.path.join(image_dir, img_filename)
+                image_meta = None
+                if not os.path.exists(img_path):
+                    zoom = 2.8
+                    pix = page.get_pixmap(matrix=fitz.Matrix(zoom, zoom), clip=rect, alpha=False)
+                    pix.save(img_path)
+                    pix = None
+                    image_meta = _render_hd_product_image(img_path)
+                else:
+                    image_meta = _render_hd_product_image(img_path)
+                img_records.append({
+                    "path": f"/static/images/{img_filename}",
+                    "rect": rect,
+                    "image_meta": image_meta or {},
+                })
+    except Exception:
+        pass
+
+    return img_records
+
+
+def _queue_image_uploads(content_list, image_dir):
+    """Hand locally published product images to the background cloud uploader."""
+    if not cloud_storage.is_enabled():
+        return
+    uploads = {}
+    for item in content_list:
+        for img_path in item.get("images") or []:
+            if isinstance(img_path, str) and img_path.startswith("/static/images/"):
+                img_filename = img_path[len("/static/images/"):]
+                uploads[img_path] = (img_path, os.path.join(image_dir, img_filename), f"catalog/{img_filename}")
+    if uploads:
+        queued = image_uploader.enqueue(uploads.values())
+        if queued:
+            print(f"   [UPLOAD] Queued {queued} catalog images for cloud storage")
+
+
+_worker_doc = None
+
+
+def _init_page_image_worker(pdf_path):
+    global _worker_doc
+    _worker_doc = fitz.open(pdf_path)
+
+
+def _extract_page_images_in_worker(page_num, pdf_prefix, image_dir):
+    img_records = _extract_page_images(_worker_doc[page_num], page_num, pdf_prefix, image_dir)
+    # fitz.Rect is rebuilt in the parent; plain tuples pickle cleanly.
+    for record in img_records:
+        record["rect"] = tuple(record["rect"])
+    return img_records
+
+
+def _extraction_workers(workers=None):
+    if workers is None:
+        raw = os.getenv("PDF_EXTRACT_WORKERS", "").strip()
+        if raw:
+            try:
+                workers = int(raw)
+            except ValueError:
+                print(f"Warning: invalid PDF_EXTRACT_WORKERS={raw!r}, extracting serially")
+                workers = 1
+        else:
+            # Extraction runs inside the web server; extra processes are opt-in.
+            workers = 1
+    return max(1, int(workers))
+
+
+def _iter_page_images(pdf_path, doc, num_pages, pdf_prefix, image_dir, workers, cached_images=None):
+    """
+    Yield each page's image records in page order. Pages in `cached_images`
+    are not rendered again. With more than one worker the remaining pages are
+    rendered in a process pool (one fitz document per worker) while the
+    caller parses text for the pages already returned.
+    """
+    cached_images = cached_images or {}
+    pending = [page_num for page_num in range(num_pages) if page_num not in cached_images]
+
+    def cached_records(page_num):
+        return [
+            dict(record, rect=fitz.Rect(record["rect"]))
+            for record in cached_images[page_num]
+        ]
+
+    if workers <= 1 or len(pending) < 2:
+        for page_num in range(num_pages):
+            if page_num in cached_images:
+                yield cached_records(page_num)
+            else:
+                yield _extract_page_images(doc[page_num], page_num, pdf_prefix, image_dir)
+        return
+
+    # Spawned, not forked: the server process has live threads and sockets.
+    with ProcessPoolExecutor(
+        max_workers=min(workers, len(pending)),
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_init_page_image_worker,
+        initargs=(pdf_path,),
+    ) as executor:
+        futures = {
+            page_num: executor.submit(_extract_page_images_in_worker, page_num, pdf_prefix, image_dir)
+            for page_num in pending
+        }
+        for page_num in range(num_pages):
+            if page_num in cached_images:
+                yield cached_records(page_num)
+                continue
+            future = futures[page_num]
+            try:
+                img_records = future.result()
+            except Exception as e:
+                print(f"Warning: image worker failed on page {page_num + 1}, retrying serially: {e}")
+                yield _extract_page_images(doc[page_num], page_num, pdf_prefix, image_dir)
+                continue
+            for record in img_records:
+                record["rect"] = fitz.Rect(record["rect"])
+            yield img_records
+
+
+def extract_content(pdf_path, max_pages=None, workers=None):
+    global last_page_cache_stats
     cache_path = _get_extraction_cache_path(pdf_path)
     if os.path.exists(cache_path) and not max_pages:
         try:
@@ -980,6 +1253,7 @@ def extract_content(pdf_path, max_pages=None):
                 cached_data = json.load(f)
                 if cached_data:
                     print(f"--- USING CACHED EXTRACTION FOR {os.path.basename(pdf_path)} ({len(cached_data)} items) ---")
+                    _queue_image_uploads(cached_data, os.path.join(os.path.dirname(os.path.abspath(__file__)), "static", "images"))
                     return cached_data
         except Exception as e:
             print(f"Cache read error for {pdf_path}: {e}")
@@ -1003,112 +1277,60 @@ def extract_content(pdf_path, max_pages=None):
     current_category = None
     brand = "Aquant" if "aquant" in pdf_name.lower() else "Kohler" if "kohler" in pdf_name.lower() else "Plumber" if "plumber" in pdf_name.lower() else "Generic"
 
-    for page_num in range(num_pages):
-        page = doc[page_num]
-
-        # ── 1. Extract images with their bounding boxes ──────────────────
-        img_records = []
-        for img_index, img in enumerate(page.get_images(full=True)):
-            xref = img[0]
-            rects = page.get_image_rects(xref)
-            rect = rects[0] if rects else None
-            if rect is None:
-                continue
-
-            width = img[2]
-            height = img[3]
-            display_width = rect.width
-            display_height = rect.height
-            pixel_area = width * height
-            display_area = display_width * display_height
-            if (
-                max(width, height) < 20
-                and max(display_width, display_height) < 18
-            ) or (
-                pixel_area < 1200
-                and display_area < 250
-            ):
-                continue
-
-            try:
-                img_filename = f"{pdf_prefix}_p{page_num}_i{img_index}.jpg"
-                img_path = os.path.join(image_dir, img_filename)
-                image_meta = None
-                if not os.path.exists(img_path):
-                    clip_rect = fitz.Rect(rect.x0, rect.y0, rect.x1, rect.y1)
-                    zoom = 3.2 if max(display_width, display_height) < 180 else 2.6
-                    pix = page.get_pixmap(matrix=fitz.Matrix(zoom, zoom), clip=clip_rect, alpha=False)
-                    pix.save(img_path)
-                    pix = None
-                    image_meta = _render_hd_product_image(img_path)
-                else:
-                    image_meta = _render_hd_product_image(img_path)
+    # Page-level cache: unchanged pages of a revised catalog reuse their
+    # rendered images and, when the carried-over category also matches,
+    # their extracted products.
+    page_keys = [_page_cache_key(doc, doc[n], n, brand, pdf_name) for n in range(num_pages)]
+    page_entries = [_load_page_cache_entry(key, image_dir) for key in page_keys]
+    cached_images = {n: entry["images"] for n, entry in enumerate(page_entries) if entry}
+    page_stats = {"pages": num_pages, "reused": 0, "reparsed": 0, "extracted": num_pages - len(cached_images)}
+    pending_page = None
+
+    def store_pending_page(category_out):
+        if not pending_page:
+            return
+        entry = pending_page["entry"]
+        try:
+            products = json.loads(json.dumps(content_list[pending_page["start"]:], ensure_ascii=False))
+        except (TypeError, ValueError) as e:
+            print(f"Page cache skipped for a page of {pdf_name}: {e}")
+            return
+        entry["products"][pending_page["category_in"]] = {
+            "products": products,
+            "category_out": category_out,
+        }
+        _save_page_cache_entry(pending_page["key"], entry)
 
-                public_path = f"/static/images/{img_filename}"
-                if cloud_storage.is_enabled():
-                    try:
-                        public_path = cloud_storage.upload_file(
-                            cloud_storage.PRODUCT_IMAGES_BUCKET,
-                            f"catalog/{img_filename}",
-                            img_path,
-                            "image/jpeg",
-                        )
-                    except Exception:
-                        public_path = f"/static/images/{img_filename}"
+    page_images = _iter_page_images(
+        pdf_path, doc, num_pages, pdf_prefix, image_dir, _extraction_workers(workers), cached_images
+    )
+    for page_num, img_records in enumerate(page_images):
+        store_pending_page(current_category)
+        pending_page = None
+        page = doc[page_num]
 
-                img_records.append({
-                    "path": public_path,
-                    "rect": rect,
-                    "image_meta": image_meta or {},
-                })
-            except Exception:
-                continue
+        entry = page_entries[page_num]
+        category_in = json.dumps(current_category)
+        reused = entry["products"].get(category_in) if entry else None
+        if reused is not None:
+            content_list.extend(reused["products"])
+            current_category = reused["category_out"]
+            page_stats["reused"] += 1
+            continue
+        if entry:
+            page_stats["reparsed"] += 1
+        else:
+            entry = {
+                "images": [dict(record, rect=list(record["rect"])) for record in img_records],
+                "products": {},
+            }
+        pending_page = {
+            "key": page_keys[page_num],
+            "entry": entry,
+            "category_in": category_in,
+            "start": len(content_list),
+        }
 
-        # ── 1.2. Fallback for inline images (e.g. pg 53 ceiling showers) ─────
-        try:
-            d = page.get_text("dict")
-            for i, b in enumerate(d.get("blocks", [])):
-                if b.get("type") == 1: # Image block
-                    rect = fitz.Rect(b["bbox"])
-                    # Check for overlap with existing images to avoid duplicates
-                    is_duplicate = False
-                    for existing in img_records:
-                        if rect.intersects(existing["rect"]) and rect.intersect(existing["rect"]).area > rect.area * 0.8:
-                            is_duplicate = True
-                            break
-                    if is_duplicate:
-                        continue
-                        
-                    img_filename = f"{pdf_prefix}_p{page_num}_block{i}.jpg"
-                    img_path = os.path.join(image_dir, img_filename)
-                    image_meta = None
-                    if not os.path.exists(img_path):
-                        zoom = 2.8
-                        pix = page.get_pixmap(matrix=fitz.Matrix(zoom, zoom), clip=rect, alpha=False)
-                        pix.save(img_path)
-                        pix = None
-                        image_meta = _render_hd_product_image(img_path)
-                    else:
-                        image_meta = _render_hd_product_image(img_path)
-                    public_path = f"/static/images/{img_filename}"
-                    if cloud_storage.is_enabled():
-                        try:
-                            public_path = cloud_storage.upload_file(
-                                cloud_storage.PRODUCT_IMAGES_BUCKET,
-                                f"catalog/{img_filename}",
-                                img_path,
-                                "image/jpeg",
-                            )
-                        except Exception:
-                            public_path = f"/static/images/{img_filename}"
-
-                    img_records.append({
-                        "path": public_path,
-                        "rect": rect,
-                        "image_meta": image_meta or {},
-                    })
-        except Exception:
-            pass
         def map_kohler_category(text):
             t = text.upper()
             if "FRENCH GOLD" in t: return "French Gold"
@@ -2230,6 +2452,14 @@ def extract_content(pdf_path, max_pages=None):
             if "_price_source" in p: del p["_price_source"]
             content_list.append(p)
 
+    store_pending_page(current_category)
+    last_page_cache_stats = page_stats
+    print(
+        f"   [PAGE CACHE] {page_stats['reused']} pages reused, "
+        f"{page_stats['reparsed']} re-parsed with cached images, "
+        f"{page_stats['extracted']} re-extracted (of {page_stats['pages']})"
+    )
+
     # ── POST-PROCESSING: Inherit missing images & prices from siblings ──
     from collections import defaultdict as _dd
 
@@ -2265,6 +2495,8 @@ def extract_content(pdf_path, max_pages=None):
     if _inherit_count_img or _inherit_count_price:
         print(f"   [INHERIT] Fixed {_inherit_count_img} missing images, {_inherit_count_price} missing prices from siblings")
 
+    _queue_image_uploads(content_list, image_dir)
+
     # Save to cache if complete extraction
     if content_list and not max_pages:
         try:
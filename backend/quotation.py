@@ -1,6 +1,12 @@
+import asyncio
+import io
+import multiprocessing
 import os
 import sys
+import threading
 import urllib.request
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from datetime import datetime
 from html import escape
 from reportlab.platypus import SimpleDocTemplate, Paragraph, Table, TableStyle, Spacer, Image as RLImage, HRFlowable, Flowable
@@ -9,6 +15,8 @@ from reportlab.lib.pagesizes import A4
 from reportlab.lib import colors
 
 from app_paths import resolve_data_dir
+import quote_thumbnails
+import remote_image_cache
 
 # ── Company constants ──────────────────────────────────────────────────────────
 COMPANY_NAME     = "Shreeji Ceramica"
@@ -83,22 +91,44 @@ def _find_image_by_basename(root_dir, filename):
     return ""
 
 
-def _resolve_item_image(base_dir, item):
-    img_p = str(item.get("image") or "").strip()
-    
-    # Check if the image is a placeholder, page-extracted, or empty
+def _quote_data_dirs(base_dir):
+    is_frozen = getattr(sys, "frozen", False)
+    exe_dir = os.path.dirname(os.path.abspath(sys.executable)) if is_frozen else base_dir
+    return exe_dir, resolve_data_dir(is_frozen, exe_dir)
+
+
+def _remote_image_cache(data_dir):
+    return remote_image_cache.cache_for(os.path.join(data_dir, "cache", "quote_images"))
+
+
+def _is_placeholder_image(img_p):
+    """Placeholder, page-extracted, or empty image references render as "No Image"."""
     import re
-    is_placeholder_or_pe = (
+    return (
         not img_p or
         "image_not_found" in img_p.lower() or
         "image not found" in img_p.lower() or
         bool(re.search(r'_p\d+_i\d+|Page', img_p, re.IGNORECASE))
     )
 
-    if not is_placeholder_or_pe:
-        is_frozen = getattr(sys, "frozen", False)
-        exe_dir = os.path.dirname(os.path.abspath(sys.executable)) if is_frozen else base_dir
-        data_dir = resolve_data_dir(is_frozen, exe_dir)
+
+def _prefetch_remote_images(base_dir, items):
+    """Download all remote item images for a quote concurrently before layout."""
+    images = (str(item.get("image") or "").strip() for item in items)
+    urls = [
+        img_p for img_p in images
+        if img_p.startswith(("http://", "https://")) and not _is_placeholder_image(img_p)
+    ]
+    if urls:
+        _, data_dir = _quote_data_dirs(base_dir)
+        _remote_image_cache(data_dir).prefetch(urls)
+
+
+def _resolve_item_image(base_dir, item):
+    img_p = str(item.get("image") or "").strip()
+
+    if not _is_placeholder_image(img_p):
+        exe_dir, data_dir = _quote_data_dirs(base_dir)
 
         candidate_paths = []
         if img_p.startswith("/static/images/"):
@@ -123,23 +153,18 @@ def _resolve_item_image(base_dir, item):
         elif os.path.isabs(img_p):
             candidate_paths.append(img_p)
         elif img_p.startswith("http://") or img_p.startswith("https://"):
-            cache_dir = os.path.join(data_dir, "static", "images", "_quote_cache")
-            os.makedirs(cache_dir, exist_ok=True)
-            filename = os.path.basename(img_p.split("?", 1)[0]) or f"quote_image_{int(datetime.now().timestamp())}.jpg"
-            cached_path = os.path.join(cache_dir, filename)
-            if not os.path.exists(cached_path):
-                try:
-                    urllib.request.urlretrieve(img_p, cached_path)
-                except Exception:
-                    cached_path = ""
+            cached_path = _remote_image_cache(data_dir).get(img_p)
             if cached_path:
                 candidate_paths.append(cached_path)
 
+        thumb_dir = os.path.join(data_dir, "cache", quote_thumbnails.THUMBNAIL_DIR_NAME)
         for real_p in candidate_paths:
             if real_p and os.path.exists(real_p):
                 try:
                     if os.path.getsize(real_p) > 500:
-                        return RLImage(real_p, width=58, height=58, kind='bound')
+                        # Embed a print-resolution copy instead of the full HD image.
+                        thumb_p = quote_thumbnails.thumbnail_for(real_p, thumb_dir)
+                        return RLImage(thumb_p, width=58, height=58, kind='bound')
                 except Exception:
                     continue
 
@@ -205,13 +230,20 @@ def _get_logo_path(base_dir):
         return local
     try:
         os.makedirs(os.path.join(base_dir, "static"), exist_ok=True)
-        urllib.request.urlretrieve(COMPANY_LOGO_URL, local)
+        # Download beside the target so concurrent renders never read a partial file.
+        tmp_path = f"{local}.{os.getpid()}.{threading.get_ident()}.tmp"
+        urllib.request.urlretrieve(COMPANY_LOGO_URL, tmp_path)
+        os.replace(tmp_path, local)
         return local
     except Exception:
         return None
 
-def generate_quote(data):
-    """Generates a premium PDF quote matching the user's reference exactly."""
+def generate_quote(data, output=None):
+    """
+    Generates a premium PDF quote matching the user's reference exactly.
+    Writes to `output` (a path or binary file object) if given, otherwise
+    to data["output_path"].
+    """
     show_bg_logo  = data.get("show_bg_logo", False)
     made_by       = str(data.get("made_by") or "").strip()
     made_by_phone = str(data.get("made_by_phone") or "").strip()
@@ -226,6 +258,7 @@ def generate_quote(data):
     
     base_dir = os.path.dirname(os.path.abspath(__file__))
     logo_path = _get_logo_path(base_dir)
+    _prefetch_remote_images(base_dir, items)
 
     # ── Background watermark callback (Large Pictorial Logo) ─────────
     def draw_background(canvas, doc):
@@ -246,7 +279,7 @@ def generate_quote(data):
             canvas.restoreState()
 
     # Document setup
-    doc = SimpleDocTemplate(output_path, pagesize=A4,
+    doc = SimpleDocTemplate(output if output is not None else output_path, pagesize=A4,
                             rightMargin=30, leftMargin=30,
                             topMargin=20, bottomMargin=25)
     
@@ -721,3 +754,80 @@ def generate_quote(data):
 
     # Build
     doc.build(elements, onFirstPage=draw_background, onLaterPages=draw_background)
+
+
+# ── Render pool ──────────────────────────────────────────────────────────────
+# Quotes are rendered off the event loop in a bounded pool, each into its own
+# in-memory buffer. Separate processes let several quotes render in parallel;
+# frozen desktop builds use a single worker thread instead.
+_render_executor = None
+_render_executor_lock = threading.Lock()
+
+
+def _quote_render_workers(workers=None):
+    if workers is None:
+        raw = os.getenv("QUOTE_RENDER_WORKERS", "").strip()
+        if raw:
+            try:
+                workers = int(raw)
+            except ValueError:
+                print(f"Warning: invalid QUOTE_RENDER_WORKERS={raw!r}, rendering in one worker")
+                workers = 1
+        elif getattr(sys, "frozen", False):
+            workers = 1
+        else:
+            workers = min(4, os.cpu_count() or 1)
+    return max(1, int(workers))
+
+
+def render_quote_pdf(data) -> bytes:
+    """Render a quote and return the PDF bytes without touching the filesystem."""
+    buffer = io.BytesIO()
+    generate_quote(data, output=buffer)
+    return buffer.getvalue()
+
+
+def _get_render_executor():
+    global _render_executor
+    with _render_executor_lock:
+        if _render_executor is None:
+            workers = _quote_render_workers()
+            if workers > 1 and not getattr(sys, "frozen", False):
+                # Spawned, not forked: the server process has live threads and sockets.
+                _render_executor = ProcessPoolExecutor(
+                    max_workers=workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+            else:
+                _render_executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="quote-render")
+        return _render_executor
+
+
+async def render_quote_pdf_async(data) -> bytes:
+    """render_quote_pdf in the render pool, awaited without blocking the event loop."""
+    loop = asyncio.get_running_loop()
+    executor = _get_render_executor()
+    try:
+        return await loop.run_in_executor(executor, render_quote_pdf, data)
+    except BrokenProcessPool:
+        # A worker died (out of memory, a crash in a native library); the
+        # pool refuses all further work, so replace it and retry once.
+        print("Warning: quote render pool broke, restarting it")
+        _discard_render_executor(executor)
+        return await loop.run_in_executor(_get_render_executor(), render_quote_pdf, data)
+
+
+def _discard_render_executor(executor):
+    global _render_executor
+    with _render_executor_lock:
+        if _render_executor is executor:
+            _render_executor = None
+    executor.shutdown(wait=False, cancel_futures=True)
+
+
+def shutdown_render_pool():
+    global _render_executor
+    with _render_executor_lock:
+        executor, _render_executor = _render_executor, None
+    if executor is not None:
+        executor.shutdown(wait=False, cancel_futures=True)
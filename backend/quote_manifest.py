@@ -0,0 +1,150 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+
+import cloud_storage
+
+
+MANIFEST_OBJECT_PATH = "quote_history_manifest.json"
+MANIFEST_VERSION = 1
+
+# /list-quotes sort keys -> manifest columns.
+LIST_SORTS = {"date": "date", "client": "client_key", "total": "total"}
+LIST_ORDERS = ("desc", "asc")
+
+
+def _to_float(value) -> float:
+    try:
+        return float(str(value).replace(",", "")) if value not in (None, "") else 0.0
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def entry_for(quote_id: str, data: dict, date: float = None) -> dict:
+    """The listing fields of a saved quote."""
+    return {
+        "id": quote_id,
+        "client": str(data.get("client_name") or "N/A"),
+        "total": _to_float(data.get("grand_total", 0)),
+        "date": float(date if date is not None else time.time()),
+    }
+
+
+class QuoteManifest:
+    """
+    SQLite table of quote listing fields (id, client, total, date), so the
+    history page can be filtered, sorted and paged without opening any
+    quote record. Writers keep it current through upsert/remove.
+    """
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self._conn = None
+        self._lock = threading.Lock()
+
+    def _connection(self):
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.db_path) or ".", exist_ok=True)
+            conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            conn.executescript(
+                """
+                CREATE TABLE IF NOT EXISTS quotes (
+                    id TEXT PRIMARY KEY,
+                    client TEXT NOT NULL,
+                    client_key TEXT NOT NULL,
+                    total REAL NOT NULL,
+                    date REAL NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS quotes_date ON quotes (date);
+                CREATE INDEX IF NOT EXISTS quotes_client ON quotes (client_key);
+                CREATE INDEX IF NOT EXISTS quotes_total ON quotes (total);
+                CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+                """
+            )
+            self._conn = conn
+        return self._conn
+
+    @staticmethod
+    def _row(entry: dict):
+        client = str(entry.get("client") or "N/A")
+        return (str(entry["id"]), client, client.lower(), _to_float(entry.get("total")), float(entry.get("date") or 0))
+
+    def source(self) -> str:
+        """Where the manifest was last built from ("local"/"cloud"), or "" if never built."""
+        with self._lock:
+            row = self._connection().execute("SELECT value FROM meta WHERE key = 'source'").fetchone()
+            return row[0] if row else ""
+
+    def replace_all(self, entries, source: str):
+        rows = [self._row(entry) for entry in entries]
+        with self._lock:
+            conn = self._connection()
+            with conn:
+                conn.execute("DELETE FROM quotes")
+                conn.executemany("INSERT OR REPLACE INTO quotes VALUES (?, ?, ?, ?, ?)", rows)
+                conn.execute("INSERT OR REPLACE INTO meta VALUES ('source', ?)", (source,))
+
+    def upsert(self, entry: dict):
+        with self._lock:
+            conn = self._connection()
+            with conn:
+                conn.execute("INSERT OR REPLACE INTO quotes VALUES (?, ?, ?, ?, ?)", self._row(entry))
+
+    def remove(self, quote_id: str) -> bool:
+        with self._lock:
+            conn = self._connection()
+            with conn:
+                return conn.execute("DELETE FROM quotes WHERE id = ?", (quote_id,)).rowcount > 0
+
+    def entries(self):
+        with self._lock:
+            rows = self._connection().execute("SELECT id, client, total, date FROM quotes").fetchall()
+        return [{"id": r[0], "client": r[1], "total": r[2], "date": r[3]} for r in rows]
+
+    def query(self, search: str = "", sort: str = "date", order: str = "desc", offset: int = 0, limit: int = None):
+        """(page of entries, total matching) for a client-name/id search."""
+        column = LIST_SORTS[sort]
+        direction = "ASC" if order == "asc" else "DESC"
+        where, params = "", []
+        needle = str(search or "").strip().lower()
+        if needle:
+            pattern = "%" + needle.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+            where = "WHERE client_key LIKE ? ESCAPE '\\' OR lower(id) LIKE ? ESCAPE '\\'"
+            params = [pattern, pattern]
+
+        with self._lock:
+            conn = self._connection()
+            total = conn.execute(f"SELECT COUNT(*) FROM quotes {where}", params).fetchone()[0]
+            rows = conn.execute(
+                f"SELECT id, client, total, date FROM quotes {where} "
+                f"ORDER BY {column} {direction}, id {direction} LIMIT ? OFFSET ?",
+                params + [limit if limit else -1, max(0, int(offset or 0))],
+            ).fetchall()
+        return [{"id": r[0], "client": r[1], "total": r[2], "date": r[3]} for r in rows], total
+
+
+def load_cloud_entries():
+    """Entries of the cloud manifest object, or None if it has not been written yet."""
+    raw = cloud_storage.download_bytes(cloud_storage.SYSTEM_BUCKET, MANIFEST_OBJECT_PATH)
+    if raw is None:
+        return None
+    payload = json.loads(raw.decode("utf-8"))
+    return [dict(entry, id=quote_id) for quote_id, entry in (payload.get("quotes") or {}).items()]
+
+
+def save_cloud_entries(entries):
+    payload = {
+        "version": MANIFEST_VERSION,
+        "quotes": {
+            entry["id"]: {"client": entry.get("client"), "total": entry.get("total"), "date": entry.get("date")}
+            for entry in entries
+        },
+    }
+    cloud_storage.upload_bytes(
+        cloud_storage.SYSTEM_BUCKET,
+        MANIFEST_OBJECT_PATH,
+        json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8"),
+        "application/json",
+    )
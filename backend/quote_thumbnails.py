@@ -0,0 +1,79 @@
+import hashlib
+import os
+import threading
+
+from PIL import Image, ImageOps
+
+
+# Quote table image cells are 58x58 pt. 160 px covers that at ~200 dpi,
+# which prints sharply while keeping each embedded image to a few KB.
+THUMBNAIL_PX = 160
+THUMBNAIL_QUALITY = 82
+# Kept under <data>/cache, not static/images: files there are indexed as product images.
+THUMBNAIL_DIR_NAME = "quote_thumbs"
+
+ENABLED = os.getenv("QUOTE_THUMBNAILS", "1").strip().lower() not in ("0", "false", "no", "off")
+
+RESAMPLING = getattr(Image, "Resampling", Image)
+
+# (source path, mtime_ns, size) -> thumbnail path, so a source is hashed once per process.
+_known_thumbnails = {}
+_known_lock = threading.Lock()
+
+
+def _thumbnail_name(content: bytes) -> str:
+    digest = hashlib.sha1(content).hexdigest()
+    return f"{digest}_{THUMBNAIL_PX}q{THUMBNAIL_QUALITY}.jpg"
+
+
+def _write_thumbnail(source_path: str, target_path: str):
+    with Image.open(source_path) as image:
+        image.draft("RGB", (THUMBNAIL_PX, THUMBNAIL_PX))
+        if image.mode in ("RGBA", "LA") or (image.mode == "P" and "transparency" in image.info):
+            rgba = image.convert("RGBA")
+            flattened = Image.new("RGB", rgba.size, "white")
+            flattened.paste(rgba, mask=rgba.getchannel("A"))
+        else:
+            flattened = image.convert("RGB")
+        thumbnail = ImageOps.contain(flattened, (THUMBNAIL_PX, THUMBNAIL_PX), method=RESAMPLING.LANCZOS)
+
+    tmp_path = f"{target_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    thumbnail.save(tmp_path, format="JPEG", quality=THUMBNAIL_QUALITY, optimize=True)
+    os.replace(tmp_path, target_path)
+
+
+def thumbnail_for(source_path: str, cache_dir: str) -> str:
+    """
+    Path of a print-resolution JPEG of source_path, stored under cache_dir by
+    the hash of the source bytes so identical images share one thumbnail and
+    a replaced source gets a new one. Falls back to source_path when the
+    cache is disabled or the image cannot be converted.
+    """
+    if not ENABLED or not source_path:
+        return source_path
+
+    try:
+        stat = os.stat(source_path)
+    except OSError:
+        return source_path
+
+    key = (source_path, stat.st_mtime_ns, stat.st_size)
+    with _known_lock:
+        known = _known_thumbnails.get(key)
+    if known and os.path.exists(known):
+        return known
+
+    try:
+        with open(source_path, "rb") as handle:
+            content = handle.read()
+        os.makedirs(cache_dir, exist_ok=True)
+        target_path = os.path.join(cache_dir, _thumbnail_name(content))
+        if not os.path.exists(target_path):
+            _write_thumbnail(source_path, target_path)
+    except Exception as e:
+        print(f"Warning: could not build quote thumbnail for {source_path}: {e}")
+        return source_path
+
+    with _known_lock:
+        _known_thumbnails[key] = target_path
+    return target_path
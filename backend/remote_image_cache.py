@@ -0,0 +1,204 @@
+import hashlib
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+
+import httpx
+
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".webp", ".gif")
+MAX_IMAGE_BYTES = 20 * 1024 * 1024
+
+
+def _env_int(name: str, default: int, minimum: int = 0) -> int:
+    raw = os.getenv(name, "").strip()
+    try:
+        return max(minimum, int(raw)) if raw else default
+    except ValueError:
+        print(f"Warning: invalid {name}={raw!r}, using {default}")
+        return default
+
+
+FETCH_WORKERS = _env_int("QUOTE_IMAGE_FETCH_WORKERS", 8, minimum=1)
+CACHE_MAX_BYTES = _env_int("QUOTE_IMAGE_CACHE_MB", 256, minimum=1) * 1024 * 1024
+FAILURE_TTL_SECONDS = _env_int("QUOTE_IMAGE_FAILURE_TTL", 600)
+FETCH_TIMEOUT_SECONDS = 20
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def _http_client():
+    """Process-wide client so prefetches reuse pooled keep-alive connections."""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = httpx.Client(
+                timeout=FETCH_TIMEOUT_SECONDS,
+                follow_redirects=True,
+                limits=httpx.Limits(max_connections=FETCH_WORKERS, max_keepalive_connections=FETCH_WORKERS),
+            )
+        return _client
+
+
+def close():
+    global _client
+    with _client_lock:
+        client, _client = _client, None
+    if client is not None:
+        client.close()
+
+
+class RemoteImageCache:
+    """
+    Disk cache for remote quote images.
+
+    Files are named by the SHA-1 of the URL and evicted least recently used
+    first (by mtime, refreshed on every hit) once the folder exceeds
+    max_bytes. URLs that failed to download are remembered for
+    failure_ttl seconds so a dead link is not retried by every quote.
+    """
+
+    def __init__(self, cache_dir: str, max_bytes: int = CACHE_MAX_BYTES, failure_ttl: int = FAILURE_TTL_SECONDS):
+        self.cache_dir = cache_dir
+        self.max_bytes = max(1, int(max_bytes))
+        self.failure_ttl = max(0, int(failure_ttl))
+        self._failures = {}  # url -> monotonic time the failure expires
+        self._lock = threading.Lock()
+        self._inflight = {}  # url -> Event set when its download finishes
+        self._bytes = None  # total cached bytes, scanned on first write
+
+    def path_for(self, url: str) -> str:
+        extension = os.path.splitext(urlparse(url).path)[1].lower()
+        if extension not in IMAGE_EXTENSIONS:
+            extension = ".img"
+        return os.path.join(self.cache_dir, hashlib.sha1(url.encode("utf-8")).hexdigest() + extension)
+
+    def _failed_recently(self, url: str) -> bool:
+        with self._lock:
+            expires = self._failures.get(url)
+            if expires is None:
+                return False
+            if expires > time.monotonic():
+                return True
+            self._failures.pop(url, None)
+            return False
+
+    def _record_failure(self, url: str, reason):
+        print(f"Warning: failed to fetch quote image {url}: {reason}")
+        if self.failure_ttl:
+            with self._lock:
+                self._failures[url] = time.monotonic() + self.failure_ttl
+
+    def _cached(self, path: str) -> bool:
+        try:
+            os.utime(path)
+            return True
+        except OSError:
+            return False
+
+    def _download(self, url: str, path: str) -> bool:
+        try:
+            response = _http_client().get(url)
+        except Exception as e:
+            self._record_failure(url, e)
+            return False
+        if not response.is_success:
+            self._record_failure(url, f"HTTP {response.status_code}")
+            return False
+        content = response.content
+        if not content or len(content) > MAX_IMAGE_BYTES:
+            self._record_failure(url, f"unexpected size {len(content)} bytes")
+            return False
+
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "wb") as handle:
+                handle.write(content)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"Warning: could not cache quote image {url}: {e}")
+            return False
+
+        self._account(len(content))
+        return True
+
+    def _account(self, added: int):
+        with self._lock:
+            if self._bytes is None:
+                self._bytes = sum(size for _, size, _ in self._entries())
+            else:
+                self._bytes += added
+            if self._bytes <= self.max_bytes:
+                return
+            entries = sorted(self._entries(), key=lambda entry: entry[2])
+            for path, size, _ in entries:
+                if self._bytes <= self.max_bytes:
+                    break
+                try:
+                    os.remove(path)
+                    self._bytes -= size
+                except OSError:
+                    continue
+
+    def _entries(self):
+        try:
+            names = os.listdir(self.cache_dir)
+        except OSError:
+            return []
+        entries = []
+        for name in names:
+            if name.endswith(".tmp"):
+                continue
+            path = os.path.join(self.cache_dir, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            entries.append((path, stat.st_size, stat.st_mtime))
+        return entries
+
+    def get(self, url: str) -> str:
+        """Local path of url, downloading it if needed; "" if unavailable."""
+        path = self.path_for(url)
+        if self._cached(path):
+            return path
+        if self._failed_recently(url):
+            return ""
+
+        with self._lock:
+            pending = self._inflight.get(url)
+            if pending is None:
+                self._inflight[url] = threading.Event()
+        if pending is not None:
+            pending.wait(FETCH_TIMEOUT_SECONDS * 2)
+            return path if os.path.exists(path) else ""
+
+        try:
+            return path if self._download(url, path) else ""
+        finally:
+            with self._lock:
+                self._inflight.pop(url).set()
+
+    def prefetch(self, urls) -> dict:
+        """Download every url not yet cached concurrently; returns url -> local path or ""."""
+        unique = list(dict.fromkeys(url for url in urls if url))
+        if len(unique) <= 1:
+            return {url: self.get(url) for url in unique}
+        with ThreadPoolExecutor(max_workers=min(FETCH_WORKERS, len(unique)), thread_name_prefix="quote-image") as pool:
+            return dict(zip(unique, pool.map(self.get, unique)))
+
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+def cache_for(cache_dir: str) -> RemoteImageCache:
+    with _caches_lock:
+        cache = _caches.get(cache_dir)
+        if cache is None:
+            cache = _caches[cache_dir] = RemoteImageCache(cache_dir)
+        return cache
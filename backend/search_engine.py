@@ -1,11 +1,17 @@
 from dotenv import load_dotenv
 load_dotenv()
+import base64
 import bisect
 import copy
+import hashlib
+import heapq
+import itertools
 import json
+import math
 import os
 import re
 import threading
+import time
 import unicodedata
 import sys
 from datetime import datetime
@@ -25,8 +31,12 @@ if is_frozen:
 # import torch
 
 import numpy as np
+import binary_index
+import cloud_index
 import cloud_storage
 import mongodb
+from substring_index import SubstringIndex
+from result_cache import ResultCache
 from app_paths import resolve_data_dir
 
 DATA_DIR = resolve_data_dir(is_frozen, EXE_DIR)
@@ -35,10 +45,17 @@ DATA_DIR = resolve_data_dir(is_frozen, EXE_DIR)
 INDEX_FILE_PERSISTENT = os.path.join(DATA_DIR, "search_index_v2.json")
 INDEX_FILE_BUNDLED = os.path.join(BUNDLED_DIR, "search_index_v2.json")
 INDEX_FILE = INDEX_FILE_PERSISTENT
+# Memory-mapped binary copy of the index, written alongside the JSON file
+INDEX_BIN_FILE_PERSISTENT = binary_index.binary_path_for(INDEX_FILE_PERSISTENT)
+INDEX_BIN_FILE_BUNDLED = binary_index.binary_path_for(INDEX_FILE_BUNDLED)
+INDEX_DELTA_SUFFIX = ".delta.jsonl"
+INDEX_SUMMARY_SUFFIX = ".summary.json"
 
 # Persistent cache for image paths to speed up startup
 IMAGE_CACHE_FILE = os.path.join(DATA_DIR, "image_path_cache.json")
 IMAGE_CACHE_FILE_BUNDLED = os.path.join(BUNDLED_DIR, "image_path_cache.json")
+RESOLVED_IMAGES_FILE = os.path.join(DATA_DIR, "resolved_item_images.json")
+RESOLVED_IMAGES_VERSION = 1
 
 # AI Search is disabled to ensure stability on all Windows systems
 AI_AVAILABLE = False
@@ -75,16 +92,25 @@ except Exception as e:
 stored_items = []
 keyword_index = {}   # word -> [item_indices]
 _keyword_keys_sorted = []  # sorted list of keyword_index keys for O(log n) prefix lookup
+_keyword_substring_index = SubstringIndex()  # trigram index over keyword_index keys (insertion order)
+_search_features = []  # _SearchFeatures per stored_items entry (same positions)
 vector_index  = None # FAISS index
-search_cache  = {}   # query -> results
 catalog_summary_cache = None # Saved dashboard index
+_catalog_summary_payload = None  # (JSON bytes, ETag) of catalog_summary_cache
 item_code_meta_cache = {}
 _index_cache_signature = None
 _image_path_cache = None
+_image_key_index = SubstringIndex()  # trigram index over _image_path_cache keys
+_image_facts_cache = {}  # public image path -> _ImageFacts (size, brand folder, flags, ranking keys)
+_image_cache_dirs = None  # {directory: mtime_ns} the image path cache was built against
+_image_cache_checked_at = 0.0
+_image_cache_build_lock = threading.Lock()  # one load/walk of the image folders at a time
+_image_cache_refreshing = False  # a background rebuild is checking or walking the folders
+_image_cache_refresh_lock = threading.Lock()  # guards _image_cache_checked_at/_refreshing; never held during a walk
 _resolved_code_to_image_cache = {}
-_suggestion_cache = {}   # (query_lower, brand_lower) -> suggestion list
-_SUGGESTION_CACHE_MAX = 200  # max entries to avoid unbounded memory
-CACHE_SCHEMA_VERSION = 2
+_index_generation = 0  # bumped whenever stored_items/keyword_index change; part of every result cache key
+_INDEX_INSTANCE = os.urandom(8).hex()  # keeps generation-based ETags from repeating across restarts
+CACHE_SCHEMA_VERSION = 3
 HARD_PLACEHOLDER_CODES = {
     "K-24740IN-7", "K-24740IN-K4", "K-17663IN-0", "K-82958",
     "K-1042534", "K-1060831", "K-1063956", "K-1286731",
@@ -103,7 +129,53 @@ def _env_flag(name: str, default: bool = False) -> bool:
     return raw in {"1", "true", "yes", "on"}
 
 
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(str(os.getenv(name, default)).strip())
+    except ValueError:
+        print(f"Warning: invalid integer for {name}, using {default}")
+        return default
+
+
 REMOTE_INDEX_SYNC_ENABLED = _env_flag("SEARCH_INDEX_REMOTE_SYNC", is_frozen)
+# Keep writing the binary index next to the JSON one while both formats are in use.
+BINARY_INDEX_ENABLED = _env_flag("SEARCH_INDEX_BINARY", True)
+# How often (seconds) image lookups check the image folders for added/removed files; 0 disables.
+IMAGE_CACHE_REFRESH_SECONDS = _env_int("IMAGE_CACHE_REFRESH_SECONDS", 30)
+
+# Shared LRU for search, suggestion and browse results.
+result_cache = ResultCache(
+    max_entries=_env_int("SEARCH_CACHE_MAX_ENTRIES", 2000),
+    max_bytes=_env_int("SEARCH_CACHE_MAX_MB", 64) * 1024 * 1024,
+)
+
+
+def result_cache_key(kind: str, *parts):
+    return (kind, _index_generation) + parts
+
+
+def result_cache_stats() -> dict:
+    stats = result_cache.stats()
+    stats["index_generation"] = _index_generation
+    return stats
+
+
+# add_to_index appends new items to a delta log next to the main index;
+# a debounced background flush writes it and compacts into a full save
+# once it grows past SEARCH_INDEX_DELTA_MAX_ITEMS.
+INDEX_SAVE_DELAY_SECONDS = _env_int("SEARCH_INDEX_SAVE_DELAY_MS", 2000) / 1000.0
+INDEX_DELTA_MAX_ITEMS = _env_int("SEARCH_INDEX_DELTA_MAX_ITEMS", 500)
+_pending_delta_batches = []  # add_to_index batches not yet written to the delta log
+_delta_items_on_disk = 0
+_index_rewrite_pending = False  # items already on disk were edited in place
+_remote_index_stale = False  # the last cloud/MongoDB sync failed
+_index_save_lock = threading.RLock()
+_index_save_timer = None
+
+
+def _bump_index_generation():
+    global _index_generation
+    _index_generation += 1
 
 
 # INDEX_FILE is now dynamically determined in load_index
@@ -192,7 +264,7 @@ _KNOWN_FINISH_LABELS = {
 _KNOWN_FINISH_CODES = tuple(sorted(_KNOWN_FINISH_LABELS.keys(), key=len, reverse=True))
 
 
-def _image_file_size(image_path: str) -> int:
+def _stat_image_file_size(image_path: str) -> int:
     """Return the file size of a /static/images/... path, or -1 if missing."""
     full = _resolve_local_image_path(image_path)
     if not full:
@@ -203,6 +275,52 @@ def _image_file_size(image_path: str) -> int:
         return -1
 
 
+class _ImageFacts:
+    """
+    Everything image resolution needs to know about one image path, so that
+    ranking candidates is dict lookups instead of stat calls and regexes.
+    """
+
+    __slots__ = ("size", "brand", "page_extracted", "cover", "folders", "rank_tail")
+
+    def __init__(self, image_path: str, size: int, brand=None, page_extracted=None, cover=None):
+        normalized = str(image_path or "").replace("\\", "/").lower()
+        self.size = size
+        self.brand = _image_brand_hint(image_path) if brand is None else brand
+        self.page_extracted = _is_page_extracted_image(image_path) if page_extracted is None else page_extracted
+        self.cover = _is_cover_page_image(image_path) if cover is None else cover
+        # Intermediate path segments, i.e. every "/<folder>/" in the path.
+        self.folders = frozenset(normalized.split("/")[1:-1])
+        # Item-independent part of the _pick_best_image_match ranking key.
+        self.rank_tail = (
+            5 if "/" in normalized and not normalized.startswith("manual/") else 0,
+            -5 if self.cover else 0,
+            -1 if "/manual/" in normalized else 0,
+            -normalized.count("/"),
+        )
+
+
+def _image_facts(image_path: str) -> _ImageFacts:
+    """
+    Facts for image_path, stat'ed once and kept until the image path cache is
+    rebuilt. Rebuilds follow directory mtimes, which adding or removing a file
+    changes, so a missing (-1) path is picked up once it appears; a file
+    overwritten in place does not change them and keeps its old size until
+    some other change triggers a rebuild.
+    """
+    facts = _image_facts_cache.get(image_path)
+    if facts is None:
+        facts = _image_facts_cache[image_path] = _ImageFacts(image_path, _stat_image_file_size(image_path))
+    return facts
+
+
+def _image_file_size(image_path: str) -> int:
+    """Return the file size of a /static/images/... path, or -1 if missing."""
+    if not image_path:
+        return -1
+    return _image_facts(image_path).size
+
+
 def _resolve_local_image_path(image_path: str) -> str:
     if not image_path:
         return ""
@@ -435,7 +553,7 @@ def prepare_item_for_display(item):
             # Only keep image paths that actually exist on disk and are not page-extracted
             verified = [
                 img for img in (display_item.get("images") or [])
-                if img and _resolve_local_image_path(img) and not _is_page_extracted_image(img)
+                if img and _image_file_size(img) >= 0 and not _is_page_extracted_image(img)
             ]
             display_item["images"] = verified
 
@@ -455,8 +573,98 @@ def prepare_item_for_display(item):
     return display_item
 
 
+class _DisplayPayloads:
+    """
+    Display dicts and their serialized JSON for one index generation.
+    Entries are keyed by id() and hold a reference to the keyed object, so
+    an id cannot be reused by another object while its entry exists.
+    """
+
+    def __init__(self, generation):
+        self.generation = generation
+        self.display = {}  # id(item) -> (item, display dict)
+        self.encoded = {}  # id(obj) -> (obj, JSON bytes) for stored items and display dicts
+
+
+_display_payloads = _DisplayPayloads(_index_generation)
+
+
+def _current_display_payloads():
+    global _display_payloads
+    payloads = _display_payloads
+    if payloads.generation != _index_generation:
+        payloads = _display_payloads = _DisplayPayloads(_index_generation)
+    return payloads
+
+
+def _encode_json(value) -> bytes:
+    # Same encoding FastAPI's JSONResponse uses.
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def display_item_for(item):
+    """
+    prepare_item_for_display(item), computed once per index generation.
+    The returned dict is shared between requests and must not be modified.
+    """
+    payloads = _current_display_payloads()
+    entry = payloads.display.get(id(item))
+    if entry is not None:
+        return entry[1]
+    display_item = prepare_item_for_display(item)
+    payloads.display[id(item)] = (item, display_item)
+    payloads.encoded[id(display_item)] = (display_item, _encode_json(display_item))
+    return display_item
+
+
 def prepare_items_for_display(items):
-    return [prepare_item_for_display(item) for item in items if item]
+    return [display_item_for(item) for item in items if item]
+
+
+def _encoded_payload(value):
+    entry = _current_display_payloads().encoded.get(id(value))
+    if entry is not None and entry[0] is value:
+        return entry[1]
+    return None
+
+
+def _remember_item_json(item):
+    """Keep the serialized form of a raw stored item returned as a result."""
+    payloads = _current_display_payloads()
+    if id(item) not in payloads.encoded:
+        payloads.encoded[id(item)] = (item, _encode_json(item))
+
+
+def payload_json(value) -> bytes:
+    """
+    JSON bytes for an API response value. Display dicts (and raw items
+    search() returns) reuse their serialized form from this index
+    generation, so only the small per-request wrappers around them -
+    result lists and suggestion entries - are encoded.
+    """
+    encoded = _encoded_payload(value)
+    if encoded is not None:
+        return encoded
+    if isinstance(value, (list, tuple)):
+        return b"[" + b",".join(payload_json(item) for item in value) + b"]"
+    if isinstance(value, dict):
+        # Encode the plain fields in one go and splice the pre-serialized ones after them.
+        plain = {}
+        spliced = []
+        for key, item in value.items():
+            encoded = _encoded_payload(item)
+            if encoded is None and isinstance(item, (list, tuple)):
+                encoded = payload_json(item)
+            if encoded is None:
+                plain[key] = item
+            else:
+                spliced.append(_encode_json(str(key)) + b":" + encoded)
+        if not spliced:
+            return _encode_json(value)
+        if plain:
+            spliced.insert(0, _encode_json(plain)[1:-1])
+        return b"{" + b",".join(spliced) + b"}"
+    return _encode_json(value)
 
 def _parse_code_metadata(raw_text: str):
     text = str(raw_text or "").strip()
@@ -598,6 +806,546 @@ def _item_quality_bonus(item) -> float:
     return bonus
 
 
+class _SearchFeatures:
+    """
+    Per-item values search() scores against. Everything here depends only on
+    the item, so it is computed once per index load instead of per keystroke.
+    """
+
+    __slots__ = (
+        "name_lower",
+        "text_lower",
+        "first_line",
+        "combined",
+        "combined_norm",
+        "combined_code_norm",
+        "header_lines",
+        "header_compacts",
+        "token_codes",
+        "base_compact",
+        "base_clean",
+        "full_compact",
+        "full_relaxed",
+        "quality_bonus",
+    )
+
+    def __init__(self, item):
+        name_lower = str(item.get("name") or "").lower()
+        text_lower = str(item.get("text") or "").lower()
+        combined = f"{name_lower}\n{text_lower}"
+        self.name_lower = name_lower
+        self.text_lower = text_lower
+        self.first_line = text_lower.split('\n')[0] if text_lower else ""
+        self.combined = combined
+        self.combined_norm = _normalize(combined)
+        self.combined_code_norm = _normalize(combined, strip_in=True)
+
+        # Restrict strict matching to header lines before "MRP" to avoid price-number noise.
+        header_lines = []
+        for raw_line in text_lower.split("\n"):
+            line = raw_line.strip()
+            if not line:
+                continue
+            if "mrp" in line:
+                break
+            header_lines.append(line)
+            if len(header_lines) >= 6:
+                break
+        if not header_lines:
+            header_lines = [ln.strip() for ln in text_lower.split("\n")[:3] if ln.strip()]
+        self.header_lines = header_lines
+        self.header_compacts = [_compact_alnum(line) for line in header_lines[:4]]
+
+        # (compact, OCR-relaxed, Kohler-cleaned, numeric segments) per model token.
+        blob = f"{name_lower}\n" + "\n".join(header_lines)
+        token_codes = []
+        for tok in _extract_model_tokens(blob):
+            tok_compact = _compact_alnum(tok)
+            if len(tok_compact) >= 3:
+                token_codes.append((
+                    tok_compact,
+                    _code_relaxed(tok_compact),
+                    _clean_kohler_numeric_code(tok_compact),
+                    re.findall(r'\d{3,}', tok_compact),
+                ))
+        self.token_codes = token_codes
+
+        code_meta = _get_item_code_metadata(item)
+        self.base_compact = code_meta.get("base_compact", "")
+        self.base_clean = _clean_kohler_numeric_code(self.base_compact)
+        self.full_compact = code_meta.get("full_compact", "")
+        self.full_relaxed = _code_relaxed(self.full_compact)
+        self.quality_bonus = _item_quality_bonus(item)
+
+
+def _rebuild_search_features():
+    global _search_features
+    _search_features = [_SearchFeatures(item) for item in stored_items]
+    return _search_features
+
+
+# Exact code match tiers, strictest first, with the confidence batch
+# resolution reports for a line matched at that tier.
+CODE_MATCH_TIERS = ("full_code", "base_code", "code", "relaxed_code", "numeric_code")
+CODE_MATCH_CONFIDENCE = {
+    "full_code": 1.0,
+    "base_code": 0.95,
+    "code": 0.85,
+    "relaxed_code": 0.7,
+    "numeric_code": 0.6,
+}
+
+
+class _ExactLookup:
+    """
+    Exact-match maps for get_suggestions and search_exact, partitioned by
+    brand. Each map goes from a lowered/compact value to the ascending
+    stored_items positions that carry it, so a query resolves with a few
+    dict lookups instead of a pass over every item.
+    """
+
+    def __init__(self, items, features, generation):
+        self.generation = generation
+        self.size = 0
+        self.names = {}  # brand -> lowered name/text/search code/alias -> [idx]
+        self.compacts = {}  # brand -> compact of the same fields -> [idx]
+        self.full_codes = {}  # brand -> full_compact -> [idx]
+        self.base_codes = {}  # brand -> base_compact -> [(idx, variant_compact)]
+        self.codes = {}  # brand -> compact full/base/model-token code -> [idx]
+        self.relaxed_codes = {}  # brand -> _code_relaxed() of the same codes -> [idx]
+        self.clean_codes = {}  # brand -> _clean_kohler_numeric_code() of the same codes -> [idx]
+        self.extend(items, features, generation)
+
+    def __len__(self):
+        return self.size
+
+    def extend(self, items, features, generation):
+        for item, feat in zip(items, features):
+            idx = self.size
+            self.size += 1
+            if not _is_supported_item(item):
+                continue
+            brand = _item_brand(item)
+            values = {
+                str(item.get("name") or "").strip().lower(),
+                str(item.get("text") or "").strip().lower(),
+                str(item.get("search_code") or item.get("base_code") or "").strip().lower(),
+                str(item.get("display_name") or "").strip().lower(),
+            }
+            names = self.names.setdefault(brand, {})
+            compacts = self.compacts.setdefault(brand, {})
+            for value in values:
+                names.setdefault(value, []).append(idx)
+            for value in {_compact_alnum(value) for value in values}:
+                compacts.setdefault(value, []).append(idx)
+
+            code_meta = _get_item_code_metadata(item)
+            full_compact = code_meta.get("full_compact")
+            if full_compact:
+                self.full_codes.setdefault(brand, {}).setdefault(full_compact, []).append(idx)
+            base_compact = code_meta.get("base_compact")
+            if base_compact:
+                self.base_codes.setdefault(brand, {}).setdefault(base_compact, []).append(
+                    (idx, code_meta.get("variant_compact"))
+                )
+
+            item_codes = {code for code in (full_compact, base_compact) if code}
+            item_codes.update(tok[0] for tok in feat.token_codes)
+            for table, forms in (
+                (self.codes, item_codes),
+                (self.relaxed_codes, {_code_relaxed(code) for code in item_codes}),
+                (self.clean_codes, {_clean_kohler_numeric_code(code) for code in item_codes}),
+            ):
+                partition = table.setdefault(brand, {})
+                for code in forms:
+                    if code:
+                        partition.setdefault(code, []).append(idx)
+        self.generation = generation
+
+    def _partitions(self, table, brand):
+        if brand:
+            partition = table.get(brand)
+            return [partition] if partition else []
+        return list(table.values())
+
+    def name_matches(self, q, q_compact, brand=""):
+        """Positions whose name/text/code/alias equals `q` (or its compact form)."""
+        hits = set()
+        for partition in self._partitions(self.names, brand):
+            hits.update(partition.get(q, ()))
+        if q_compact:
+            for partition in self._partitions(self.compacts, brand):
+                hits.update(partition.get(q_compact, ()))
+        return sorted(hits)
+
+    def code_family_matches(self, code_meta, brand=""):
+        """Positions sharing the query's full code, or its base code (and variant, if given)."""
+        hits = set()
+        full_compact = code_meta.get("full_compact")
+        if full_compact:
+            for partition in self._partitions(self.full_codes, brand):
+                hits.update(partition.get(full_compact, ()))
+        base_compact = code_meta.get("base_compact")
+        if base_compact:
+            variant_compact = code_meta.get("variant_compact")
+            for partition in self._partitions(self.base_codes, brand):
+                for idx, item_variant in partition.get(base_compact, ()):
+                    if not variant_compact or item_variant == variant_compact:
+                        hits.add(idx)
+        return sorted(hits)
+
+    def _code_hits(self, table, code, brand):
+        hits = set()
+        if code:
+            for partition in self._partitions(table, brand):
+                hits.update(partition.get(code, ()))
+        return hits
+
+    def match_code(self, code_meta, query_code, brand=""):
+        """
+        (tier, positions) for an exact code query, tried from strictest to
+        loosest: full code, base code (+ variant), any compact code, its
+        OCR-relaxed form, then its Kohler-cleaned numeric form. The first
+        tier with hits wins; tier is a CODE_MATCH_TIERS name, or "" if none.
+        """
+        tiers = (
+            lambda: self._code_hits(self.full_codes, code_meta.get("full_compact"), brand),
+            lambda: set(self.code_family_matches({
+                "base_compact": code_meta.get("base_compact"),
+                "variant_compact": code_meta.get("variant_compact"),
+            }, brand)),
+            lambda: self._code_hits(self.codes, query_code, brand),
+            lambda: self._code_hits(self.relaxed_codes, _code_relaxed(query_code), brand),
+            lambda: self._code_hits(self.clean_codes, _clean_kohler_numeric_code(query_code), brand),
+        )
+        for name, tier in zip(CODE_MATCH_TIERS, tiers):
+            matched = tier()
+            if matched:
+                return name, sorted(matched)
+        return "", []
+
+    def code_matches(self, code_meta, query_code, brand=""):
+        """
+        Positions for an exact code query (see match_code), widened to every
+        variant of the matched base codes, matched positions first.
+        """
+        _, matched = self.match_code(code_meta, query_code, brand)
+        if not matched:
+            return []
+
+        family = set()
+        for idx in matched:
+            base_compact = _get_item_code_metadata(stored_items[idx]).get("base_compact")
+            if base_compact:
+                family.update(self.code_family_matches({"base_compact": base_compact}, brand))
+        return matched + sorted(family - set(matched))
+
+
+_exact_lookup = None
+
+
+def _get_exact_lookup():
+    """The exact-match maps for the current index generation, built on first use."""
+    global _exact_lookup
+    lookup = _exact_lookup
+    if lookup is None or lookup.generation != _index_generation or len(lookup) != len(stored_items):
+        features = _search_features
+        if len(features) != len(stored_items):
+            features = _rebuild_search_features()
+        lookup = _ExactLookup(stored_items, features, _index_generation)
+        _exact_lookup = lookup
+    return lookup
+
+
+# Browse collections that every item of a brand belongs to.
+BROWSE_ALL_COLLECTIONS = {"All Products", "Standard Products"}
+BROWSE_SORTS = ("", "price", "price_desc", "code")
+BROWSE_DEFAULT_LIMIT = 500  # unpaginated requests keep the old 500-item response
+
+
+def _kohler_browse_group(item_cat: str, item_text: str):
+    """
+    The Kohler dashboard sections that have no category of their own in the
+    catalogs and are filled by keyword instead; an item can be in several.
+    """
+    groups = []
+    if item_cat in {"toilets", "smart toilets & bidet seats", "1 pc toilets & wall hungs", "in-wall tanks"} or any(
+        k in item_text for k in ["toilet", "bidet", "cleansing seat"]
+    ):
+        groups.append("toilets")
+    if ("wall" in item_cat and "tank" in item_cat) or any(
+        k in item_text for k in ["in-wall", "concealed tank", "concealed cistern", "dual flush tank", "tank only"]
+    ):
+        groups.append("in-wall tanks")
+    if item_cat == "cleaning solutions" or any(k in item_text for k in ["cleaner", "cleaning solution", "descaler"]):
+        groups.append("cleaning solutions")
+    return groups
+
+
+KOHLER_BROWSE_GROUPS = ("toilets", "in-wall tanks", "cleaning solutions")
+
+
+def _browse_sort_value(item, sort: str):
+    if sort == "code":
+        return _compact_alnum(_get_item_code_metadata(item).get("full_code") or item.get("name") or "")
+    raw = re.sub(r'[^\d.]', '', str(item.get("price") or ""))
+    try:
+        price = float(raw) if raw else 0.0
+    except ValueError:
+        price = 0.0
+    if price <= 0:
+        # Unpriced items go last in either direction.
+        return float("inf")
+    return -price if sort == "price_desc" else price
+
+
+class _CollectionIndex:
+    """
+    brand -> collection -> stored_items positions for /catalog/browse.
+    Categories and the Kohler keyword groups are filled when the index is
+    built; other collection names (substring matches over categories, plus
+    the text of uncategorized items) are resolved once and remembered.
+    """
+
+    def __init__(self, items, generation):
+        self.generation = generation
+        self.size = len(items)
+        self.brand_items = {}  # brand -> [idx]
+        self.categories = {}  # brand -> lowered category -> [idx]
+        self.uncategorized = {}  # brand -> [(idx, lowered text)]
+        self.groups = {}  # brand -> Kohler keyword group -> [idx]
+        self._collections = {}  # (brand, lowered collection) -> [idx]
+        self._sorted = {}  # (brand, collection key, sort) -> ([sort key], [idx])
+        for idx, item in enumerate(items):
+            if not _is_supported_item(item):
+                continue
+            brand = _item_brand(item)
+            self.brand_items.setdefault(brand, []).append(idx)
+            item_cat = str(item.get("category", "")).lower()
+            item_text = str(item.get("text") or "").lower()
+            if item_cat:
+                self.categories.setdefault(brand, {}).setdefault(item_cat, []).append(idx)
+            else:
+                self.uncategorized.setdefault(brand, []).append((idx, item_text))
+            if brand == "kohler":
+                for group in _kohler_browse_group(item_cat, item_text):
+                    self.groups.setdefault(brand, {}).setdefault(group, []).append(idx)
+
+    def __len__(self):
+        return self.size
+
+    def _collection_key(self, brand, collection):
+        if not collection or collection in BROWSE_ALL_COLLECTIONS:
+            return ""
+        return collection.lower()
+
+    def positions(self, brand, collection=None):
+        """Positions in `collection` of `brand`, in stored order."""
+        key = self._collection_key(brand, collection)
+        if not key:
+            return self.brand_items.get(brand, [])
+        if brand == "kohler" and key in KOHLER_BROWSE_GROUPS:
+            return self.groups.get(brand, {}).get(key, [])
+        cached = self._collections.get((brand, key))
+        if cached is None:
+            hits = set()
+            for item_cat, positions in self.categories.get(brand, {}).items():
+                if key in item_cat:
+                    hits.update(positions)
+            # Only fall back to raw text when the parser could not assign a category.
+            hits.update(idx for idx, item_text in self.uncategorized.get(brand, []) if key in item_text)
+            cached = self._collections[(brand, key)] = sorted(hits)
+        return cached
+
+    def sorted_positions(self, brand, collection, sort):
+        """(sort keys, positions) of a collection; keys are (value, idx) and strictly ascending."""
+        key = (brand, self._collection_key(brand, collection), sort)
+        cached = self._sorted.get(key)
+        if cached is None:
+            positions = self.positions(brand, collection)
+            if sort:
+                keys = sorted((_browse_sort_value(stored_items[idx], sort), idx) for idx in positions)
+            else:
+                keys = [(idx, idx) for idx in positions]
+            cached = self._sorted[key] = (keys, [idx for _, idx in keys])
+        return cached
+
+
+_collection_index = None
+
+
+def _get_collection_index():
+    """The browse collection index for the current index generation, built on first use."""
+    global _collection_index
+    index = _collection_index
+    if index is None or index.generation != _index_generation or len(index) != len(stored_items):
+        index = _collection_index = _CollectionIndex(stored_items, _index_generation)
+    return index
+
+
+def _encode_browse_cursor(sort: str, key) -> str:
+    raw = json.dumps([sort, list(key)], separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def _decode_browse_cursor(cursor: str, sort: str):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        cursor_sort, key = json.loads(raw)
+        value, idx = key
+    except (ValueError, TypeError):
+        raise ValueError("Invalid cursor")
+    if cursor_sort != sort:
+        raise ValueError("Cursor was issued for a different sort order")
+    # The key is compared against the sort keys, so it must have their type.
+    if not _is_cursor_number(idx) or idx != int(idx):
+        raise ValueError("Invalid cursor")
+    if sort == "code":
+        if not isinstance(value, str):
+            raise ValueError("Invalid cursor")
+    elif value is None and sort:
+        value = float("inf")  # unpriced items
+    elif not _is_cursor_number(value):
+        raise ValueError("Invalid cursor")
+    return (value, int(idx))
+
+
+def _is_cursor_number(value) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool) and math.isfinite(value)
+
+
+def _build_catalog_summary():
+    """Brands with their collections (and item counts) for the /catalog/index dashboard."""
+    brand_map = {}
+    for item in stored_items:
+        brand = item.get("brand")
+        if not brand:
+            src = str(item.get("source") or "Generic").lower()
+            brand = "Kohler" if "kohler" in src else "Aquant" if "aquant" in src else "Generic"
+
+        if str(brand or "").strip().lower() not in SUPPORTED_BRANDS:
+            continue
+
+        collections = brand_map.setdefault(brand, set())
+        # Use the 'category' field if available
+        h = item.get("category")
+        if h:
+            collections.add(h)
+        else:
+            # Fallback for older indexed items or undetected headers
+            first_line = ""
+            if "text" in item:
+                first_line = item["text"].split("\n")[0].strip()
+            heading_match = re.match(r'^([A-Z\s]{4,28})', first_line)
+            if heading_match:
+                h = heading_match.group(1).strip()
+                if len(h) > 3:
+                    collections.add(h)
+
+    collection_index = _get_collection_index()
+    result = []
+    # Always prioritize the big two for display
+    for b_name in ["Aquant", "Kohler"]:
+        if b_name in brand_map:
+            cols = sorted(brand_map.pop(b_name))[:25] or ["Standard Products"]
+            result.append({
+                "brand": b_name,
+                "collections": cols,
+                "counts": {col: len(collection_index.positions(b_name.lower(), col)) for col in cols},
+            })
+    return result
+
+
+def _summary_path_for(index_file: str) -> str:
+    return os.path.splitext(index_file)[0] + INDEX_SUMMARY_SUFFIX
+
+
+def _load_catalog_summary(index_file: str):
+    """The summary saved next to `index_file`, if it was built from that exact file."""
+    path = _summary_path_for(index_file)
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            payload = json.load(f)
+    except Exception as e:
+        print(f"Warning: failed to read catalog summary {path}: {e}")
+        return None
+    signature = binary_index.source_signature(index_file)
+    if signature is None or payload.get("signature") != list(signature):
+        return None
+    return payload.get("summary")
+
+
+def _save_catalog_summary(index_file: str, summary):
+    path = _summary_path_for(index_file)
+    signature = binary_index.source_signature(index_file)
+    if signature is None:
+        return
+    try:
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"signature": list(signature), "summary": summary}, f)
+        os.replace(tmp_path, path)
+    except Exception as e:
+        print(f"Warning: failed to save catalog summary {path}: {e}")
+
+
+def _set_catalog_summary(summary):
+    global catalog_summary_cache, _catalog_summary_payload
+    body = _encode_json(summary)
+    catalog_summary_cache = summary
+    _catalog_summary_payload = (body, f'"{hashlib.sha1(body).hexdigest()[:24]}"')
+
+
+def catalog_summary():
+    """(JSON bytes, strong ETag) of the catalog summary; the ETag is a hash of the bytes."""
+    if not stored_items:
+        load_index()
+    if not stored_items:
+        return _encode_json([]), None
+    if catalog_summary_cache is None or _catalog_summary_payload is None:
+        _set_catalog_summary(_build_catalog_summary())
+    return _catalog_summary_payload
+
+
+def index_etag(*parts) -> str:
+    """Strong ETag for a response derived only from the index at its current generation."""
+    digest = hashlib.sha1(repr((_INDEX_INSTANCE, _index_generation) + parts).encode("utf-8")).hexdigest()
+    return f'"{digest[:24]}"'
+
+
+def browse_page(brand: str, collection: str = None, sort: str = "", limit: int = None, cursor: str = None):
+    """
+    One page of a brand collection for /catalog/browse. Pages continue after
+    the last (sort key, position) the cursor points at, so items added to
+    the index later do not shift pages already handed out. Without a limit
+    the first BROWSE_DEFAULT_LIMIT items are returned, as before paging.
+    """
+    sort = (sort or "").strip().lower()
+    if sort not in BROWSE_SORTS:
+        raise ValueError(f"Unsupported sort '{sort}'")
+    brand_lower = (brand or "").strip().lower()
+    index = _get_collection_index()
+    keys, positions = index.sorted_positions(brand_lower, collection, sort)
+
+    start = 0
+    if cursor:
+        start = bisect.bisect_right(keys, _decode_browse_cursor(cursor, sort))
+    page_size = BROWSE_DEFAULT_LIMIT if limit is None else max(1, min(int(limit), BROWSE_DEFAULT_LIMIT))
+    end = min(start + page_size, len(positions))
+
+    next_cursor = None
+    if end < len(positions):
+        last_value, last_idx = keys[end - 1]
+        next_cursor = _encode_browse_cursor(sort, (None if last_value == float("inf") else last_value, last_idx))
+    return {
+        "results": prepare_items_for_display(stored_items[idx] for idx in positions[start:end]),
+        "total": len(positions),
+        "next_cursor": next_cursor,
+    }
+
+
 def _sanitize_item_images(items):
     """
     Skipped since images are now correctly pre-processed and extracted by model number.
@@ -605,33 +1353,150 @@ def _sanitize_item_images(items):
     pass
 
 
+def _item_image_key(item) -> str:
+    blob = json.dumps(item, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.md5(blob.encode("utf-8")).hexdigest()
+
+
+def _image_resolution_signature() -> str:
+    """Changes whenever image resolution could give different answers for the same item."""
+    _build_image_path_cache()
+    state = (
+        RESOLVED_IMAGES_VERSION,
+        CACHE_SCHEMA_VERSION,
+        sorted((_image_cache_dirs or {}).items()),
+        len(_image_path_cache or {}),
+        sorted(HARD_PLACEHOLDER_CODES),
+        sorted(FORCE_PDF_IMAGE_CODES),
+    )
+    return hashlib.md5(repr(state).encode("utf-8")).hexdigest()
+
+
+def _load_resolved_item_images(signature: str):
+    if not os.path.exists(RESOLVED_IMAGES_FILE):
+        return None
+    try:
+        with open(RESOLVED_IMAGES_FILE, "r", encoding="utf-8") as f:
+            payload = json.load(f)
+    except Exception as e:
+        print(f"Warning: failed to read resolved item images: {e}")
+        return None
+    if not isinstance(payload, dict) or payload.get("signature") != signature:
+        return None
+    return payload
+
+
+def _save_resolved_item_images(signature: str, items_map, codes_map):
+    try:
+        tmp_path = f"{RESOLVED_IMAGES_FILE}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"signature": signature, "items": items_map, "codes": codes_map}, f)
+        os.replace(tmp_path, RESOLVED_IMAGES_FILE)
+    except Exception as e:
+        print(f"Warning: failed to save resolved item images: {e}")
+
+
 def _normalize_item_images(items):
     global _resolved_code_to_image_cache
+    items = items or []
     _resolved_code_to_image_cache.clear()
-    
+
+    # Reuse the images resolved last time for items that have not changed
+    # since, as long as the image folders have not changed either.
+    signature = _image_resolution_signature()
+    previous = _load_resolved_item_images(signature)
+    keys = [_item_image_key(item) for item in items]
+    pending = items
+    if previous:
+        known = previous.get("items") or {}
+        _resolved_code_to_image_cache.update(previous.get("codes") or {})
+        pending = []
+        for item, key in zip(items, keys):
+            if key in known:
+                item["images"] = list(known[key])
+            else:
+                pending.append(item)
+        if pending:
+            print(f"Resolving images for {len(pending)} new or changed items")
+
     # Run 3 passes to allow image resolution to propagate to variant/sibling codes
+    for pass_num in range(3):
+        for item in pending:
+            best_image = _best_item_image(item)
+            if best_image:
+                item["images"] = [best_image]
+
+    if pending or not previous:
+        # Key results by both the incoming and the resolved form of each item,
+        # so the next load and the next save_index can both reuse them.
+        items_map = {}
+        for item, key in zip(items, keys):
+            resolved = list(item.get("images") or [])
+            items_map[key] = resolved
+            items_map[_item_image_key(item)] = resolved
+        _save_resolved_item_images(signature, items_map, dict(_resolved_code_to_image_cache))
+
+def _normalize_new_item_images(items):
+    # Same passes as _normalize_item_images, limited to freshly added items.
     for pass_num in range(3):
         for item in items or []:
             best_image = _best_item_image(item)
             if best_image:
                 item["images"] = [best_image]
 
+
+def _keyword_index_as_dict():
+    if isinstance(keyword_index, binary_index.PackedKeywordIndex):
+        return keyword_index.to_dict()
+    return keyword_index
+
+
+def _write_binary_index(index_file: str, items, postings):
+    if not BINARY_INDEX_ENABLED:
+        return
+    bin_file = binary_index.binary_path_for(index_file)
+    try:
+        binary_index.write_index(bin_file, items, postings, binary_index.source_signature(index_file))
+    except Exception as e:
+        # Typically the old file is still mapped (Windows). The JSON copy is
+        # authoritative, so the next load simply falls back to it.
+        print(f"Warning: failed to write binary index {bin_file}: {e}")
+
+
 def save_index():
-    global stored_items, keyword_index
+    with _index_save_lock:
+        _save_full_index()
+
+
+def _save_full_index():
+    global stored_items, keyword_index, _delta_items_on_disk, _index_rewrite_pending
     _sanitize_item_images(stored_items)
     _normalize_item_images(stored_items)
+    postings = _keyword_index_as_dict()
     data = {
         "stored_items": stored_items,
-        "keyword_index": keyword_index
+        "keyword_index": postings
     }
-    with open(INDEX_FILE, "w", encoding="utf-8") as f:
+    # Write atomically; a background flush may be interrupted by shutdown.
+    tmp_path = f"{INDEX_FILE}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
         json.dump(data, f)
+    os.replace(tmp_path, INDEX_FILE)
     print(f"Index saved to {INDEX_FILE}")
+    _write_binary_index(INDEX_FILE, stored_items, postings)
+    _set_catalog_summary(_build_catalog_summary())
+    _save_catalog_summary(INDEX_FILE, catalog_summary_cache)
+
+    # Everything pending is now part of the full index.
+    _pending_delta_batches.clear()
+    _delta_items_on_disk = 0
+    _index_rewrite_pending = False
+    _remove_index_delta(INDEX_FILE)
 
     # Synchronously save image cache too
     if _image_path_cache:
         try:
-            payload = {"__schema__": CACHE_SCHEMA_VERSION, "paths": _image_path_cache}
+            payload = _image_cache_payload()
             with open(IMAGE_CACHE_FILE, "w", encoding="utf-8") as f:
                 json.dump(payload, f)
             if IMAGE_CACHE_FILE_BUNDLED and IMAGE_CACHE_FILE_BUNDLED != IMAGE_CACHE_FILE:
@@ -640,20 +1505,162 @@ def save_index():
         except Exception as e:
             print(f"Warning: failed to save image cache: {e}")
 
+    _sync_index_remotes(postings)
+
+
+def _remote_index_enabled() -> bool:
+    return cloud_storage.is_enabled() or mongodb.is_enabled()
+
+
+def _sync_index_remotes(postings) -> bool:
+    """Push the in-memory index to cloud storage and MongoDB. False if either failed."""
+    global _index_cache_signature, _remote_index_stale
+    synced = True
     if cloud_storage.is_enabled():
         try:
-            cloud_storage.upload_file(
-                cloud_storage.SYSTEM_BUCKET,
-                SEARCH_INDEX_OBJECT_PATH,
-                INDEX_FILE,
-                "application/json",
-            )
-            print("Index synced to cloud storage.")
+            result = cloud_index.save(stored_items, postings, SEARCH_INDEX_OBJECT_PATH)
+            if result["uploaded"]:
+                print(f"Index synced to cloud storage ({result['uploaded']} of {result['chunks']} chunks uploaded).")
         except Exception as e:
             print(f"Warning: failed to sync index to cloud storage: {e}")
+            synced = False
+
+    if mongodb.is_enabled():
+        saved = mongodb.save_search_index({"stored_items": stored_items, "keyword_index": postings})
+        if not saved:
+            synced = False
+        elif _index_cache_signature and _index_cache_signature[0] == "mongodb":
+            # This process already holds what it just saved; don't reload it as changed.
+            _index_cache_signature = ("mongodb", saved["generation"], saved["content_hash"])
+
+    # Retried by the next flush, including the one at shutdown.
+    _remote_index_stale = not synced
+    return synced
+
+def _delta_path_for(index_file: str) -> str:
+    return os.path.splitext(index_file)[0] + INDEX_DELTA_SUFFIX
+
+
+def _remove_index_delta(index_file: str):
+    path = _delta_path_for(index_file)
+    if os.path.exists(path):
+        try:
+            os.remove(path)
+        except OSError as e:
+            print(f"Warning: could not remove index delta log: {e}")
+
+
+def _replay_index_delta(index_file: str) -> int:
+    """Append items and postings from the delta log that the main index does not have yet."""
+    path = _delta_path_for(index_file)
+    if not os.path.exists(path):
+        return 0
+
+    replayed = 0
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    batch = json.loads(line)
+                except ValueError:
+                    print("Warning: ignoring truncated entry at the end of the index delta log")
+                    break
+                start = int(batch.get("start", 0))
+                items = batch.get("items") or []
+                if start + len(items) <= len(stored_items):
+                    continue  # already merged into the main index
+                if start != len(stored_items):
+                    print(f"Warning: index delta log does not match the index (batch at {start}, index has {len(stored_items)} items)")
+                    break
+                stored_items.extend(items)
+                for word, ids in (batch.get("postings") or {}).items():
+                    keyword_index.setdefault(word, []).extend(ids)
+                replayed += len(items)
+    except Exception as e:
+        print(f"Warning: failed to replay index delta log: {e}")
+    if replayed:
+        print(f"Index delta: replayed {replayed} items from {path}")
+    return replayed
+
+
+def _schedule_index_save():
+    global _index_save_timer
+    with _index_save_lock:
+        if _index_save_timer is not None:
+            _index_save_timer.cancel()
+        _index_save_timer = threading.Timer(INDEX_SAVE_DELAY_SECONDS, flush_index_saves)
+        _index_save_timer.daemon = True
+        _index_save_timer.start()
+
+
+def flush_index_saves(compact: bool = False):
+    """
+    Write add_to_index batches that are still only in memory. Appends them to
+    the delta log, or rewrites the full index when `compact` is set, items
+    on disk were patched, or the log has grown past INDEX_DELTA_MAX_ITEMS.
+    The delta log is local only, so cloud storage and MongoDB receive the
+    whole index on every flush.
+    """
+    global _delta_items_on_disk
+    with _index_save_lock:
+        if not _pending_delta_batches and not compact and not _index_rewrite_pending and not _remote_index_stale:
+            return
+        pending_items = sum(len(batch["items"]) for batch in _pending_delta_batches)
+        if (
+            compact
+            or _index_rewrite_pending
+            or not os.path.exists(INDEX_FILE)
+            or _delta_items_on_disk + pending_items > INDEX_DELTA_MAX_ITEMS
+        ):
+            _save_full_index()
+            return
+
+        if _pending_delta_batches:
+            try:
+                with open(_delta_path_for(INDEX_FILE), "a", encoding="utf-8") as f:
+                    for batch in _pending_delta_batches:
+                        f.write(json.dumps(batch) + "\n")
+                _delta_items_on_disk += pending_items
+                _pending_delta_batches.clear()
+            except Exception as e:
+                print(f"Warning: failed to append index delta log, saving full index: {e}")
+                _save_full_index()
+                return
+
+        # Hosts without a persistent disk (Railway) only keep what reached the remotes.
+        if _remote_index_enabled():
+            _sync_index_remotes(_keyword_index_as_dict())
+
+
+def patch_item_images(urls: dict) -> int:
+    """
+    Replace image paths on indexed items using `urls` ({old path: new path}),
+    e.g. local /static/images files that finished uploading to cloud storage.
+    The delta log only appends items, so a patch schedules a full save.
+    """
+    global _index_rewrite_pending
+    if not urls:
+        return 0
+    patched = 0
+    with _index_save_lock:
+        for item in stored_items:
+            images = item.get("images")
+            if not images:
+                continue
+            updated = [urls.get(path, path) if isinstance(path, str) else path for path in images]
+            if updated != images:
+                item["images"] = updated
+                patched += 1
+        if patched:
+            _bump_index_generation()
+            _index_rewrite_pending = True
+    if patched:
+        _schedule_index_save()
+    return patched
+
 
 def load_index(force: bool = False):
-    global stored_items, keyword_index, vector_index, search_cache, catalog_summary_cache, item_code_meta_cache, _index_cache_signature
+    global stored_items, keyword_index, vector_index, catalog_summary_cache, item_code_meta_cache, _index_cache_signature, _keyword_substring_index, _keyword_keys_sorted, _delta_items_on_disk, _index_rewrite_pending
     
     # print(f"DEBUG: load_index(force={force})")
     
@@ -679,6 +1686,8 @@ def load_index(force: bool = False):
                 with open("backend_debug.txt", "a") as f:
                     f.write(f"{datetime.now()} - Syncing index files...\n")
                 shutil.copy2(INDEX_FILE_BUNDLED, INDEX_FILE_PERSISTENT)
+                if os.path.exists(INDEX_BIN_FILE_BUNDLED) and INDEX_BIN_FILE_BUNDLED != INDEX_BIN_FILE_PERSISTENT:
+                    shutil.copy2(INDEX_BIN_FILE_BUNDLED, INDEX_BIN_FILE_PERSISTENT)
                 with open("backend_debug.txt", "a") as f:
                     f.write(f"{datetime.now()} - Syncing done.\n")
                 print(f"Automatic Sync: Overwrote persistent index with latest bundled version.")
@@ -695,11 +1704,7 @@ def load_index(force: bool = False):
         
     if not os.path.exists(index_file) and cloud_storage.is_enabled():
         try:
-            restored = cloud_storage.download_to_path(
-                cloud_storage.SYSTEM_BUCKET,
-                SEARCH_INDEX_OBJECT_PATH,
-                index_file,
-            )
+            restored = cloud_index.restore(SEARCH_INDEX_OBJECT_PATH, index_file)
             if restored:
                 print("Restored search index from cloud storage.")
         except Exception as e:
@@ -709,33 +1714,67 @@ def load_index(force: bool = False):
     loaded_from_mongo = False
     if mongodb.is_enabled():
         try:
-            mongo_data = mongodb.load_search_index()
-            if mongo_data:
-                stored_items = mongo_data.get("stored_items", [])
-                keyword_index = mongo_data.get("keyword_index", {})
-                print(f"Index loaded dynamically: {len(stored_items)} items loaded from MongoDB Cloud!")
-                _index_cache_signature = "mongodb"
-                loaded_from_mongo = True
+            manifest = mongodb.load_search_index_manifest()
+            if manifest:
+                signature = ("mongodb", manifest.get("generation"), manifest.get("content_hash"))
+                if not force and stored_items and _index_cache_signature == signature:
+                    return True
+                mongo_data = mongodb.load_search_index(manifest)
+                if mongo_data:
+                    stored_items = mongo_data.get("stored_items", [])
+                    keyword_index = mongo_data.get("keyword_index", {})
+                    print(f"Index loaded dynamically: {len(stored_items)} items loaded from MongoDB Cloud!")
+                    _index_cache_signature = ("mongodb", mongo_data.get("generation"), mongo_data.get("content_hash"))
+                    loaded_from_mongo = True
+                    # Batches from before this load belong to the replaced index. Items
+                    # this instance logged locally but never got into MongoDB are
+                    # appended again, and a full save pushes them back up.
+                    _pending_delta_batches.clear()
+                    _delta_items_on_disk = _replay_index_delta(INDEX_FILE)
+                    if _delta_items_on_disk:
+                        _index_rewrite_pending = True
+                        _schedule_index_save()
         except Exception as e:
             print(f"Warning: Failed to load search index from MongoDB: {e}")
 
     if not loaded_from_mongo and os.path.exists(index_file):
+        # Write batches still waiting on the debounce first; reloading would
+        # drop them from memory while their delta offsets stay queued.
+        flush_index_saves()
         try:
             signature = (index_file, os.path.getmtime(index_file), os.path.getsize(index_file))
             if not force and stored_items and _index_cache_signature == signature:
                 return True
 
-            with open(index_file, "r", encoding="utf-8-sig") as f:
-                data = json.load(f)
-                stored_items = data.get("stored_items", [])
-                keyword_index = data.get("keyword_index", {})
-            print(f"Index loaded: {len(stored_items)} items from {index_file}")
+            packed = None
+            if BINARY_INDEX_ENABLED:
+                packed = binary_index.read_index(
+                    binary_index.binary_path_for(index_file),
+                    binary_index.source_signature(index_file),
+                )
+            if packed:
+                stored_items, keyword_index = packed
+                print(f"Index loaded: {len(stored_items)} items from binary index for {index_file}")
+            else:
+                with open(index_file, "r", encoding="utf-8-sig") as f:
+                    data = json.load(f)
+                    stored_items = data.get("stored_items", [])
+                    keyword_index = data.get("keyword_index", {})
+                print(f"Index loaded: {len(stored_items)} items from {index_file}")
+                # Convert once so the next start-up can skip JSON parsing.
+                _write_binary_index(index_file, stored_items, keyword_index)
             _index_cache_signature = signature
+            _delta_items_on_disk = _replay_index_delta(index_file)
 
-            # Auto-seed MongoDB if enabled but empty
+            # Seed MongoDB; unchanged content is detected by hash and not re-sent.
+            # Under the save lock so it cannot overlap a debounced full save.
             if mongodb.is_enabled():
                 try:
-                    mongodb.save_search_index(data)
+                    with _index_save_lock:
+                        mongodb.save_search_index({
+                            "stored_items": stored_items,
+                            "keyword_index": _keyword_index_as_dict(),
+                        })
                 except Exception as e:
                     print(f"Warning: Failed to seed MongoDB: {e}")
 
@@ -746,19 +1785,30 @@ def load_index(force: bool = False):
         try:
             item_code_meta_cache = {}
             _enrich_items_for_search(stored_items)
-            search_cache.clear()
 
             # Strip bad/wrong product images (cover logos, tiny icons, missing files)
             _sanitize_item_images(stored_items)
             _normalize_item_images(stored_items)
+            _rebuild_search_features()
 
             # Reset caches
-            search_cache = {}
-            catalog_summary_cache = None
-            _suggestion_cache.clear()
+            _bump_index_generation()
+            _get_collection_index()
+
+            # The summary saved with the index is only valid without a replayed delta.
+            summary = None
+            summary_persistable = not loaded_from_mongo and not _delta_items_on_disk and os.path.exists(index_file)
+            if summary_persistable:
+                summary = _load_catalog_summary(index_file)
+            if summary is None:
+                summary = _build_catalog_summary()
+                if summary_persistable:
+                    _save_catalog_summary(index_file, summary)
+            _set_catalog_summary(summary)
 
             # Build sorted keyword key list for fast bisect prefix lookup
-            _keyword_keys_sorted[:] = sorted(keyword_index.keys())
+            _keyword_keys_sorted = sorted(keyword_index.keys())
+            _keyword_substring_index = SubstringIndex(keyword_index)
 
             # Rebuild FAISS in background to avoid blocking API
             if AI_AVAILABLE and FAISS_AVAILABLE and stored_items:
@@ -794,24 +1844,30 @@ def _rebuild_faiss_background():
         print(f"FAISS rebuild failed: {e}")
 
 def reset_index():
-    global stored_items, keyword_index, vector_index, search_cache, catalog_summary_cache, item_code_meta_cache, _suggestion_cache
+    global stored_items, keyword_index, vector_index, catalog_summary_cache, item_code_meta_cache, _keyword_substring_index, _keyword_keys_sorted, _search_features, _delta_items_on_disk
+    with _index_save_lock:
+        _pending_delta_batches.clear()
+        _delta_items_on_disk = 0
     stored_items   = []
     keyword_index  = {}
     vector_index   = None
-    search_cache   = {}
     catalog_summary_cache = None
     item_code_meta_cache = {}
-    _suggestion_cache = {}  # Clear suggestion cache on index reset
-    _keyword_keys_sorted.clear()
-    if os.path.exists(INDEX_FILE):
+    _bump_index_generation()
+    _keyword_keys_sorted = []
+    _keyword_substring_index = SubstringIndex()
+    _search_features = []
+    for path in (INDEX_FILE, binary_index.binary_path_for(INDEX_FILE), _delta_path_for(INDEX_FILE)):
+        if not os.path.exists(path):
+            continue
         try:
-            os.remove(INDEX_FILE)
+            os.remove(path)
         except OSError as e:
             # The file may be temporarily locked on Windows; save_index() will overwrite it.
             print(f"Warning: could not remove old index file, will overwrite on save: {e}")
     if cloud_storage.is_enabled():
         try:
-            cloud_storage.delete_object(cloud_storage.SYSTEM_BUCKET, SEARCH_INDEX_OBJECT_PATH)
+            cloud_index.delete(SEARCH_INDEX_OBJECT_PATH)
         except Exception as e:
             print(f"Warning: failed to delete cloud search index: {e}")
 
@@ -845,34 +1901,155 @@ def _looks_like_model_code(text: str) -> bool:
     if not text: return False
     return bool(re.search(r'\d', text))
 
+# Quote thumbnails and downloaded quote images used to be cached under
+# static/images; directories an older version left there are not product images.
+LEGACY_IMAGE_CACHE_DIRS = {"_quote_thumbs", "_quote_cache"}
+
+
+def _image_dirs_signature():
+    """mtime of every directory under the image roots; adding or removing a file changes it."""
+    signature = {}
+    for img_root in IMAGE_ROOTS:
+        if not os.path.isdir(img_root):
+            continue
+        pending = [img_root]
+        while pending:
+            directory = pending.pop()
+            try:
+                signature[directory] = os.stat(directory).st_mtime_ns
+                with os.scandir(directory) as entries:
+                    pending.extend(
+                        entry.path for entry in entries
+                        if entry.is_dir(follow_symlinks=False) and entry.name not in LEGACY_IMAGE_CACHE_DIRS
+                    )
+            except OSError:
+                continue
+    return signature
+
+
+def _image_cache_payload():
+    return {
+        "__schema__": CACHE_SCHEMA_VERSION,
+        "paths": _image_path_cache or {},
+        "files": {
+            path: [facts.size, facts.brand, facts.page_extracted, facts.cover]
+            for path, facts in _image_facts_cache.items()
+            if facts.size >= 0
+        },
+        "dirs": _image_cache_dirs or {},
+    }
+
+
+def _save_image_path_cache():
+    try:
+        with open(IMAGE_CACHE_FILE, "w", encoding="utf-8") as f:
+            json.dump(_image_cache_payload(), f)
+    except Exception:
+        pass
+
+
+def _set_image_path_cache(paths, dirs, files=None):
+    global _image_path_cache, _image_key_index, _image_cache_dirs, _image_cache_checked_at
+    _image_facts_cache.clear()
+    if files:
+        for path, (size, brand, page_extracted, cover) in files.items():
+            _image_facts_cache[path] = _ImageFacts(path, size, brand, page_extracted, cover)
+    else:
+        # Stat every cached file once up front; later lookups never touch the disk.
+        for cached_paths in paths.values():
+            for path in cached_paths:
+                _image_facts(path)
+    _image_path_cache = paths
+    _image_key_index = SubstringIndex(paths)
+    _image_cache_dirs = dirs
+    _image_cache_checked_at = time.monotonic()
+
+
+def _refresh_image_path_cache_if_stale():
+    """
+    Throttled check whether files were added to or removed from the image
+    folders. The check and any rebuild run in a background thread; lookups
+    keep using the current cache until the new one is swapped in.
+    """
+    global _image_cache_checked_at, _image_cache_refreshing
+    if IMAGE_CACHE_REFRESH_SECONDS <= 0:
+        return
+    now = time.monotonic()
+    with _image_cache_refresh_lock:
+        if _image_cache_refreshing or now - _image_cache_checked_at < IMAGE_CACHE_REFRESH_SECONDS:
+            return
+        _image_cache_checked_at = now
+        _image_cache_refreshing = True
+    threading.Thread(target=_refresh_image_path_cache_background, daemon=True).start()
+
+
+def _refresh_image_path_cache_background():
+    global _image_cache_refreshing
+    try:
+        if _image_dirs_signature() == _image_cache_dirs:
+            return
+        print("Image folders changed; rebuilding image path cache.")
+        with _image_cache_build_lock:
+            _walk_image_path_cache()
+        _resolved_code_to_image_cache.clear()
+        _bump_index_generation()
+    except Exception as e:
+        print(f"Warning: failed to rebuild image path cache: {e}")
+    finally:
+        _image_cache_refreshing = False
+
+
 def _build_image_path_cache():
-    global _image_path_cache
     if _image_path_cache is not None:
+        _refresh_image_path_cache_if_stale()
         return _image_path_cache
-
-    # 1. Try loading from persistent file first
-    for path in [IMAGE_CACHE_FILE, IMAGE_CACHE_FILE_BUNDLED]:
-        if os.path.exists(path):
-            try:
-                with open(path, "r", encoding="utf-8") as f:
-                    payload = json.load(f)
-                    if isinstance(payload, dict) and payload.get("__schema__") == CACHE_SCHEMA_VERSION:
+    with _image_cache_build_lock:
+        if _image_path_cache is not None:
+            return _image_path_cache  # built by a concurrent request
+        # 1. Try loading from persistent file first
+        current_dirs = _image_dirs_signature()
+        for path in [IMAGE_CACHE_FILE, IMAGE_CACHE_FILE_BUNDLED]:
+            if os.path.exists(path):
+                try:
+                    with open(path, "r", encoding="utf-8") as f:
+                        payload = json.load(f)
+                    if isinstance(payload, dict) and payload.get("__schema__") in (2, CACHE_SCHEMA_VERSION):
                         cached_paths = payload.get("paths", {})
+                        cached_dirs = payload.get("dirs")
+                        cached_files = payload.get("files")
                         if isinstance(cached_paths, dict):
-                            _image_path_cache = cached_paths
+                            if isinstance(cached_dirs, dict) and isinstance(cached_files, dict):
+                                if cached_dirs == current_dirs:
+                                    _set_image_path_cache(cached_paths, cached_dirs, cached_files)
+                                    print(f"Loaded image path cache from {path}: {len(_image_path_cache)} entries")
+                                    return _image_path_cache
+                                print(f"Image folders changed since {path} was written; rebuilding.")
+                                break
+                            # Older cache without file details: keep its paths, record
+                            # sizes and the current folder state once.
+                            _set_image_path_cache(cached_paths, current_dirs)
+                            _save_image_path_cache()
                             print(f"Loaded image path cache from {path}: {len(_image_path_cache)} entries")
                             return _image_path_cache
                     print(f"Ignoring legacy image cache at {path}; rebuilding for brand-folder support.")
-            except Exception as e:
-                print(f"Warning: image cache file error at {path}: {e}")
+                except Exception as e:
+                    print(f"Warning: image cache file error at {path}: {e}")
+
+        # 2. Walk directory if cache missing, failed or stale
+        return _walk_image_path_cache()
+
 
-    # 2. Walk directory if cache missing or failed
+def _walk_image_path_cache():
+    """Index every file under the image roots and save the result; call with _image_cache_build_lock held."""
+    current_dirs = _image_dirs_signature()
     cache = {}
+    sizes = {}
     # Check both persistent and bundled image roots.
     for img_root in IMAGE_ROOTS:
         if os.path.isdir(img_root):
             print(f"Walking image directory to build cache: {img_root}")
-            for root, _, files in os.walk(img_root):
+            for root, dirs, files in os.walk(img_root):
+                dirs[:] = [name for name in dirs if name not in LEGACY_IMAGE_CACHE_DIRS]
                 for filename in files:
                     stem = os.path.splitext(filename)[0]
                     stems = [stem]
@@ -884,6 +2061,11 @@ def _build_image_path_cache():
                     rel_dir = os.path.relpath(root, img_root).replace("\\", "/")
                     rel_path = f"{filename}" if rel_dir == "." else f"{rel_dir}/{filename}"
                     public_path = f"/static/images/{rel_path}"
+                    if public_path not in sizes:
+                        try:
+                            sizes[public_path] = os.path.getsize(os.path.join(root, filename))
+                        except OSError:
+                            sizes[public_path] = -1
                     
                     seen_compacts = set()
                     for s_item in stems:
@@ -892,13 +2074,9 @@ def _build_image_path_cache():
                             seen_compacts.add(compact)
                             cache.setdefault(compact, []).append(public_path)
 
-    _image_path_cache = cache
+    _set_image_path_cache(cache, current_dirs, {path: (size, None, None, None) for path, size in sizes.items()})
     # Save newly built cache
-    try:
-        with open(IMAGE_CACHE_FILE, "w", encoding="utf-8") as f:
-            json.dump({"__schema__": CACHE_SCHEMA_VERSION, "paths": cache}, f)
-    except Exception:
-        pass
+    _save_image_path_cache()
         
     return cache
 
@@ -908,24 +2086,14 @@ def _pick_best_image_match(item, matches):
         return None
 
     item_brand = _item_brand(item)
+    item_folder = item_brand.lower()
 
     def sort_key(path: str):
-        normalized = str(path or "").replace("\\", "/").lower()
-        brand_hint = _image_brand_hint(path)
-        brand_score = 10 if item_brand and brand_hint == item_brand else 1 if brand_hint else 0
-        cover_penalty = -5 if _is_cover_page_image(path) else 0
-        
+        facts = _image_facts(path)
+        brand_score = 10 if item_brand and facts.brand == item_brand else 1 if facts.brand else 0
         # Prioritize files in the brand's own subfolder (Kohler/ or Aquant/)
-        in_brand_folder = 0
-        if item_brand:
-            brand_folder_part = f"/{item_brand.lower()}/"
-            if brand_folder_part in normalized:
-                in_brand_folder = 20
-                
-        folder_boost = 5 if "/" in normalized and not normalized.startswith("manual/") else 0
-        manual_penalty = -1 if "/manual/" in normalized else 0
-        depth_penalty = -normalized.count("/")
-        return (in_brand_folder, brand_score, folder_boost, cover_penalty, manual_penalty, depth_penalty)
+        in_brand_folder = 20 if item_folder and item_folder in facts.folders else 0
+        return (in_brand_folder, brand_score) + facts.rank_tail
 
     return max(matches, key=sort_key)
 
@@ -1052,16 +2220,15 @@ def _best_item_image(item):
 
     res_img = None
 
-    # Exact & Prefix match on unique_keys
+    # Exact & Prefix match on unique_keys (a prefix match is also a substring match)
     for k in unique_keys:
         valid_matches = []
-        for cache_key, paths in image_cache.items():
-            if cache_key.startswith(k) or k in cache_key:
-                for p in paths:
-                    if _is_page_extracted_image(p):
-                        continue
-                    if _image_file_size(p) >= _MIN_PRODUCT_IMAGE_SIZE:
-                        valid_matches.append(p)
+        for cache_key in _image_key_index.find(k):
+            for p in image_cache[cache_key]:
+                if _is_page_extracted_image(p):
+                    continue
+                if _image_file_size(p) >= _MIN_PRODUCT_IMAGE_SIZE:
+                    valid_matches.append(p)
         if valid_matches:
             res_img = _pick_best_image_match(item, valid_matches)
             break
@@ -1070,13 +2237,12 @@ def _best_item_image(item):
     if not res_img:
         for d in digit_fallback_keys:
             valid_matches = []
-            for cache_key, paths in image_cache.items():
-                if d in cache_key:
-                    for p in paths:
-                        if _is_page_extracted_image(p):
-                            continue
-                        if _image_file_size(p) >= _MIN_PRODUCT_IMAGE_SIZE:
-                            valid_matches.append(p)
+            for cache_key in _image_key_index.find(d):
+                for p in image_cache[cache_key]:
+                    if _is_page_extracted_image(p):
+                        continue
+                    if _image_file_size(p) >= _MIN_PRODUCT_IMAGE_SIZE:
+                        valid_matches.append(p)
             if valid_matches:
                 res_img = _pick_best_image_match(item, valid_matches)
                 break
@@ -1275,92 +2441,151 @@ def _item_brand(item):
     return ""
 
 def add_to_index(_unused_embeddings, items):
-    global stored_items, keyword_index, vector_index, search_cache
-
-    search_cache = {}
-    _enrich_items_for_search(items)
-    start_idx = len(stored_items)
-    stored_items.extend(items)
-
-    for i, item in enumerate(items):
-        idx = start_idx + i
-        text = item.get("text", "")
-        name = item.get("name", "")
-        brand = item.get("brand", "")
-        source = item.get("source", "")
-        search_blob = f"{brand} {name}\n{text} {source}".strip()
-        blob_lower = search_blob.lower()
-
-        # Build list of unique tokens to index
-        words_to_index = set()
-
-        # 1. Broad split on any separator (including en-dash, dots, etc)
-        tokens = re.split(r'[\s\-\/\.\_\u2013\u2014\(\)\[\],:;]+', blob_lower)
-        for w in tokens:
-            w = w.strip()
-            if len(w) >= 2:
-                words_to_index.add(w)
-                # If it looks like model/code like K12345IN, store normalized variant as well.
-                if _code_like(w):
-                    words_to_index.add(_normalize(w, strip_in=True))
-
-        # 2. Extract model/code tokens explicitly (e.g. k-12345in, 9272, 2594cp)
-        for model_tok in _extract_model_tokens(search_blob):
-            words_to_index.add(model_tok)
-            norm_tok = _normalize(model_tok, strip_in=True)
-            compact_tok = _compact_alnum(model_tok)
-            if len(norm_tok) >= 3:
-                words_to_index.add(norm_tok)
-            if len(compact_tok) >= 3:
-                words_to_index.add(compact_tok)
+    global stored_items, keyword_index, vector_index, catalog_summary_cache, _keyword_keys_sorted
 
-        code_meta = _get_item_code_metadata(item)
-        for meta_key in ("base_code", "variant_code", "full_code"):
-            meta_value = code_meta.get(meta_key, "")
-            if not meta_value:
-                continue
-            words_to_index.add(meta_value.lower())
-            compact_value = _compact_alnum(meta_value)
-            normalized_value = _normalize(meta_value, strip_in=True)
-            if len(compact_value) >= 3:
-                words_to_index.add(compact_value)
-            if len(normalized_value) >= 3:
-                words_to_index.add(normalized_value)
-
-        # 3. Add normalized name and first text slice for combined code-name queries
-        norm_name = _normalize(name, strip_in=True)
-        norm_head = _normalize(text[:120], strip_in=True)
-        if len(norm_name) >= 3:
-            words_to_index.add(norm_name)
-        if len(norm_head) >= 3:
-            words_to_index.add(norm_head)
-
-        for w in words_to_index:
-            if w:
-                keyword_index.setdefault(w, []).append(idx)
-
-    # FAISS Vector Indexing
+    # Encode outside the lock; only adding the vectors touches shared state.
+    embeddings = None
     if AI_AVAILABLE and FAISS_AVAILABLE:
         try:
             texts      = [item["text"] for item in items]
             embeddings = model.encode(texts, convert_to_numpy=True, show_progress_bar=False)
             embeddings = embeddings.astype(np.float32)
             faiss.normalize_L2(embeddings)
-
-            if vector_index is None:
-                dim = embeddings.shape[1]
-                vector_index = faiss.IndexFlatIP(dim)
-
-            vector_index.add(embeddings)
-            print(f"Indexed {len(items)} blocks (total: {len(stored_items)})")
         except Exception as e:
             print(f"Embedding error: {e}")
+            embeddings = None
+
+    # Every structure is updated under the lock and the generation is bumped
+    # last, so a concurrent search cannot cache a half-added batch under the
+    # new generation.
+    with _index_save_lock:
+        previous_generation = _index_generation
+        catalog_summary_cache = None
+        _enrich_items_for_search(items)
+        start_idx = len(stored_items)
+        new_keys = []
+        batch_postings = {}
+        stored_items.extend(items)
+        if len(_search_features) == start_idx:
+            _search_features.extend(_SearchFeatures(item) for item in items)
+        lookup = _exact_lookup
+        if (
+            lookup is not None
+            and lookup.generation == previous_generation
+            and len(lookup) == start_idx
+            and len(_search_features) == len(stored_items)
+        ):
+            lookup.extend(items, _search_features[start_idx:], previous_generation + 1)
+
+        for i, item in enumerate(items):
+            idx = start_idx + i
+            text = item.get("text", "")
+            name = item.get("name", "")
+            brand = item.get("brand", "")
+            source = item.get("source", "")
+            search_blob = f"{brand} {name}\n{text} {source}".strip()
+            blob_lower = search_blob.lower()
+
+            # Build list of unique tokens to index
+            words_to_index = set()
+
+            # 1. Broad split on any separator (including en-dash, dots, etc)
+            tokens = re.split(r'[\s\-\/\.\_\u2013\u2014\(\)\[\],:;]+', blob_lower)
+            for w in tokens:
+                w = w.strip()
+                if len(w) >= 2:
+                    words_to_index.add(w)
+                    # If it looks like model/code like K12345IN, store normalized variant as well.
+                    if _code_like(w):
+                        words_to_index.add(_normalize(w, strip_in=True))
+
+            # 2. Extract model/code tokens explicitly (e.g. k-12345in, 9272, 2594cp)
+            for model_tok in _extract_model_tokens(search_blob):
+                words_to_index.add(model_tok)
+                norm_tok = _normalize(model_tok, strip_in=True)
+                compact_tok = _compact_alnum(model_tok)
+                if len(norm_tok) >= 3:
+                    words_to_index.add(norm_tok)
+                if len(compact_tok) >= 3:
+                    words_to_index.add(compact_tok)
+
+            code_meta = _get_item_code_metadata(item)
+            for meta_key in ("base_code", "variant_code", "full_code"):
+                meta_value = code_meta.get(meta_key, "")
+                if not meta_value:
+                    continue
+                words_to_index.add(meta_value.lower())
+                compact_value = _compact_alnum(meta_value)
+                normalized_value = _normalize(meta_value, strip_in=True)
+                if len(compact_value) >= 3:
+                    words_to_index.add(compact_value)
+                if len(normalized_value) >= 3:
+                    words_to_index.add(normalized_value)
+
+            # 3. Add normalized name and first text slice for combined code-name queries
+            norm_name = _normalize(name, strip_in=True)
+            norm_head = _normalize(text[:120], strip_in=True)
+            if len(norm_name) >= 3:
+                words_to_index.add(norm_name)
+            if len(norm_head) >= 3:
+                words_to_index.add(norm_head)
+
+            for w in words_to_index:
+                if w:
+                    if w not in keyword_index:
+                        new_keys.append(w)
+                    keyword_index.setdefault(w, []).append(idx)
+                    batch_postings.setdefault(w, []).append(idx)
+
+        # Only new items need their images resolved; the full pass runs when the delta is compacted.
+        _normalize_new_item_images(items)
+        _pending_delta_batches.append({"start": start_idx, "items": items, "postings": batch_postings})
+
+        # Keep the sorted key list for bisect prefix search in get_suggestions
+        # current. Built as a new list and swapped in, so a bisect running
+        # concurrently keeps scanning a consistent snapshot.
+        new_keys.sort()
+        if len(new_keys) <= max(64, len(_keyword_keys_sorted) // 64):
+            sorted_keys = list(_keyword_keys_sorted)
+            for key in new_keys:
+                bisect.insort(sorted_keys, key)
+        else:
+            sorted_keys = list(heapq.merge(_keyword_keys_sorted, new_keys))
+        _keyword_keys_sorted = sorted_keys
+        # New keys are appended to keyword_index, so only the tail needs indexing
+        _keyword_substring_index.extend(itertools.islice(keyword_index, len(_keyword_substring_index), None))
 
-    save_index()
-    # Rebuild sorted key list for fast bisect prefix search in get_suggestions
-    _keyword_keys_sorted[:] = sorted(keyword_index.keys())
-    _suggestion_cache.clear()
+        # FAISS Vector Indexing
+        if embeddings is not None:
+            try:
+                if vector_index is None:
+                    dim = embeddings.shape[1]
+                    vector_index = faiss.IndexFlatIP(dim)
+
+                vector_index.add(embeddings)
+                print(f"Indexed {len(items)} blocks (total: {len(stored_items)})")
+            except Exception as e:
+                print(f"Embedding error: {e}")
+
+        _bump_index_generation()
 
+    _schedule_index_save()
+
+
+
+def _strict_query_code(query_full_compact, query_model_tokens, query_compact):
+    # Prefer an explicit code-like token from the query (e.g. "kohler K-28220T-SL-0").
+    if query_full_compact:
+        return query_full_compact
+    for tok in query_model_tokens:
+        tok_compact = _compact_alnum(tok)
+        if len(tok_compact) >= 3 and bool(re.search(r'[a-z]', tok_compact)) and bool(re.search(r'\d', tok_compact)):
+            return tok_compact
+    for tok in query_model_tokens:
+        tok_compact = _compact_alnum(tok)
+        if len(tok_compact) >= 3 and tok_compact.isdigit():
+            return tok_compact
+    return query_compact
 
 
 def search(query: str, smart: bool = False, brand: str = None):
@@ -1381,9 +2606,10 @@ def search(query: str, smart: bool = False, brand: str = None):
     if brand_lower and brand_lower != "all" and not _is_supported_brand_name(brand_lower):
         return []
     is_all_brand = (not brand_lower) or (brand_lower == "all")
-    cache_key = f"{query}|{smart}|{brand_lower}"
-    if cache_key in search_cache:
-        return search_cache[cache_key]
+    cache_key = result_cache_key("search", query, smart, brand_lower)
+    cached = result_cache.get(cache_key)
+    if cached is not None:
+        return cached
 
     query_lower = query.lower()
     query_words = [w for w in re.split(r'[\s\-\/\.\_\u2013\u2014]+', query_lower) if len(w) >= 2]
@@ -1401,28 +2627,12 @@ def search(query: str, smart: bool = False, brand: str = None):
 
     special_family = _special_family_override_items(query_code_meta, brand_lower)
     if special_family:
-        search_cache[cache_key] = special_family
+        for item in special_family:
+            _remember_item_json(item)
+        result_cache.put(cache_key, special_family)
         return special_family
 
-    # Prefer an explicit code-like token from the query (e.g. "kohler K-28220T-SL-0").
-    strict_query_compact = ""
-    if query_full_compact:
-        strict_query_compact = query_full_compact
-    for tok in query_model_tokens:
-        if strict_query_compact:
-            break
-        tok_compact = _compact_alnum(tok)
-        if len(tok_compact) >= 3 and bool(re.search(r'[a-z]', tok_compact)) and bool(re.search(r'\d', tok_compact)):
-            strict_query_compact = tok_compact
-            break
-    if not strict_query_compact:
-        for tok in query_model_tokens:
-            tok_compact = _compact_alnum(tok)
-            if len(tok_compact) >= 3 and tok_compact.isdigit():
-                strict_query_compact = tok_compact
-                break
-    if not strict_query_compact:
-        strict_query_compact = query_compact
+    strict_query_compact = _strict_query_code(query_full_compact, query_model_tokens, query_compact)
 
     # 1. RETRIEVE CANDIDATES FAST
     candidate_indices = set()
@@ -1463,11 +2673,10 @@ def search(query: str, smart: bool = False, brand: str = None):
         
     # If no direct hits, do a partial lookup fallback.
     if not candidate_indices and (len(query_alnum) >= 3 or len(query_lower) >= 4):
-        for kindex in keyword_index:
-            if (query_alnum and query_alnum in kindex) or (query_lower in kindex):
-                candidate_indices.update(keyword_index[kindex])
-                if len(candidate_indices) > 300:
-                    break
+        for kindex in _keyword_substring_index.find(query_alnum, query_lower):
+            candidate_indices.update(keyword_index[kindex])
+            if len(candidate_indices) > 300:
+                break
 
     if not candidate_indices:
         # For model/code queries, do a strict full scan fallback.
@@ -1488,72 +2697,51 @@ def search(query: str, smart: bool = False, brand: str = None):
         if not indices_list:
             return []
 
+    features = _search_features
+    if len(features) != len(stored_items):
+        features = _rebuild_search_features()
+
     # STRICT MODE: code/model queries should resolve to one most-accurate hit.
     if is_code_query:
         query_code = strict_query_compact
         query_is_numeric = query_code.isdigit()
         query_code_relaxed = _code_relaxed(query_code)
+        query_code_clean = _clean_kohler_numeric_code(query_code)
+        query_full_relaxed = _code_relaxed(query_full_compact)
+        q_clean = _clean_kohler_numeric_code(query_base_compact)
         strict_scores = {}
         for idx in indices_list:
             item = stored_items[idx]
+            feat = features[idx]
             item_code_meta = _get_item_code_metadata(item)
-            name_lower = str(item.get("name") or "").lower()
-            text_lower = str(item.get("text") or "").lower()
-            # Restrict strict matching to header lines before "MRP" to avoid price-number noise.
-            header_lines = []
-            for raw_line in text_lower.split("\n"):
-                line = raw_line.strip()
-                if not line:
-                    continue
-                if "mrp" in line:
-                    break
-                header_lines.append(line)
-                if len(header_lines) >= 6:
-                    break
-            if not header_lines:
-                header_lines = [ln.strip() for ln in text_lower.split("\n")[:3] if ln.strip()]
-
-            blob = f"{name_lower}\n" + "\n".join(header_lines)
-            token_compacts = []
-            for tok in _extract_model_tokens(blob):
-                tok_compact = _compact_alnum(tok)
-                if len(tok_compact) >= 3:
-                    token_compacts.append(tok_compact)
+            token_codes = feat.token_codes
             best = 0.0
-            quality_bonus = _item_quality_bonus(item)
+            quality_bonus = feat.quality_bonus
+            item_bc = feat.base_compact
+            i_clean = feat.base_clean
 
             # If the query points at a specific base code, keep strict matching
             # inside that family so combo products like "1334 BG + 1333" do not
             # leak into a plain "1333" search.
-            if query_base_compact and item_code_meta.get("base_compact") not in {query_base_compact, ""}:
-                item_base_compact = item_code_meta.get("base_compact", "")
-                
+            if query_base_compact and item_bc not in {query_base_compact, ""}:
                 # Check cleaned Kohler numeric codes
-                q_clean = _clean_kohler_numeric_code(query_base_compact)
-                i_clean = _clean_kohler_numeric_code(item_base_compact)
-                
                 if q_clean and q_clean == i_clean:
                     pass
-                elif item_base_compact.endswith(query_base_compact):
+                elif item_bc.endswith(query_base_compact):
                     pass
                 elif not (
                     query_full_compact
-                    and item_code_meta.get("full_compact") == query_full_compact
+                    and feat.full_compact == query_full_compact
                 ):
                     continue
 
-            if query_full_compact and item_code_meta.get("full_compact"):
-                item_full_compact = item_code_meta["full_compact"]
-                if item_full_compact == query_full_compact:
+            if query_full_compact and feat.full_compact:
+                if feat.full_compact == query_full_compact:
                     best = max(best, 3700.0 + quality_bonus)
-                elif _code_relaxed(item_full_compact) == _code_relaxed(query_full_compact):
+                elif feat.full_relaxed == query_full_relaxed:
                     best = max(best, 3620.0 + quality_bonus)
 
             # If base compact matches (either exactly or cleaned Kohler-wise)
-            q_clean = _clean_kohler_numeric_code(query_base_compact)
-            item_bc = item_code_meta.get("base_compact", "")
-            i_clean = _clean_kohler_numeric_code(item_bc)
-            
             base_matched = query_base_compact and (item_bc == query_base_compact or (q_clean and q_clean == i_clean))
 
             if base_matched:
@@ -1569,37 +2757,32 @@ def search(query: str, smart: bool = False, brand: str = None):
 
             # Highest confidence: exact compact token equality (with OCR-tolerant equivalent).
             has_exact_code = any(
-                (tok_compact == query_code) or 
-                (_code_relaxed(tok_compact) == query_code_relaxed) or 
-                (_clean_kohler_numeric_code(tok_compact) == _clean_kohler_numeric_code(query_code))
-                for tok_compact in token_compacts
+                (tok_compact == query_code) or
+                (tok_relaxed == query_code_relaxed) or
+                (tok_clean == query_code_clean)
+                for tok_compact, tok_relaxed, tok_clean, _ in token_codes
             )
             if has_exact_code:
-                line_exact = any(_compact_alnum(line) == query_code for line in header_lines[:4])
+                line_exact = query_code in feat.header_compacts
                 best = max(best, 3000.0 + (80.0 if line_exact else 0.0) + quality_bonus)
             
             # Smart Partial Logic: If query matches start of a token (e.g. "K-277" matches "K-27792IN")
             # give it a mid-range score so it appears above generic fuzzy hits.
             if best < 2500 and len(query_code) >= 4:
-                prefix_match = any(tok_compact.startswith(query_code) for tok_compact in token_compacts)
+                prefix_match = any(tok[0].startswith(query_code) for tok in token_codes)
                 if prefix_match:
                     best = max(best, 2400.0 + quality_bonus)
             elif best < 2000 and len(query_code) >= 3:
                 # Shorter prefix match also gets a boost over totally unrelated items
-                prefix_match = any(tok_compact.startswith(query_code) for tok_compact in token_compacts)
+                prefix_match = any(tok[0].startswith(query_code) for tok in token_codes)
                 if prefix_match:
                     best = max(best, 1900.0 + quality_bonus)
 
             if best == 0 and query_is_numeric:
                 # Numeric-only search: allow exact numeric segment only (not broad substring).
-                seg_match = False
-                for tok_compact in token_compacts:
-                    segments = re.findall(r'\d{3,}', tok_compact)
-                    if query_code in segments:
-                        seg_match = True
-                        break
+                seg_match = any(query_code in tok[3] for tok in token_codes)
                 if seg_match:
-                    line_has = any(re.search(rf'(^|\D){re.escape(query_code)}(\D|$)', line) for line in header_lines[:4])
+                    line_has = any(re.search(rf'(^|\D){re.escape(query_code)}(\D|$)', line) for line in feat.header_lines[:4])
                     best = max(best, 1700.0 + (60.0 if line_has else 0.0) + quality_bonus)
 
             if best > 0:
@@ -1626,8 +2809,10 @@ def search(query: str, smart: bool = False, brand: str = None):
             # INCREASED: Show more variants (e.g. all 12+ finishes for a code)
             max_exact_results = 15
             results = unique_candidates[:max_exact_results]
-            
-            search_cache[cache_key] = results
+            for item in results:
+                _remember_item_json(item)
+
+            result_cache.put(cache_key, results)
             return results
         
         # PERMANENT: If the algorithm proved it's a code search ("7512 OG", "1186 RG") and we didn't
@@ -1640,35 +2825,33 @@ def search(query: str, smart: bool = False, brand: str = None):
         fuzzy_max = 30
 
     scores = {}
+    query_model_tok_norms = [(tok, _normalize(tok, strip_in=True)) for tok in query_model_tokens]
     
     for idx in indices_list:
         item = stored_items[idx]
+        feat = features[idx]
         item_code_meta = _get_item_code_metadata(item)
-        name_lower = str(item.get("name") or "").lower()
-        text_lower = str(item.get("text") or "").lower()
-        combined = f"{name_lower}\n{text_lower}"
-        first_line = text_lower.split('\n')[0] if text_lower else ""
+        name_lower = feat.name_lower
+        combined = feat.combined
+        first_line = feat.first_line
         s = 0.0
         
         # Priority 1: Normalized match (best for model/code)
         if len(query_norm) >= 3:
-            combined_norm = _normalize(combined, strip_in=query_has_digits)
+            combined_norm = feat.combined_code_norm if query_has_digits else feat.combined_norm
             if query_norm in combined_norm:
                 s += 550.0
 
         # Priority 2: Exact model token match
-        if query_model_tokens:
-            combined_code_norm = _normalize(combined, strip_in=True)
-            for tok in query_model_tokens:
-                tok_norm = _normalize(tok, strip_in=True)
-                if tok in combined:
-                    s += 300.0
-                elif len(tok_norm) >= 3 and tok_norm in combined_code_norm:
-                    s += 280.0
-
-        if query_base_compact and item_code_meta.get("base_compact") == query_base_compact:
+        for tok, tok_norm in query_model_tok_norms:
+            if tok in combined:
+                s += 300.0
+            elif len(tok_norm) >= 3 and tok_norm in feat.combined_code_norm:
+                s += 280.0
+
+        if query_base_compact and feat.base_compact == query_base_compact:
             s += 260.0
-        if query_full_compact and item_code_meta.get("full_compact") == query_full_compact:
+        if query_full_compact and feat.full_compact == query_full_compact:
             s += 520.0
         if query_variant_compact:
             item_variant_compact = item_code_meta.get("variant_compact")
@@ -1682,7 +2865,7 @@ def search(query: str, smart: bool = False, brand: str = None):
             s += 380.0
         if query_lower in first_line:
             s += 300.0
-        elif query_lower in text_lower:
+        elif query_lower in feat.text_lower:
             s += 120.0
         
         # Word overlap
@@ -1696,7 +2879,7 @@ def search(query: str, smart: bool = False, brand: str = None):
         if query_words and all(w in combined for w in query_words):
             s += 140.0
 
-        s += _item_quality_bonus(item)
+        s += feat.quality_bonus
 
         if s > 0:
             scores[idx] = s
@@ -1798,32 +2981,67 @@ def search(query: str, smart: bool = False, brand: str = None):
                 break
 
     display_results = prepare_items_for_display(unique_res)
-    search_cache[cache_key] = display_results
+    result_cache.put(cache_key, display_results)
     return display_results
 
 
+def _exact_code_items(query: str, lookup, target_brands):
+    """Code families matching `query` exactly, per target brand, without fuzzy scoring."""
+    query_code_meta = _parse_code_metadata(query)
+    query_code = _strict_query_code(
+        query_code_meta.get("full_compact", ""),
+        _extract_model_tokens(query),
+        _compact_alnum(query),
+    )
+    if len(query_code) < 3:
+        return []
+
+    results = []
+    seen = set()
+    for target_brand in target_brands:
+        special_family = _special_family_override_items(query_code_meta, target_brand)
+        if special_family:
+            items = special_family
+        else:
+            items = [stored_items[idx] for idx in lookup.code_matches(query_code_meta, query_code, target_brand)]
+        for item in items:
+            dedupe_key = f"{_item_brand(item)}|{_compact_alnum(item.get('name', ''))}"
+            if dedupe_key in seen:
+                continue
+            seen.add(dedupe_key)
+            results.append(item)
+    return results
+
+
 def search_exact(query: str, smart: bool = False, brand: str = None):
     query = (query or "").strip()
     if not query:
         return []
 
-    load_index()
+    if not stored_items:
+        load_index()
     if not stored_items:
         return []
 
     brand_lower = (brand or "").strip().lower()
     if brand_lower and brand_lower != "all" and not _is_supported_brand_name(brand_lower):
         return []
+    lookup = _get_exact_lookup()
     if brand_lower and brand_lower != "all":
         target_brands = [brand_lower]
     else:
-        target_brands = [b for b in ("aquant", "kohler") if any(_item_brand(item) == b for item in stored_items)]
+        target_brands = [b for b in ("aquant", "kohler") if b in lookup.names]
         if not target_brands:
             target_brands = [""]
 
     query_is_code = _is_code_or_model_query(query)
     results = []
 
+    if query_is_code:
+        code_results = _exact_code_items(query, lookup, target_brands)
+        if code_results:
+            return prepare_items_for_display(code_results)
+
     for target_brand in target_brands:
         best_exact_item = None
         best_exact_score = 0.0
@@ -1860,6 +3078,107 @@ def search_exact(query: str, smart: bool = False, brand: str = None):
     return prepare_items_for_display(unique_res)
 
 
+def _quote_line_price(display_item) -> str:
+    variant_prices = display_item.get("variant_prices")
+    if isinstance(variant_prices, dict) and variant_prices:
+        price = next(iter(variant_prices.values()))
+    else:
+        price = display_item.get("price")
+    price = str(price or "").strip()
+    if not price or price == "0":
+        match = re.search(r'MRP[^\d]*([\d,]+)', str(display_item.get("text") or ""), flags=re.IGNORECASE)
+        if match:
+            price = match.group(1).replace(",", "")
+    return price or "0"
+
+
+def _quote_line_for_item(item, quantity):
+    """A /generate-quote line for `item`, shaped like the ones the quotation page builds."""
+    display_item = display_item_for(item)
+    images = display_item.get("images") or []
+    return {
+        "name": display_item.get("display_name") or display_item.get("name") or "",
+        "price": _quote_line_price(display_item),
+        "quantity": quantity,
+        "discount": 0,
+        "image": images[0] if images else None,
+        "room": "",
+        "rawText": display_item.get("display_text") or display_item.get("text") or "",
+        "sku": display_item.get("display_code") or display_item.get("sku") or "",
+        "size": display_item.get("size") or "",
+        "raw_item": display_item,
+    }
+
+
+def resolve_codes(entries, brand: str = None):
+    """
+    Resolve a bill of quantities in one pass over the exact code maps.
+
+    `entries` is an iterable of (code, quantity). Repeated codes (compared
+    in compact form) are merged into one line with their quantities added.
+    Returns {"lines": [...], "matched": n, "unmatched": n}, one line per
+    distinct code in input order; matched lines carry a quote-ready "item",
+    the match tier, a confidence and the other variants of the family.
+    """
+    if not stored_items:
+        load_index()
+
+    brand_lower = (brand or "").strip().lower()
+    if brand_lower == "all":
+        brand_lower = ""
+    if brand_lower and not _is_supported_brand_name(brand_lower):
+        brand_lower = None
+    lookup = _get_exact_lookup() if stored_items and brand_lower is not None else None
+
+    lines = []
+    by_code = {}
+    for code, quantity in entries:
+        code = str(code or "").strip()
+        compact = _compact_alnum(code)
+        if not compact:
+            continue
+        line = by_code.get(compact)
+        if line is not None:
+            line["quantity"] += quantity
+            continue
+        line = by_code[compact] = {"code": code, "quantity": quantity}
+        lines.append(line)
+
+    matched_count = 0
+    for line in lines:
+        code = line["code"]
+        line.update({"match": "", "confidence": 0.0, "item": None, "variants": []})
+        if lookup is None:
+            continue
+        code_meta = _parse_code_metadata(code)
+        query_code = _strict_query_code(code_meta.get("full_compact", ""), _extract_model_tokens(code), _compact_alnum(code))
+        if len(query_code) < 3:
+            continue
+        tier, matched = lookup.match_code(code_meta, query_code, brand_lower)
+        if not matched:
+            continue
+
+        confidence = CODE_MATCH_CONFIDENCE[tier]
+        if len(matched) > 1:
+            # Several products share the code (e.g. a base code without its finish).
+            confidence = round(confidence * 0.8, 2)
+        variants = []
+        for idx in lookup.code_matches(code_meta, query_code, brand_lower)[1:]:
+            meta = _get_item_code_metadata(stored_items[idx])
+            variant = meta.get("full_code") or str(stored_items[idx].get("name") or "")
+            if variant and variant not in variants:
+                variants.append(variant)
+        line.update({
+            "match": tier,
+            "confidence": confidence,
+            "item": _quote_line_for_item(stored_items[matched[0]], line["quantity"]),
+            "variants": variants[:20],
+        })
+        matched_count += 1
+
+    return {"lines": lines, "matched": matched_count, "unmatched": len(lines) - matched_count}
+
+
 def _items_to_suggestion_payload(items, limit: int = 50):
     final_results = []
     seen = set()
@@ -1870,7 +3189,7 @@ def _items_to_suggestion_payload(items, limit: int = 50):
         if not name:
             continue
 
-        display_item = prepare_item_for_display(item)
+        display_item = display_item_for(item)
         item_code_meta = _get_item_code_metadata(item)
         parts = name.split(" - ", 1)
         code = _clean_display_text(parts[0].strip() or item_code_meta.get("full_code") or name)
@@ -1921,7 +3240,6 @@ def _merge_suggestion_payloads(*payload_groups, limit: int = 50):
 
 
 def get_suggestions(query: str, limit: int = 50, brand: str = None):
-    global _suggestion_cache
     if not query or len(query.strip()) < 2:
         return []
 
@@ -1938,9 +3256,10 @@ def get_suggestions(query: str, limit: int = 50, brand: str = None):
 
     q_raw = query.strip()
     brand_lower_ck = (brand or "").strip().lower()
-    cache_key = (q_raw.lower(), brand_lower_ck)
-    if cache_key in _suggestion_cache:
-        return _suggestion_cache[cache_key]
+    cache_key = result_cache_key("suggest", q_raw.lower(), brand_lower_ck, limit)
+    cached = result_cache.get(cache_key)
+    if cached is not None:
+        return cached
 
     q = query.strip().lower()
     q_compact = _compact_alnum(q)
@@ -1949,40 +3268,9 @@ def get_suggestions(query: str, limit: int = 50, brand: str = None):
         return []
     is_all_brand = (not brand_lower) or (brand_lower == "all")
 
-    exact_name_items = []
-    
-    global _suggestion_precompute_cache
-    if '_suggestion_precompute_cache' not in globals():
-        _suggestion_precompute_cache = {}
-        
-    for item in stored_items:
-        if not _is_supported_item(item):
-            continue
-        if not is_all_brand and _item_brand(item) != brand_lower:
-            continue
-            
-        item_id = id(item)
-        if item_id not in _suggestion_precompute_cache:
-            item_name = str(item.get("name") or "").strip().lower()
-            item_text = str(item.get("text") or "").strip().lower()
-            item_code = str(item.get("search_code") or item.get("base_code") or "").strip().lower()
-            item_alias = str(item.get("display_name") or "").strip().lower()
-            
-            _suggestion_precompute_cache[item_id] = {
-                "lower_set": {item_name, item_text, item_code, item_alias},
-                "compact_set": {
-                    _compact_alnum(item_name),
-                    _compact_alnum(item_text),
-                    _compact_alnum(item_code),
-                    _compact_alnum(item_alias)
-                }
-            }
-            
-        pre = _suggestion_precompute_cache[item_id]
-        if q in pre["lower_set"]:
-            exact_name_items.append(item)
-        elif q_compact and q_compact in pre["compact_set"]:
-            exact_name_items.append(item)
+    lookup = _get_exact_lookup()
+    lookup_brand = "" if is_all_brand else brand_lower
+    exact_name_items = [stored_items[idx] for idx in lookup.name_matches(q, q_compact, lookup_brand)]
 
     exact_payload = []
     if exact_name_items:
@@ -1998,25 +3286,9 @@ def get_suggestions(query: str, limit: int = 50, brand: str = None):
     query_is_code = _is_code_or_model_query(query)
     exact_family_payload = []
     if query_is_code and (query_code_meta.get("full_compact") or query_code_meta.get("base_compact")):
-        exact_family_items = []
-        for item in stored_items:
-            if not _is_supported_item(item):
-                continue
-            if not is_all_brand and _item_brand(item) != brand_lower:
-                continue
-            item_code_meta = _get_item_code_metadata(item)
-            if query_code_meta.get("full_compact") and item_code_meta.get("full_compact") == query_code_meta["full_compact"]:
-                exact_family_items.append(item)
-                continue
-            if (
-                query_code_meta.get("base_compact")
-                and item_code_meta.get("base_compact") == query_code_meta["base_compact"]
-                and (
-                    not query_code_meta.get("variant_compact")
-                    or item_code_meta.get("variant_compact") == query_code_meta["variant_compact"]
-                )
-            ):
-                exact_family_items.append(item)
+        exact_family_items = [
+            stored_items[idx] for idx in lookup.code_family_matches(query_code_meta, lookup_brand)
+        ]
         exact_family_payload = _items_to_suggestion_payload(exact_family_items, limit=limit)
 
     if query_is_code:
@@ -2043,11 +3315,12 @@ def get_suggestions(query: str, limit: int = 50, brand: str = None):
         if wn in keyword_index:
             potential_indices.update(keyword_index[wn])
         # Bisect-based prefix scan (much faster than iterating all keys)
-        if _keyword_keys_sorted:
-            pos = bisect.bisect_left(_keyword_keys_sorted, wn)
+        sorted_keys = _keyword_keys_sorted
+        if sorted_keys:
+            pos = bisect.bisect_left(sorted_keys, wn)
             scanned = 0
-            while pos < len(_keyword_keys_sorted) and scanned < 300:
-                key = _keyword_keys_sorted[pos]
+            while pos < len(sorted_keys) and scanned < 300:
+                key = sorted_keys[pos]
                 if not key.startswith(wn):
                     break
                 if key in keyword_index:
@@ -2164,7 +3437,7 @@ def get_suggestions(query: str, limit: int = 50, brand: str = None):
         full_name = s["full_name"]
         parts = full_name.split(" - ", 1)
         name_desc = _clean_display_text(parts[1].strip()) if len(parts) > 1 else ""
-        display_item = prepare_item_for_display(s["item"])
+        display_item = display_item_for(s["item"])
         scored_payload.append({
             "text": _clean_display_text(s["code"]),
             "description": name_desc,
@@ -2180,12 +3453,5 @@ def get_suggestions(query: str, limit: int = 50, brand: str = None):
     # Prioritize: 1. Exact Name/Code matches, 2. Code family matches, 3. Ranked keyword matches, 4. Seeded results
     result = _merge_suggestion_payloads(exact_payload, exact_first if 'exact_first' in locals() else [], scored_payload, seeded_payload, limit=limit)
 
-    # Store in cache; evict oldest entry when over capacity
-    if len(_suggestion_cache) >= _SUGGESTION_CACHE_MAX:
-        try:
-            oldest = next(iter(_suggestion_cache))
-            del _suggestion_cache[oldest]
-        except StopIteration:
-            pass
-    _suggestion_cache[cache_key] = result
+    result_cache.put(cache_key, result)
     return result
@@ -0,0 +1,61 @@
+from array import array
+
+
+class SubstringIndex:
+    """
+    Trigram index over an ordered list of string keys, answering
+    "which keys contain this needle" without testing every key.
+
+    Results keep the order the keys were added in, so callers that stop
+    early or break ties by position see exactly what a linear
+    `for key in keys: if needle in key` scan would have produced.
+    """
+
+    GRAM = 3
+
+    def __init__(self, keys=()):
+        self._keys = []
+        self._grams = {}  # trigram -> array of key positions, ascending
+        self.extend(keys)
+
+    def __len__(self):
+        return len(self._keys)
+
+    def extend(self, keys):
+        gram = self.GRAM
+        grams = self._grams
+        for key in keys:
+            position = len(self._keys)
+            self._keys.append(key)
+            for piece in {key[i:i + gram] for i in range(len(key) - gram + 1)}:
+                bucket = grams.get(piece)
+                if bucket is None:
+                    bucket = grams[piece] = array("I")
+                bucket.append(position)
+
+    def positions(self, needle: str):
+        """Ascending positions of the keys that contain `needle`."""
+        keys = self._keys
+        if len(needle) < self.GRAM:
+            return [pos for pos, key in enumerate(keys) if needle in key]
+
+        shortest = None
+        for i in range(len(needle) - self.GRAM + 1):
+            bucket = self._grams.get(needle[i:i + self.GRAM])
+            if bucket is None:
+                return []
+            if shortest is None or len(bucket) < len(shortest):
+                shortest = bucket
+        return [pos for pos in shortest if needle in keys[pos]]
+
+    def find(self, *needles):
+        """Keys containing any of `needles`, in insertion order."""
+        needles = [n for n in needles if n]
+        if not needles:
+            return []
+        if len(needles) == 1:
+            hits = self.positions(needles[0])
+        else:
+            hits = sorted({pos for n in needles for pos in self.positions(n)})
+        keys = self._keys
+        return [keys[pos] for pos in hits]
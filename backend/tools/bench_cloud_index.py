@@ -0,0 +1,159 @@
+import copy
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from http.server import ThreadingHTTPServer
+
+# Add backend dir to path to import cloud_index
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import bench_cloud_storage
+from bench_cloud_storage import FakeStorageHandler, objects, uploaded_bytes
+
+
+def fail(message):
+    print(f"FAILED: {message}")
+    sys.exit(1)
+
+
+def sync(cloud_index, label, items, postings):
+    uploaded_bytes[0] = 0
+    t0 = time.perf_counter()
+    result = cloud_index.save(items, postings, "search/search_index_v2.json")
+    elapsed = time.perf_counter() - t0
+    print(f"{label:<30} {elapsed * 1000:7.0f} ms, {result['uploaded']:3d}/{result['chunks']} chunks, "
+          f"{uploaded_bytes[0] / 1024:7.0f} KiB sent")
+    return result
+
+
+def main():
+    bench_cloud_storage.FLAKY_EVERY = 10 ** 9
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeStorageHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    os.environ["SUPABASE_URL"] = f"http://127.0.0.1:{server.server_address[1]}"
+    os.environ["SUPABASE_SERVICE_ROLE_KEY"] = "bench-key"
+    os.environ["USE_SUPABASE_STORAGE"] = "true"
+    import cloud_storage
+    import cloud_index
+
+    index_file = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "search_index_v2.json")
+    with open(index_file, "r", encoding="utf-8-sig") as handle:
+        data = json.load(handle)
+    items, postings = data["stored_items"], data["keyword_index"]
+    legacy_path = "search/search_index_v2.json"
+    bucket = cloud_storage.SYSTEM_BUCKET
+
+    # What save_index used to send every time: the whole JSON file.
+    uploaded_bytes[0] = 0
+    t0 = time.perf_counter()
+    cloud_storage.upload_file(bucket, legacy_path, index_file, "application/json")
+    print(f"{'Legacy: full JSON upload':<30} {(time.perf_counter() - t0) * 1000:7.0f} ms, "
+          f"{'':>12} {uploaded_bytes[0] / 1024:7.0f} KiB sent")
+    t0 = time.perf_counter()
+    cloud_storage.download_bytes(bucket, legacy_path)
+    print(f"{'Legacy: full JSON download':<30} {(time.perf_counter() - t0) * 1000:7.0f} ms")
+
+    first = sync(cloud_index, "First chunked save", items, postings)
+    if (bucket, legacy_path) in objects:
+        fail("uncompressed index was left behind after the first manifest save")
+    if sync(cloud_index, "Unchanged save", items, postings)["uploaded"] or uploaded_bytes[0]:
+        fail("unchanged index was uploaded again")
+    cloud_index._known_content_hash.clear()  # as in a freshly started process
+    if sync(cloud_index, "Unchanged save, new process", items, postings)["uploaded"]:
+        fail("unchanged index was uploaded again from a new process")
+
+    # One manually added item, the way add_to_index extends the index.
+    edited_items = items + [{"name": "Bench Added Item", "text": "Bench Added Item K-999999", "page": 1, "images": []}]
+    edited_postings = copy.deepcopy(postings)
+    shared = list(postings)[::len(postings) // 25][:25]  # words it has in common with existing items
+    for keyword in shared + ["bench", "added", "k-999999", "999999"]:
+        edited_postings.setdefault(keyword, []).append(len(items))
+    before = cloud_index.load_manifest(legacy_path)
+    edited = sync(cloud_index, "Save after one added item", edited_items, edited_postings)
+    if not edited["uploaded"] or edited["uploaded"] > first["chunks"] // 4:
+        fail(f"one added item uploaded {edited['uploaded']} of {edited['chunks']} chunks")
+    # A restore that read the previous manifest still finds its chunks.
+    if not all((bucket, cloud_index._chunk_path(legacy_path, h)) in objects for h in cloud_index._live_chunks(before)):
+        fail("chunks of the previous manifest were deleted inside the grace period")
+
+    # Two instances save at once: B publishes while A is uploading (A wins),
+    # then B publishes right after A's manifest (A loses). Neither deletes
+    # chunks the other published.
+    def variant(name):
+        return (edited_items + [{"name": name, "text": name, "page": 1, "images": []}],
+                dict(edited_postings, **{name.lower(): [len(edited_items)]}))
+
+    def overlap(hook_name, items_a, postings_a, items_b, postings_b):
+        original = getattr(cloud_storage, hook_name)
+        fired = []
+
+        def hooked(*args, **kwargs):
+            result = original(*args, **kwargs)
+            if not fired:
+                fired.append(True)
+                cloud_index.save(items_b, postings_b, legacy_path)
+            return result
+
+        setattr(cloud_storage, hook_name, hooked)
+        cloud_index._known_content_hash.clear()
+        try:
+            cloud_index.save(items_a, postings_a, legacy_path)
+            return True
+        except RuntimeError:
+            return False
+        finally:
+            setattr(cloud_storage, hook_name, original)
+
+    def all_present(manifest):
+        return all((bucket, cloud_index._chunk_path(legacy_path, h)) in objects for h in cloud_index._live_chunks(manifest))
+
+    b_items, b_postings = variant("Bench Writer B")
+    a_items, a_postings = variant("Bench Writer A")
+    t0 = time.perf_counter()
+    if not overlap("upload_batch", a_items, a_postings, b_items, b_postings):
+        fail("the writer that published last was rejected")
+    b_manifest = cloud_index._build_chunks(b_items, b_postings)[0]
+    if not all_present(cloud_index.load_manifest(legacy_path)) or not all_present(b_manifest):
+        fail("overlapping save deleted the other writer's chunks")
+    if overlap("upload_bytes", edited_items, edited_postings, b_items, b_postings):
+        fail("a writer whose manifest was replaced reported success")
+    if cloud_index.load_manifest(legacy_path)["content_hash"] != b_manifest["content_hash"] or not all_present(b_manifest):
+        fail("the losing writer removed the winner's chunks")
+    print(f"{'Overlapping saves (2 races)':<30} {(time.perf_counter() - t0) * 1000:7.0f} ms")
+
+    # Past the grace period the next save collects every retired chunk.
+    cloud_index.GC_GRACE_SECONDS = 0
+    sync(cloud_index, "Save after the grace period", edited_items, edited_postings)
+    referenced = {key for key in objects if key[1].startswith("search/chunks/")}
+    if len(referenced) != len(cloud_index._live_chunks(cloud_index.load_manifest(legacy_path))):
+        fail("stale chunks were not removed after the grace period")
+
+    with tempfile.TemporaryDirectory() as root:
+        restored_file = os.path.join(root, "search_index_v2.json")
+        t0 = time.perf_counter()
+        if not cloud_index.restore(legacy_path, restored_file):
+            fail("restore found no index")
+        restore_time = time.perf_counter() - t0
+        with open(restored_file, "r", encoding="utf-8") as handle:
+            restored = json.load(handle)
+        if restored["stored_items"] != edited_items or restored["keyword_index"] != edited_postings:
+            fail("restored index differs from the saved one")
+        if list(restored["keyword_index"]) != list(edited_postings):
+            fail("restore changed keyword order")
+        print(f"{'Restore (stream-decompress)':<30} {restore_time * 1000:7.0f} ms")
+
+    cloud_index.delete(legacy_path)
+    if any(key[0] == bucket for key in objects):
+        fail("delete left objects behind")
+
+    cloud_storage.close()
+    server.shutdown()
+    print("OK")
+
+
+if __name__ == "__main__":
+    main()
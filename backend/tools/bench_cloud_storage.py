@@ -0,0 +1,156 @@
+import json
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import unquote
+
+import httpx
+
+# Add backend dir to path to import cloud_storage
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+HANDSHAKE_SECONDS = 0.03  # stands in for TCP + TLS setup on a new connection
+REQUEST_SECONDS = 0.02
+FLAKY_EVERY = 17  # every Nth upload answers 503 once
+
+objects = {}
+connections = [0]
+request_count = [0]
+uploaded_bytes = [0]
+lock = threading.Lock()
+
+
+class FakeStorageHandler(BaseHTTPRequestHandler):
+    """The subset of the Supabase storage API that cloud_storage uses, kept in memory."""
+
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def setup(self):
+        super().setup()
+        with lock:
+            connections[0] += 1
+        time.sleep(HANDSHAKE_SECONDS)
+
+    def _reply(self, status, body=b"", content_type="application/json"):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _body(self):
+        return self.rfile.read(int(self.headers.get("Content-Length") or 0))
+
+    def do_POST(self):
+        time.sleep(REQUEST_SECONDS)
+        body = self._body()
+        with lock:
+            request_count[0] += 1
+            count = request_count[0]
+        if self.path.startswith("/storage/v1/object/list/"):
+            payload = json.loads(body)
+            bucket = self.path.rsplit("/", 1)[1]
+            names = sorted(key[1] for key in objects if key[0] == bucket and key[1].startswith(payload["prefix"]))
+            page = names[payload["offset"]:payload["offset"] + payload["limit"]]
+            self._reply(200, json.dumps([{"name": name} for name in page]).encode())
+            return
+        bucket, path = unquote(self.path[len("/storage/v1/object/"):]).split("/", 1)
+        if count % FLAKY_EVERY == 0 and (bucket, path) not in objects:
+            self._reply(503, b'{"error":"busy"}')
+            return
+        objects[(bucket, path)] = body
+        with lock:
+            uploaded_bytes[0] += len(body)
+        self._reply(200, b'{"Key":"ok"}')
+
+    def do_GET(self):
+        time.sleep(REQUEST_SECONDS)
+        bucket, path = unquote(self.path[len("/storage/v1/object/"):]).split("/", 1)
+        body = objects.get((bucket, path))
+        if body is None:
+            self._reply(404, b'{"error":"not found"}')
+        else:
+            self._reply(200, body, "application/octet-stream")
+
+    def do_DELETE(self):
+        bucket = unquote(self.path[len("/storage/v1/object/"):])
+        for path in json.loads(self._body())["prefixes"]:
+            objects.pop((bucket, path), None)
+        self._reply(200, b"[]")
+
+    def log_message(self, *args):
+        pass
+
+
+def legacy_upload(cloud_storage, bucket, path, content):
+    """The previous upload_bytes: a fresh client (and connection) per object."""
+    endpoint = f"{cloud_storage.SUPABASE_URL}/storage/v1/object/{bucket}/{path}"
+    with httpx.Client(timeout=30) as client:
+        response = client.post(endpoint, headers=cloud_storage._auth_headers({"x-upsert": "true"}), content=content)
+    return response.status_code in {200, 201}
+
+
+def timed(label, function):
+    with lock:
+        connections[0] = 0
+    t0 = time.perf_counter()
+    result = function()
+    elapsed = time.perf_counter() - t0
+    print(f"{label:<34} {elapsed * 1000:7.0f} ms, {connections[0]:3d} connections")
+    return result
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 120
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeStorageHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    os.environ["SUPABASE_URL"] = f"http://127.0.0.1:{server.server_address[1]}"
+    os.environ["SUPABASE_SERVICE_ROLE_KEY"] = "bench-key"
+    os.environ["USE_SUPABASE_STORAGE"] = "true"
+    import cloud_storage
+
+    payloads = [(f"catalog/bench_{n:04d}.jpg", os.urandom(24 * 1024)) for n in range(count)]
+    bucket = cloud_storage.PRODUCT_IMAGES_BUCKET
+
+    global FLAKY_EVERY
+    flaky, FLAKY_EVERY = FLAKY_EVERY, 10 ** 9  # no injected failures for the serial baselines
+    timed("Legacy: client per upload", lambda: [legacy_upload(cloud_storage, bucket, p, c) for p, c in payloads])
+    objects.clear()
+    timed("Pooled client, serial uploads", lambda: [cloud_storage.upload_bytes(bucket, p, c) for p, c in payloads])
+    objects.clear()
+
+    FLAKY_EVERY = flaky
+    uploaded = timed(
+        f"upload_batch ({cloud_storage.SUPABASE_BATCH_WORKERS} workers, 503s)",
+        lambda: cloud_storage.upload_batch(bucket, [(p, c, "image/jpeg") for p, c in payloads]),
+    )
+    if not all(uploaded.values()) or len(objects) != count:
+        print(f"FAILED: {sum(1 for url in uploaded.values() if not url)} uploads failed after retries")
+        sys.exit(1)
+
+    downloaded = timed(
+        "download_batch",
+        lambda: cloud_storage.download_batch(bucket, [p for p, _ in payloads] + ["catalog/missing.jpg"]),
+    )
+    if downloaded.pop("catalog/missing.jpg") is not None or any(downloaded[p] != c for p, c in payloads):
+        print("FAILED: downloaded content differs")
+        sys.exit(1)
+
+    for n in range(2500 - count):
+        objects[(bucket, f"catalog/extra_{n:05d}.jpg")] = b""
+    listed = timed("list_objects (2500 objects)", lambda: cloud_storage.list_objects(bucket, "catalog/"))
+    if len(listed) != 2500:
+        print(f"FAILED: list_objects returned {len(listed)} of 2500 objects")
+        sys.exit(1)
+
+    cloud_storage.close()
+    server.shutdown()
+    print(f"HTTP/2 available: {cloud_storage.HTTP2_AVAILABLE}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+import os
+import sys
+import time
+
+import numpy as np
+from PIL import Image, ImageChops
+
+# Add backend dir to path to import pdf_reader
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pdf_reader
+
+
+# Previous PIL implementation, kept here as the reference for timing and agreement.
+def legacy_white_ratio(image):
+    sample = image.convert("RGB").resize((64, 64))
+    total = 64 * 64
+    bright = 0
+    for r, g, b in sample.getdata():
+        if r >= 243 and g >= 243 and b >= 243:
+            bright += 1
+    return bright / total
+
+
+def legacy_trim_possible_caption_band(image):
+    width, height = image.size
+    if width < 80 or height < 120:
+        return image
+
+    for cutoff_ratio in (0.92, 0.88, 0.84):
+        cutoff = int(height * cutoff_ratio)
+        if cutoff <= int(height * 0.6):
+            continue
+
+        bottom_band = image.crop((0, cutoff, width, height))
+        upper_band = image.crop((0, max(0, cutoff - max(24, height // 8)), width, cutoff))
+        bottom_white = legacy_white_ratio(bottom_band)
+        upper_white = legacy_white_ratio(upper_band) if upper_band.size[1] > 0 else 0.0
+
+        if bottom_white >= 0.86 and bottom_white >= upper_white + 0.12:
+            return image.crop((0, 0, width, cutoff))
+
+    return image
+
+
+def legacy_crop_box(rgb_image):
+    trimmed = legacy_trim_possible_caption_band(rgb_image)
+    cutoff = trimmed.height
+    bg = Image.new("RGB", trimmed.size, "white")
+    bbox = ImageChops.difference(trimmed, bg).getbbox()
+    if not bbox:
+        return 0, 0, trimmed.width, cutoff
+
+    left, top, right, bottom = bbox
+    margin_x = max(6, int((right - left) * 0.04))
+    margin_y = max(6, int((bottom - top) * 0.04))
+    return (
+        max(0, left - margin_x),
+        max(0, top - margin_y),
+        min(trimmed.width, right + margin_x),
+        min(cutoff, bottom + margin_y),
+    )
+
+
+def iter_images(root, limit):
+    count = 0
+    for dirpath, _, filenames in os.walk(root):
+        for filename in sorted(filenames):
+            if not filename.lower().endswith((".png", ".jpg", ".jpeg")):
+                continue
+            yield os.path.join(dirpath, filename)
+            count += 1
+            if limit and count >= limit:
+                return
+
+
+def main():
+    root = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "static", "images")
+    limit = int(sys.argv[1]) if len(sys.argv) > 1 else 0
+
+    legacy_time = 0.0
+    numpy_time = 0.0
+    total = 0
+    same_box = 0
+    same_caption = 0
+    for path in iter_images(root, limit):
+        try:
+            with Image.open(path) as image:
+                rgb_image = image.convert("RGB")
+        except Exception as e:
+            print(f"Warning: skipping {path}: {e}")
+            continue
+
+        t0 = time.perf_counter()
+        old_box = legacy_crop_box(rgb_image)
+        legacy_time += time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        new_box = pdf_reader._product_crop_box(np.asarray(rgb_image))
+        numpy_time += time.perf_counter() - t0
+
+        total += 1
+        same_box += old_box == new_box
+        same_caption += old_box[3] == new_box[3] or (
+            old_box[3] < rgb_image.height) == (new_box[3] < rgb_image.height)
+
+    if not total:
+        print(f"No images found under {root}")
+        return
+
+    print(f"Images: {total}")
+    print(f"Legacy PIL:  {legacy_time:.2f}s total, {legacy_time / total * 1000:.2f} ms/image")
+    print(f"NumPy:       {numpy_time:.2f}s total, {numpy_time / total * 1000:.2f} ms/image")
+    print(f"Speed-up:    {legacy_time / max(numpy_time, 1e-9):.1f}x")
+    print(f"Identical crop boxes: {same_box}/{total}; same caption-band decision: {same_caption}/{total}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+# Add backend dir to path to import quote_manifest
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import quote_manifest
+
+CLIENTS = ["Mehta Residence", "Patel & Sons", "Shah Villa", "Desai Interiors", "Joshi Builders", "Rao Homes"]
+
+
+def write_history(folder, count, rng):
+    """count quote records shaped like /generate-quote payloads, with spread-out mtimes."""
+    now = time.time()
+    for n in range(count):
+        client = f"{rng.choice(CLIENTS)} {n % 97}"
+        record = {
+            "client_name": client,
+            "grand_total": round(rng.uniform(5000, 900000), 2),
+            "items": [{"sku": f"K-{rng.randint(1000, 99999)}", "price": rng.randint(500, 90000)} for _ in range(30)],
+        }
+        path = os.path.join(folder, f"quote_{1700000000 + n}_{client.replace(' ', '_')}.json")
+        with open(path, "w", encoding="utf-8") as handle:
+            json.dump(record, handle)
+        stamp = now - rng.uniform(0, 86400 * 365)
+        os.utime(path, (stamp, stamp))
+
+
+def scan_listing(folder):
+    """What /list-quotes did before the manifest: open and parse every record."""
+    details = []
+    for filename in os.listdir(folder):
+        path = os.path.join(folder, filename)
+        with open(path, "r", encoding="utf-8") as handle:
+            content = json.load(handle)
+        details.append(quote_manifest.entry_for(filename, content, os.stat(path).st_mtime))
+    details.sort(key=lambda item: (item["date"], item["id"]), reverse=True)
+    return details
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    rng = random.Random(3)
+    with tempfile.TemporaryDirectory() as root:
+        folder = os.path.join(root, "quotes_history")
+        os.makedirs(folder)
+        write_history(folder, count, rng)
+
+        t0 = time.perf_counter()
+        scanned = scan_listing(folder)
+        scan_time = time.perf_counter() - t0
+
+        manifest = quote_manifest.QuoteManifest(os.path.join(root, "quote_manifest.sqlite3"))
+        t0 = time.perf_counter()
+        manifest.replace_all(scanned, source="local")
+        build_time = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        listed, total = manifest.query()
+        full_time = time.perf_counter() - t0
+        if total != count or [q["id"] for q in listed] != [q["id"] for q in scanned]:
+            print("FAILED: manifest listing differs from the scan")
+            sys.exit(1)
+
+        t0 = time.perf_counter()
+        page, _ = manifest.query(offset=100, limit=50)
+        page_time = time.perf_counter() - t0
+        if [q["id"] for q in page] != [q["id"] for q in scanned[100:150]]:
+            print("FAILED: page 3 differs from the scan")
+            sys.exit(1)
+
+        t0 = time.perf_counter()
+        found, found_total = manifest.query(search="shah", sort="total", order="asc", limit=50)
+        search_time = time.perf_counter() - t0
+        expected = sorted((q for q in scanned if "shah" in q["client"].lower() or "shah" in q["id"].lower()),
+                          key=lambda q: (q["total"], q["id"]))
+        if found_total != len(expected) or [q["id"] for q in found] != [q["id"] for q in expected[:50]]:
+            print("FAILED: client search differs from the scan")
+            sys.exit(1)
+
+        new_entry = quote_manifest.entry_for("quote_new.json", {"client_name": "Zed", "grand_total": 10})
+        manifest.upsert(new_entry)
+        if manifest.query(limit=1)[0][0]["id"] != "quote_new.json" or not manifest.remove("quote_new.json"):
+            print("FAILED: incremental upsert/remove")
+            sys.exit(1)
+
+    print(f"Quotes: {count}")
+    print(f"Scan every record:        {scan_time * 1000:8.1f} ms")
+    print(f"Manifest build (once):    {build_time * 1000:8.1f} ms")
+    print(f"Manifest, full listing:   {full_time * 1000:8.1f} ms")
+    print(f"Manifest, one page:       {page_time * 1000:8.2f} ms")
+    print(f"Manifest, client search:  {search_time * 1000:8.2f} ms ({found_total} matches)")
+
+
+if __name__ == "__main__":
+    main()
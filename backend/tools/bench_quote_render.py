@@ -0,0 +1,81 @@
+import asyncio
+import os
+import signal
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+# Add backend dir to path to import quotation
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import quotation
+
+
+def sample_quote(number, line_count=25):
+    """A quote payload shaped like the /generate-quote request body, without remote images."""
+    items = []
+    for n in range(1, line_count + 1):
+        price = 1500 + n * 137
+        items.append({
+            "sku": f"BENCH-{number:03d}-{n:02d}",
+            "name": f"Sample fitting {n}",
+            "description": "Chrome finish, wall mounted",
+            "quantity": 1 + n % 4,
+            "price": price,
+            "discount": 10,
+            "image": "",
+            "room": ("Master Bath", "Kitchen", "Powder Room")[n % 3],
+        })
+    return {
+        "client_name": f"Bench Client {number}",
+        "client_phone": "9800000000",
+        "client_address": "Ahmedabad",
+        "items": items,
+        "quote_number": f"SC-BENCH-{number:04d}",
+    }
+
+
+async def render_concurrently(quotes):
+    return await asyncio.gather(*(quotation.render_quote_pdf_async(quote) for quote in quotes))
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 16
+    quotes = [sample_quote(n) for n in range(count)]
+
+    quotation.render_quote_pdf(quotes[0])  # warm fonts and the logo download
+    t0 = time.perf_counter()
+    serial = [quotation.render_quote_pdf(quote) for quote in quotes]
+    serial_time = time.perf_counter() - t0
+
+    asyncio.run(render_concurrently(quotes[:1]))  # start the pool workers
+    t0 = time.perf_counter()
+    pooled = asyncio.run(render_concurrently(quotes))
+    pooled_time = time.perf_counter() - t0
+
+    # A worker that dies must not leave /create-quote broken until restart.
+    executor = quotation._get_render_executor()
+    if isinstance(executor, ProcessPoolExecutor):
+        os.kill(next(iter(executor._processes)), signal.SIGKILL)
+        recovered = asyncio.run(render_concurrently(quotes[:2]))
+        if quotation._render_executor is executor or not all(pdf.startswith(b"%PDF") for pdf in recovered):
+            print("FAILED: render pool did not recover from a dead worker")
+            sys.exit(1)
+        print("Recovered from a killed render worker")
+    quotation.shutdown_render_pool()
+
+    if any(not pdf.startswith(b"%PDF") for pdf in serial + pooled):
+        print("FAILED: a render did not produce a PDF")
+        sys.exit(1)
+    if [len(pdf) for pdf in serial] != [len(pdf) for pdf in pooled]:
+        print("WARNING: pooled PDFs differ in size from the serial renders")
+
+    print(f"Quotes: {count}, render workers: {quotation._quote_render_workers()}")
+    print(f"Average PDF size: {sum(len(pdf) for pdf in pooled) / count / 1024:.1f} KiB")
+    print(f"Serial:     {serial_time:.2f}s, {count / serial_time:.1f} quotes/s")
+    print(f"Pooled:     {pooled_time:.2f}s, {count / pooled_time:.1f} quotes/s")
+    print(f"Speed-up:   {serial_time / max(pooled_time, 1e-9):.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+import os
+import random
+import shutil
+import sys
+import time
+
+# Add backend dir to path to import quotation
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import quotation
+import quote_thumbnails
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+IMAGE_ROOT = os.path.join(BACKEND_DIR, "static", "images")
+THUMB_DIR = os.path.join(BACKEND_DIR, "cache", quote_thumbnails.THUMBNAIL_DIR_NAME)
+
+
+def sample_images(count, rng):
+    """Brand-folder product images, the kind quotes reference as /static/images/<brand>/<code>.png."""
+    paths = []
+    for brand in sorted(os.listdir(IMAGE_ROOT)):
+        folder = os.path.join(IMAGE_ROOT, brand)
+        if brand.startswith("_") or not os.path.isdir(folder):
+            continue
+        for filename in sorted(os.listdir(folder)):
+            if filename.lower().endswith((".png", ".jpg", ".jpeg")):
+                paths.append(f"/static/images/{brand}/{filename}")
+    return rng.sample(paths, min(count, len(paths)))
+
+
+def sample_quote(images):
+    rooms = ("Master Bath", "Kitchen", "Powder Room", "Guest Bath")
+    return {
+        "client_name": "Bench Client",
+        "quote_number": "SC-BENCH-0001",
+        "items": [
+            {
+                "sku": os.path.splitext(os.path.basename(image))[0],
+                "name": f"Sample fitting {n}",
+                "quantity": 1 + n % 3,
+                "price": 2500 + n * 40,
+                "image": image,
+                "room": rooms[n % len(rooms)],
+            }
+            for n, image in enumerate(images, start=1)
+        ],
+    }
+
+
+def timed_render(quote):
+    t0 = time.perf_counter()
+    pdf = quotation.render_quote_pdf(quote)
+    return pdf, time.perf_counter() - t0
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 120
+    quote = sample_quote(sample_images(count, random.Random(5)))
+    shutil.rmtree(THUMB_DIR, ignore_errors=True)
+
+    quotation.render_quote_pdf(sample_quote([]))  # warm fonts and the logo
+
+    quote_thumbnails.ENABLED = False
+    full_pdf, full_time = timed_render(quote)
+
+    quote_thumbnails.ENABLED = True
+    cold_pdf, cold_time = timed_render(quote)
+    quote_thumbnails._known_thumbnails.clear()
+    warm_pdf, warm_time = timed_render(quote)
+    shutil.rmtree(THUMB_DIR, ignore_errors=True)
+
+    if not all(pdf.startswith(b"%PDF") for pdf in (full_pdf, cold_pdf, warm_pdf)):
+        print("FAILED: a render did not produce a PDF")
+        sys.exit(1)
+
+    print(f"Quote lines: {len(quote['items'])}")
+    print(f"Full images:        {len(full_pdf) / 1024:8.1f} KiB, {full_time:.2f}s")
+    print(f"Thumbnails (cold):  {len(cold_pdf) / 1024:8.1f} KiB, {cold_time:.2f}s")
+    print(f"Thumbnails (warm):  {len(warm_pdf) / 1024:8.1f} KiB, {warm_time:.2f}s")
+    print(f"Size reduction:     {len(full_pdf) / max(len(warm_pdf), 1):.1f}x")
+
+
+if __name__ == "__main__":
+    main()
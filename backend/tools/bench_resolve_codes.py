@@ -0,0 +1,101 @@
+import io
+import os
+import random
+import sys
+import time
+import zipfile
+from xml.sax.saxutils import escape
+
+# Add backend dir to path to import search_engine
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import boq_import
+import search_engine
+
+
+def sample_boq(count, rng):
+    """A BOQ-like list of codes: catalog codes as typed, compacted, with OCR slips and repeats."""
+    coded = [item for item in search_engine.stored_items if item.get("search_code")]
+    entries = []
+    for item in rng.sample(coded, min(count, len(coded))):
+        code = str(item["search_code"])
+        style = rng.random()
+        if style < 0.15:
+            code = code.replace("-", "").replace(" ", "")
+        elif style < 0.2:
+            code = code.replace("0", "O", 1)
+        entries.append((code, rng.randint(1, 6)))
+    entries.extend(rng.sample(entries, len(entries) // 10))
+    entries.append(("NOT-A-CODE-999", 1))
+    return entries
+
+
+def to_csv(entries):
+    lines = ["Sr No,Item Code,Description,Qty"]
+    lines.extend(f"{n},{code},,{qty}" for n, (code, qty) in enumerate(entries, start=1))
+    return "\n".join(lines).encode("utf-8")
+
+
+def to_xlsx(entries):
+    """Minimal single-sheet workbook (inline strings) to exercise the stdlib reader."""
+    rows = [("Item Code", "Qty")] + [(code, qty) for code, qty in entries]
+    sheet_rows = []
+    for r, (code, qty) in enumerate(rows, start=1):
+        qty_cell = (
+            f'<c r="B{r}" t="inlineStr"><is><t>{escape(str(qty))}</t></is></c>'
+            if isinstance(qty, str) else f'<c r="B{r}"><v>{qty}</v></c>'
+        )
+        sheet_rows.append(f'<row r="{r}"><c r="A{r}" t="inlineStr"><is><t>{escape(code)}</t></is></c>{qty_cell}</row>')
+    sheet = (
+        '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+        f'<sheetData>{"".join(sheet_rows)}</sheetData></worksheet>'
+    )
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as archive:
+        archive.writestr("xl/worksheets/sheet1.xml", sheet)
+    return buffer.getvalue()
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 400
+    search_engine.load_index()
+    rng = random.Random(11)
+    entries = sample_boq(count, rng)
+
+    csv_entries = boq_import.parse_boq_file("boq.csv", to_csv(entries))
+    xlsx_entries = boq_import.parse_boq_file("boq.xlsx", to_xlsx(entries))
+    if csv_entries != entries or xlsx_entries != entries:
+        print("FAILED: parsed BOQ rows differ from the input")
+        sys.exit(1)
+
+    search_engine.resolve_codes(entries[:1])  # build the exact-match maps once
+    t0 = time.perf_counter()
+    resolved = search_engine.resolve_codes(entries)
+    batch_time = time.perf_counter() - t0
+
+    distinct = {search_engine._compact_alnum(code) for code, _ in entries}
+    if len(resolved["lines"]) != len(distinct):
+        print(f"FAILED: {len(resolved['lines'])} lines for {len(distinct)} distinct codes")
+        sys.exit(1)
+
+    failures = 0
+    t0 = time.perf_counter()
+    for code, _ in entries:
+        search_engine.result_cache.clear()
+        try:
+            search_engine.search(code)
+        except Exception:
+            failures += 1
+    per_call_time = time.perf_counter() - t0
+
+    by_tier = {}
+    for line in resolved["lines"]:
+        by_tier[line["match"] or "unmatched"] = by_tier.get(line["match"] or "unmatched", 0) + 1
+    print(f"BOQ rows: {len(entries)}, distinct codes: {len(resolved['lines'])}")
+    print(f"Matched: {resolved['matched']}, unmatched: {resolved['unmatched']}, by tier: {by_tier}")
+    print(f"Batch resolve:      {batch_time * 1000:.1f} ms")
+    print(f"One search() each:  {per_call_time * 1000:.1f} ms" + (f" ({failures} raised)" if failures else ""))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from http.server import ThreadingHTTPServer
+
+# Add backend dir to path to import image_uploader and search_engine
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_cloud_storage import FakeStorageHandler, objects
+
+
+def fail(message):
+    print(f"FAILED: {message}")
+    sys.exit(1)
+
+
+def wait_until(condition, timeout):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if condition():
+            return True
+        time.sleep(0.02)
+    return False
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 80
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeStorageHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    os.environ["SUPABASE_URL"] = f"http://127.0.0.1:{server.server_address[1]}"
+    os.environ["SUPABASE_SERVICE_ROLE_KEY"] = "check-key"
+    os.environ["USE_SUPABASE_STORAGE"] = "true"
+    import cloud_storage
+    import image_uploader
+    import search_engine
+
+    with tempfile.TemporaryDirectory() as root:
+        queue_file = os.path.join(root, image_uploader.QUEUE_FILE_NAME)
+        entries = []
+        for n in range(count):
+            name = f"Catalog_p{n // 6}_i{n % 6}.jpg"
+            local = os.path.join(root, name)
+            with open(local, "wb") as handle:
+                handle.write(os.urandom(16 * 1024))
+            entries.append((f"/static/images/{name}", local, f"catalog/{name}"))
+        entries.append(("/static/images/gone.jpg", os.path.join(root, "gone.jpg"), "catalog/gone.jpg"))
+
+        # First run: storage goes away right after extraction queued the images.
+        cloud_storage.USE_SUPABASE_STORAGE = False
+        first = image_uploader.ImageUploadQueue(queue_file)
+        t0 = time.perf_counter()
+        if first.enqueue(entries) != count + 1 or first.enqueue(entries[:5]) != 0:
+            fail("enqueue did not de-duplicate")
+        enqueue_time = time.perf_counter() - t0
+        if objects or first.status()["pending"] != count + 1:
+            fail(f"uploads ran while storage was disabled: {first.status()}")
+        first.stop()
+        first._thread.join(5)
+        with open(queue_file, "a", encoding="utf-8") as handle:
+            handle.write('{"op": "add", "public": "/static/ima')  # cut short by the "crash"
+
+        # Restart: the new queue resumes from the file and reports every URL.
+        cloud_storage.USE_SUPABASE_STORAGE = True
+        second = image_uploader.ImageUploadQueue(queue_file)
+        reported = {}
+        second.listener = reported.update
+        t0 = time.perf_counter()
+        second.start()
+        if not wait_until(lambda: second.status()["pending"] == 0, 30):
+            fail(f"queue did not drain: {second.status()}")
+        drain_time = time.perf_counter() - t0
+        second.stop()
+        uploaded = second.uploaded_urls()
+        if len(uploaded) != count or reported != uploaded or "/static/images/gone.jpg" in uploaded:
+            fail(f"{len(uploaded)} of {count} uploads reported, {len(reported)} to the listener")
+        stored = {path for bucket, path in objects if bucket == cloud_storage.PRODUCT_IMAGES_BUCKET}
+        if stored != {object_path for _, _, object_path in entries[:-1]}:
+            fail("stored objects differ from the queued images")
+
+        # A third start only replays completions; nothing is uploaded twice.
+        objects.clear()
+        third = image_uploader.ImageUploadQueue(queue_file)
+        if third.uploaded_urls() != uploaded or third.enqueue(entries[:-1]) != 0 or objects:
+            fail("completed uploads were not remembered across restarts")
+        with open(queue_file, "r", encoding="utf-8") as handle:
+            ops = [json.loads(line)["op"] for line in handle]
+        if ops != ["done"] * count:
+            fail(f"queue file was not compacted: {len(ops)} records")
+
+    # The index swaps local paths for uploaded URLs and schedules a full save.
+    items = [{"name": f"Item {n}", "images": [public]} for n, (public, _, _) in enumerate(entries)]
+    search_engine.stored_items = items
+    generation = search_engine._index_generation
+    patched = search_engine.patch_item_images(uploaded)
+    if search_engine._index_save_timer is not None:
+        search_engine._index_save_timer.cancel()
+    if patched != count or items[0]["images"] != [uploaded[entries[0][0]]] or items[-1]["images"] != ["/static/images/gone.jpg"]:
+        fail("index image paths were not patched")
+    if search_engine._index_generation == generation or not search_engine._index_rewrite_pending:
+        fail("patch did not invalidate cached results or schedule a full save")
+
+    cloud_storage.close()
+    server.shutdown()
+    print(f"Images: {count}")
+    print(f"Enqueue (extraction's cost): {enqueue_time * 1000:7.1f} ms")
+    print(f"Background drain:            {drain_time * 1000:7.1f} ms")
+    print("OK")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+import os
+import shutil
+import sys
+import tempfile
+
+import mongomock
+
+# Add backend dir to path to import mongodb and search_engine
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import mongodb
+import search_engine
+
+
+def fail(message):
+    print(f"FAILED: {message}")
+    sys.exit(1)
+
+
+def mongo_item_count(db):
+    manifest = db["search_index"].find_one({"_id": mongodb.INDEX_MANIFEST_ID})
+    return manifest["item_count"] if manifest else 0
+
+
+def flush():
+    search_engine.flush_index_saves()
+    if search_engine._index_save_timer is not None:
+        search_engine._index_save_timer.cancel()
+
+
+def manual_item(n):
+    return {"name": f"Manual Item {n}", "text": f"Manual Item {n} K-99{n:04d}", "page": 0, "source": "manual", "images": []}
+
+
+def main():
+    db = mongomock.MongoClient()["quotation_ai"]
+    mongodb.get_db = lambda: db
+    mongodb.is_enabled = lambda: True
+
+    with tempfile.TemporaryDirectory() as root:
+        index_file = os.path.join(root, "search_index_v2.json")
+        shutil.copy2(search_engine.INDEX_FILE_BUNDLED, index_file)
+        search_engine.INDEX_FILE = search_engine.INDEX_FILE_PERSISTENT = index_file
+        delta_file = search_engine._delta_path_for(index_file)
+
+        search_engine.load_index(force=True)
+        base = len(search_engine.stored_items)
+        if mongo_item_count(db) != base:
+            fail("loading the local index did not seed MongoDB")
+
+        # A manual add reaches MongoDB on the debounced flush, not only on compaction.
+        search_engine.add_to_index(None, [manual_item(1)])
+        flush()
+        if not os.path.exists(delta_file) or mongo_item_count(db) != base + 1:
+            fail(f"debounced flush left MongoDB at {mongo_item_count(db)} items (expected {base + 1})")
+
+        # MongoDB falls behind the local delta log (e.g. it was down); the next
+        # MongoDB load appends the logged item again instead of dropping it.
+        original_save = mongodb.save_search_index
+        mongodb.save_search_index = lambda data: None
+        search_engine.add_to_index(None, [manual_item(2)])
+        flush()
+        if not search_engine._remote_index_stale:
+            fail("a failed MongoDB sync was not remembered")
+        mongodb.save_search_index = original_save
+
+        search_engine.load_index(force=True)
+        if search_engine._index_save_timer is not None:
+            search_engine._index_save_timer.cancel()
+        names = [item.get("name") for item in search_engine.stored_items]
+        if len(names) != base + 2 or names[-1] != "Manual Item 2":
+            fail(f"MongoDB load lost the logged item ({len(names)} items)")
+
+        # The next flush (the shutdown hook calls it) pushes everything back.
+        flush()
+        if mongo_item_count(db) != base + 2 or os.path.exists(delta_file) or search_engine._remote_index_stale:
+            fail("flush after the MongoDB load did not save the replayed item")
+
+        # /refresh inside the debounce window: the unflushed item is written
+        # before the reload, and the next add does not reuse its offset.
+        mongodb.is_enabled = lambda: False
+        search_engine.add_to_index(None, [manual_item(3)])
+        search_engine.load_index(force=True)
+        search_engine.add_to_index(None, [manual_item(4)])
+        flush()
+        search_engine.load_index(force=True)
+        names = [item.get("name") for item in search_engine.stored_items]
+        if names[-2:] != ["Manual Item 3", "Manual Item 4"]:
+            fail(f"reload inside the debounce window lost items ({len(names)} items)")
+
+    print(f"Items: {base} + 4 manual")
+    print("OK")
+
+
+if __name__ == "__main__":
+    main()
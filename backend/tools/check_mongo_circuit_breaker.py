@@ -0,0 +1,91 @@
+import os
+import sys
+import time
+
+import mongomock
+import pymongo
+
+# Add backend dir to path to import mongodb
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import mongodb
+
+
+def fail(message):
+    print(f"FAILED: {message}")
+    sys.exit(1)
+
+
+def timed_calls(count):
+    t0 = time.perf_counter()
+    results = [mongodb.is_enabled() for _ in range(count)]
+    return results, (time.perf_counter() - t0) / count
+
+
+def wait_for_state(state, timeout):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if mongodb.connection_status()["state"] == state:
+            return True
+        time.sleep(0.02)
+    return False
+
+
+def main():
+    # Nothing listens on port 9; server selection fails after the timeout.
+    mongodb.MONGO_SERVER_SELECTION_TIMEOUT_MS = 300
+    mongodb.MONGO_RETRY_INITIAL_SECONDS = 0.2
+    mongodb.MONGO_RETRY_MAX_SECONDS = 0.8
+    mongodb._connection = mongodb._MongoConnection("mongodb://127.0.0.1:9/?connectTimeoutMS=300")
+
+    t0 = time.perf_counter()
+    if mongodb.is_enabled():
+        fail("unreachable server reported as enabled")
+    first_call = time.perf_counter() - t0
+
+    results, per_call = timed_calls(10000)
+    if any(results):
+        fail("open circuit reported MongoDB as enabled")
+    status = mongodb.connection_status()
+    if status["state"] != "open" or not status["last_error"]:
+        fail(f"unexpected status while down: {status}")
+
+    deadline = time.time() + 5
+    while time.time() < deadline and mongodb.connection_status()["consecutive_failures"] < 4:
+        time.sleep(0.05)
+    backoff_failures = mongodb.connection_status()["consecutive_failures"]
+    if backoff_failures < 3 or mongodb._connection.retry_delay != mongodb.MONGO_RETRY_MAX_SECONDS:
+        fail(f"background retries did not back off: {mongodb.connection_status()}")
+
+    # The server "comes back": the next background ping reaches a stand-in.
+    mongodb._connection.client = mongomock.MongoClient()
+    if not wait_for_state("connected", 3):
+        fail("circuit did not close after MongoDB recovered")
+    if not mongodb.is_enabled():
+        fail("recovered connection reported as disabled")
+    mongodb.save_quote("q1.json", {"client_name": "Recovered", "grand_total": 1})
+
+    # A connectivity error on an operation opens the circuit again.
+    original_find = mongomock.Collection.find_one
+    mongomock.Collection.find_one = lambda *args, **kwargs: (_ for _ in ()).throw(
+        pymongo.errors.ServerSelectionTimeoutError("stand-in outage"))
+    try:
+        mongodb.load_quote("q1.json")
+        fail("operation error was swallowed")
+    except pymongo.errors.ServerSelectionTimeoutError:
+        pass
+    if mongodb.is_enabled() or mongodb.connection_status()["state"] != "open":
+        fail("operation failure did not open the circuit")
+    mongomock.Collection.find_one = original_find
+    if not wait_for_state("connected", 3) or mongodb.load_quote("q1.json")["client_name"] != "Recovered":
+        fail("circuit did not close after the operation outage")
+
+    print(f"First call against a dead server: {first_call * 1000:.0f} ms")
+    print(f"is_enabled() while open:          {per_call * 1e6:.2f} us/call")
+    print(f"Failures before recovery:         {backoff_failures}")
+    print(f"Status: {mongodb.connection_status()}")
+    print("OK")
+
+
+if __name__ == "__main__":
+    main()
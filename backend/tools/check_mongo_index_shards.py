@@ -0,0 +1,147 @@
+import copy
+import json
+import os
+import sys
+import time
+
+import bson
+import mongomock
+
+# Add backend dir to path to import mongodb and search_engine
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import mongodb
+import search_engine
+
+BSON_LIMIT = 16 * 1024 * 1024
+fetched = []
+
+
+def counting_fetch(original):
+    def fetch(collection, ids):
+        found = original(collection, ids)
+        fetched.append((collection.name, len(found)))
+        return found
+    return fetch
+
+
+def fetched_docs(collection_name):
+    return sum(count for name, count in fetched if name == collection_name)
+
+
+def fail(message):
+    print(f"FAILED: {message}")
+    sys.exit(1)
+
+
+def main():
+    with open(search_engine.INDEX_FILE_BUNDLED, "r", encoding="utf-8-sig") as handle:
+        data = json.load(handle)
+    items, postings = data.get("stored_items", []), data.get("keyword_index", {})
+
+    db = mongomock.MongoClient()["quotation_ai"]
+    mongodb.get_db = lambda: db
+    mongodb.is_enabled = lambda: True
+    mongodb._fetch_by_ids = counting_fetch(mongodb._fetch_by_ids)
+
+    # A pre-manifest deployment: one document holding everything.
+    db["search_index"].insert_one({"_id": "global", "stored_items": items[:50], "keyword_index": {"legacy": [0]}})
+    legacy = mongodb.load_search_index()
+    if not legacy or legacy.get("content_hash") != "legacy" or len(legacy["stored_items"]) != 50:
+        fail("pre-manifest index document was not readable")
+
+    t0 = time.perf_counter()
+    saved = mongodb.save_search_index({"stored_items": items, "keyword_index": postings})
+    save_time = time.perf_counter() - t0
+    if not saved or saved["generation"] != 1 or db["search_index"].find_one({"_id": "global"}):
+        fail("first sharded save did not replace the pre-manifest document")
+    largest = max(
+        len(bson.encode(doc))
+        for name in ("search_index", "search_index_items", "search_index_chunks")
+        for doc in db[name].find()
+    )
+    if largest > BSON_LIMIT // 4:
+        fail(f"largest stored document is {largest} bytes")
+
+    if mongodb.save_search_index({"stored_items": items, "keyword_index": postings}) != saved:
+        fail("saving unchanged content bumped the generation")
+
+    mongodb._index_item_cache.clear()
+    mongodb._index_chunk_cache.clear()
+    fetched.clear()
+    t0 = time.perf_counter()
+    loaded = mongodb.load_search_index()
+    cold_time = time.perf_counter() - t0
+    if loaded["stored_items"] != items or loaded["keyword_index"] != {k: list(v) for k, v in postings.items()}:
+        fail("round trip changed the index")
+    cold_items = fetched_docs("search_index_items")
+
+    # One edited item: only its document and the chunks that reference it move.
+    changed = copy.deepcopy(items)
+    changed[len(changed) // 2]["price"] = "99999"
+    changed_postings = dict(postings)
+    changed_postings["zz-new-keyword"] = [len(changed) // 2]
+    second = mongodb.save_search_index({"stored_items": changed, "keyword_index": changed_postings})
+    if not second or second["generation"] != 2:
+        fail("changed content did not advance the generation")
+    fetched.clear()
+    t0 = time.perf_counter()
+    reloaded = mongodb.load_search_index()
+    warm_time = time.perf_counter() - t0
+    if reloaded["stored_items"] != changed or "zz-new-keyword" not in reloaded["keyword_index"]:
+        fail("incremental load missed the change")
+    if fetched_docs("search_index_items") != 1 or fetched_docs("search_index_chunks") > 2:
+        fail(f"incremental load fetched {fetched}")
+
+    # Overlapping writers: A publishes while B is still inserting. B must not
+    # replace A's manifest, and A must not delete documents B has marked.
+    original_insert = mongodb._insert_missing
+    raced = []
+
+    def racing_insert(collection, docs, now):
+        written = original_insert(collection, docs, now)
+        if not raced:
+            raced.append(True)
+            writer_a = copy.deepcopy(changed)
+            writer_a[0]["price"] = "11111"
+            raced.append(mongodb.save_search_index({"stored_items": writer_a, "keyword_index": changed_postings}))
+        return written
+
+    mongodb._insert_missing = racing_insert
+    writer_b = copy.deepcopy(changed)
+    writer_b[-1]["price"] = "22222"
+    lost = mongodb.save_search_index({"stored_items": writer_b, "keyword_index": changed_postings})
+    mongodb._insert_missing = original_insert
+    if lost is not None or not raced[1] or raced[1]["generation"] != 3:
+        fail(f"overlapping save was not rejected: A={raced[1]}, B={lost}")
+    b_item = mongodb._content_hash(writer_b[-1])
+    if not db["search_index_items"].find_one({"_id": b_item}):
+        fail("writer A garbage-collected a document writer B had just inserted")
+    mongodb._index_item_cache.clear()
+    mongodb._index_chunk_cache.clear()
+    winner = mongodb.load_search_index()
+    if not winner or winner["stored_items"][0]["price"] != "11111" or winner["stored_items"][-1]["price"] == "22222":
+        fail("the published manifest is not writer A's complete index")
+    changed = winner["stored_items"]
+
+    # load_index: a matching generation returns without touching the chunks.
+    search_engine.load_index(force=True)
+    if len(search_engine.stored_items) != len(changed):
+        fail("load_index did not use the MongoDB index")
+    fetched.clear()
+    t0 = time.perf_counter()
+    search_engine.load_index()
+    skip_time = time.perf_counter() - t0
+    if fetched:
+        fail(f"unchanged generation still fetched {fetched}")
+
+    print(f"Items: {len(items)}, keywords: {len(postings)}, largest document: {largest / 1024:.0f} KiB")
+    print(f"Sharded save:              {save_time * 1000:.0f} ms")
+    print(f"Cold load:                 {cold_time * 1000:.0f} ms ({cold_items} item docs)")
+    print(f"Load after one-item edit:  {warm_time * 1000:.0f} ms (1 item doc)")
+    print(f"load_index, same version:  {skip_time * 1000:.2f} ms")
+    print("OK")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+import os
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Add backend dir to path to import remote_image_cache
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import remote_image_cache
+from remote_image_cache import RemoteImageCache
+
+LATENCY_SECONDS = 0.15
+IMAGE_BYTES = 40 * 1024
+requests_seen = []
+
+
+class SlowImageHandler(BaseHTTPRequestHandler):
+    """Serves /img/<n>.jpg after a fixed delay; anything under /dead/ is a 404."""
+
+    def do_GET(self):
+        requests_seen.append(self.path)
+        time.sleep(LATENCY_SECONDS)
+        if self.path.startswith("/dead/"):
+            self.send_response(404)
+            self.end_headers()
+            return
+        body = self.path.encode("utf-8").ljust(IMAGE_BYTES, b"\0")
+        self.send_response(200)
+        self.send_header("Content-Type", "image/jpeg")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def fail(message):
+    print(f"FAILED: {message}")
+    sys.exit(1)
+
+
+def main():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), SlowImageHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+    urls = [f"{base}/img/{n}.jpg" for n in range(24)] + [f"{base}/img/{n}.jpg" for n in range(4)]
+    dead = f"{base}/dead/missing.jpg"
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        cache = RemoteImageCache(cache_dir, max_bytes=16 * IMAGE_BYTES, failure_ttl=60)
+
+        t0 = time.perf_counter()
+        serial = {url: cache.get(url) for url in urls[:8]}
+        serial_time = time.perf_counter() - t0
+        if not all(serial.values()):
+            fail("serial fetch returned an empty path")
+
+        cache = RemoteImageCache(os.path.join(cache_dir, "prefetch"), max_bytes=16 * IMAGE_BYTES, failure_ttl=60)
+        requests_seen.clear()
+        t0 = time.perf_counter()
+        paths = cache.prefetch(urls + [dead])
+        prefetch_time = time.perf_counter() - t0
+        if len(requests_seen) != 25:
+            fail(f"expected 25 requests for 24 distinct images and one dead URL, saw {len(requests_seen)}")
+        if paths[dead] or not all(paths[url] for url in urls):
+            fail("prefetch results do not match the served URLs")
+
+        requests_seen.clear()
+        t0 = time.perf_counter()
+        if cache.get(dead) or requests_seen:
+            fail("dead URL was retried while negatively cached")
+        negative_time = time.perf_counter() - t0
+
+        # A hit refreshes recency, so the touched image must survive the next batch.
+        cache.get(urls[0])
+        cache.prefetch(f"{base}/img/{n}.jpg" for n in range(100, 108))
+        cached = [name for name in os.listdir(cache.cache_dir) if not name.endswith(".tmp")]
+        if len(cached) > 16:
+            fail(f"cache holds {len(cached)} files, bound is 16")
+        if not os.path.exists(cache.path_for(urls[0])):
+            fail("recently used image was evicted")
+
+    server.shutdown()
+    remote_image_cache._http_client().close()
+    print(f"Serial fetch of 8 images:   {serial_time * 1000:.0f} ms")
+    print(f"Prefetch of 25 URLs:        {prefetch_time * 1000:.0f} ms ({remote_image_cache.FETCH_WORKERS} workers)")
+    print(f"Negative-cache hit:         {negative_time * 1000:.2f} ms")
+    print(f"Cached files after LRU cap: {len(cached)}")
+    print("OK")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+import os
+import random
+import sys
+import time
+
+# Add backend dir to path to import search_engine
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import search_engine
+from substring_index import SubstringIndex
+
+
+def linear_scan(keys, *needles):
+    needles = [n for n in needles if n]
+    return [key for key in keys if any(n in key for n in needles)]
+
+
+def sample_needles(keys, count, rng):
+    needles = ["feb", "k-", "in", "1333", "2594", "rose gold", "xyzq", "basin", "a", "k2", "-0"]
+    for key in rng.sample(keys, min(count, len(keys))):
+        if not key:
+            continue
+        start = rng.randrange(len(key))
+        needles.append(key[start:start + rng.randint(1, 12)])
+    return needles
+
+
+def check(label, keys, needles):
+    index = SubstringIndex(keys)
+    mismatches = 0
+    indexed_time = 0.0
+    linear_time = 0.0
+    for i, needle in enumerate(needles):
+        # Also exercise the two-needle form used by search()'s fallback.
+        pair = (needle, needles[i - 1]) if i % 3 == 0 else (needle,)
+
+        t0 = time.perf_counter()
+        got = index.find(*pair)
+        indexed_time += time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        expected = linear_scan(keys, *pair)
+        linear_time += time.perf_counter() - t0
+
+        if got != expected:
+            mismatches += 1
+            print(f"  MISMATCH {label} {pair!r}: {len(got)} vs {len(expected)}")
+
+    n = max(1, len(needles))
+    print(
+        f"{label}: {len(keys)} keys, {len(needles)} needles, {mismatches} mismatches | "
+        f"indexed {indexed_time / n * 1000:.3f} ms/query, linear {linear_time / n * 1000:.3f} ms/query"
+    )
+    return mismatches
+
+
+def main():
+    search_engine.load_index()
+    rng = random.Random(7)
+
+    keyword_keys = list(search_engine.keyword_index)
+    image_keys = list(search_engine._build_image_path_cache())
+
+    failures = 0
+    failures += check("keyword_index", keyword_keys, sample_needles(keyword_keys, 400, rng))
+    failures += check("image_path_cache", image_keys, sample_needles(image_keys, 400, rng))
+
+    if failures:
+        print(f"FAILED: {failures} mismatching lookups")
+        sys.exit(1)
+    print("OK: substring index matches linear scan")
+
+
+if __name__ == "__main__":
+    main()
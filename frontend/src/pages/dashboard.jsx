@@ -184,12 +184,16 @@ function getDisplayName(item) {
   return cleanedCandidate;
 }
 
+const BROWSE_PAGE_SIZE = 40;
+
 export default function Dashboard({ setCurrentPage, cart, setCart }) {
   const [activeBrand, setActiveBrand] = useState('Aquant');
   const [viewingCategory, setViewingCategory] = useState(null);
   const [categoryProducts, setCategoryProducts] = useState([]);
   const [loadingProducts, setLoadingProducts] = useState(false);
-  const [visibleCount, setVisibleCount] = useState(40);
+  const [productsTotal, setProductsTotal] = useState(0);
+  const [nextCursor, setNextCursor] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [isRefreshing, setIsRefreshing] = useState(false);
   const [failedImages, setFailedImages] = useState({});
   const [selectedVariants, setSelectedVariants] = useState({});
@@ -234,21 +238,45 @@ export default function Dashboard({ setCurrentPage, cart, setCart }) {
     setActiveBrand(brand);
     setViewingCategory({ name: category, brand });
     setLoadingProducts(true);
-    setVisibleCount(40);
 
     try {
       const res = await axios.get(`${BASE}/catalog/browse`, {
-        params: { brand, collection: category },
+        params: { brand, collection: category, limit: BROWSE_PAGE_SIZE },
       });
       setCategoryProducts(res.data.results || []);
+      setProductsTotal(res.data.total ?? (res.data.results || []).length);
+      setNextCursor(res.data.next_cursor || null);
     } catch (error) {
       console.error(error);
       setCategoryProducts([]);
+      setProductsTotal(0);
+      setNextCursor(null);
     } finally {
       setLoadingProducts(false);
     }
   };
 
+  const handleLoadMore = async () => {
+    if (!viewingCategory || !nextCursor || loadingMore) return;
+    setLoadingMore(true);
+    try {
+      const res = await axios.get(`${BASE}/catalog/browse`, {
+        params: {
+          brand: viewingCategory.brand,
+          collection: viewingCategory.name,
+          limit: BROWSE_PAGE_SIZE,
+          cursor: nextCursor,
+        },
+      });
+      setCategoryProducts((prev) => [...prev, ...(res.data.results || [])]);
+      setNextCursor(res.data.next_cursor || null);
+    } catch (error) {
+      console.error(error);
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   const markImageFailed = (src) => {
     if (!src) return;
     setFailedImages((prev) => (prev[src] ? prev : { ...prev, [src]: true }));
@@ -408,7 +436,7 @@ export default function Dashboard({ setCurrentPage, cart, setCart }) {
                 <p>
                   {loadingProducts
                     ? 'Loading products...'
-                    : `${categoryProducts.length} item${categoryProducts.length === 1 ? '' : 's'} available`}
+                    : `${productsTotal} item${productsTotal === 1 ? '' : 's'} available`}
                 </p>
               </header>
 
@@ -420,7 +448,7 @@ export default function Dashboard({ setCurrentPage, cart, setCart }) {
               ) : categoryProducts.length > 0 ? (
                 <>
                   <div className="db-products-grid">
-                    {categoryProducts.slice(0, visibleCount).map((item, idx) => {
+                    {categoryProducts.map((item, idx) => {
                       const currentVariant = selectedVariants[item.name] || (item.variant_prices && Object.keys(item.variant_prices)[0]) || '';
                       const displayPrice = (item.variant_prices && currentVariant && item.variant_prices[currentVariant]) || item.price;
                       
@@ -494,13 +522,14 @@ export default function Dashboard({ setCurrentPage, cart, setCart }) {
                     );
                   })}
                 </div>
-                  {visibleCount < categoryProducts.length && (
+                  {nextCursor && (
                     <button 
                       className="db-btn db-btn-light" 
-                      onClick={() => setVisibleCount((prev) => prev + 40)} 
+                      onClick={handleLoadMore}
+                      disabled={loadingMore}
                       style={{ margin: '2rem auto', display: 'block', padding: '0.75rem 2.5rem', fontWeight: 'bold' }}
                     >
-                      Load More
+                      {loadingMore ? 'Loading...' : 'Load More'}
                     </button>
                   )}
                 </>